@@ -0,0 +1,84 @@
+"""
+Benchmark do espelho incremental do CRM: recarga completa vs. sincronização por marca d'água.
+Simula alterações no CRM (troca de estágio em uma fração dos leads) entre as execuções.
+A paridade do espelho com o GROUP BY no banco fica em tests/test_funil.py.
+
+    python -m benchmarks.bench_crm_incremental --leads 1000000 --alterados 0.01
+"""
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+
+from benchmarks.comum import preparar_replay, cronometrar, imprimir_tabela, silenciar_logs
+
+
+def alterar_leads(db, fracao, seed):
+    """Move uma fração dos leads para outro estágio, atualizando hs_lastmodifieddate."""
+    with db.begin() as conn:
+        ids = [r[0] for r in conn.execute(text("SELECT hs_object_id FROM Tabela_Leads_Raiz_v2"))]
+        rng = np.random.default_rng(seed)
+        escolhidos = rng.choice(ids, size=max(1, int(len(ids) * fracao)), replace=False)
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute(
+            text(
+                "UPDATE Tabela_Leads_Raiz_v2 SET hs_pipeline_stage = '1018314554', "
+                "hs_lastmodifieddate = :agora WHERE hs_object_id = :id"
+            ),
+            [{"agora": agora, "id": int(i)} for i in escolhidos],
+        )
+    return len(escolhidos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=500_000)
+    parser.add_argument("--matriculas", type=int, default=100_000)
+    parser.add_argument("--alterados", type=float, default=0.01, help="Fração de leads alterados entre execuções")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    silenciar_logs()
+    db = preparar_replay(args.leads, args.matriculas)
+
+    from src.engines.funil.captacao.engine import FunnelEngine
+    from src.engines.funil.captacao.espelho_crm import EspelhoCRM
+
+    engine = FunnelEngine()
+    engine._espelho_crm = EspelhoCRM(pasta=tempfile.mkdtemp(prefix="espelho_crm_"))
+    engine.MODO_CRM_INCREMENTAL = True
+
+    linhas = []
+    tempo, _ = cronometrar(lambda: engine._get_crm_data_espelho(forcar_completo=True), args.repeticoes)
+    linhas.append({"modo": "espelho: recarga completa", "lidas do banco": args.leads, "tempo (s)": f"{tempo:.3f}"})
+
+    qtd = alterar_leads(db, args.alterados, seed=7)
+    with db.connect() as conn:
+        inicio = datetime.now()
+        lidas = engine.espelho_crm.sincronizar(conn, engine.data_inicio)
+        tempo = (datetime.now() - inicio).total_seconds()
+    linhas.append({"modo": f"espelho: delta ({qtd} alterados)", "lidas do banco": lidas, "tempo (s)": f"{tempo:.3f}"})
+
+    def sincronizar_e_agregar():
+        with db.connect() as conn:
+            lidas = engine.espelho_crm.sincronizar(conn, engine.data_inicio)
+        engine.espelho_crm.agregar()
+        return lidas
+
+    tempo, lidas = cronometrar(sincronizar_e_agregar, args.repeticoes)
+    linhas.append({"modo": "espelho: sem alterações + agregação", "lidas do banco": lidas, "tempo (s)": f"{tempo:.3f}"})
+
+    engine.MODO_CRM_INCREMENTAL = False
+    tempo, df_banco = cronometrar(lambda: engine._get_crm_data(agregado=True, ignorar_cache=True), args.repeticoes)
+    linhas.append({"modo": "GROUP BY no banco", "lidas do banco": len(df_banco), "tempo (s)": f"{tempo:.3f}"})
+
+    imprimir_tabela(
+        f"CRM incremental ({args.leads} leads, melhor de {args.repeticoes})",
+        linhas, ["modo", "lidas do banco", "tempo (s)"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark da escrita da aba "Lista de Ação" do relatório de pendências: escrita célula a
+célula com itertuples + larguras por astype(str).map(len) (versão anterior) vs. linhas em
+bloco com formatos pré-calculados, com e sem o modo constant_memory do xlsxwriter.
+Cada variante roda num processo novo para medir o pico de memória (RSS) isolado
+(resource no Unix, psutil no Windows; "n/d" quando nenhum dos dois está disponível).
+A paridade de valores e cores entre as variantes fica em tests/test_pendencia.py.
+
+    python -m benchmarks.bench_escrita_excel --linhas 20000 100000
+"""
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.comum import imprimir_tabela, silenciar_logs
+
+COLS_EXPORT = ['Status_Prioridade', 'Dias_Pendente', 'Marca', 'Filial', 'RA', 'Tipo_Matricula',
+               'Aluno', 'Série', 'Responsável', 'Turno', 'CPF_Resp']
+HEADERS = ['Status', 'Dias Pendentes', 'Marca', 'Filial', 'RA', 'Tipo Matricula', 'Nome do Aluno',
+           'Série', 'Responsável', 'Turno', 'CPF Responsável']
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo em MB, ou None se não houver como medir."""
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memoria = psutil.Process().memory_info()
+        # peak_wset só existe no Windows
+        return getattr(memoria, "peak_wset", memoria.rss) / 1024 ** 2
+    except ImportError:
+        return None
+
+
+def gerar_pendencias(n, marca, seed):
+    """Linhas no formato do df_escola entregue ao PendenciaReporter."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Status_Prioridade": rng.choice(["Crítico", "Atenção", "Novo"], n),
+        "Dias_Pendente": rng.integers(0, 200, n),
+        "Marca": marca,
+        "Filial": rng.choice(["TIJUCA", "BOTAFOGO", "RECREIO", "MEIER"], n),
+        "RA": (rng.choice(n * 3, n, replace=False) + 2_000_000).astype(str),
+        "Tipo_Matricula": rng.choice(["REMATRÍCULA", "MATRÍCULA"], n),
+        "Aluno": [f"ALUNO {i}" for i in rng.integers(0, n * 3, n)],
+        "Série": rng.choice(["1º ANO", "5º ANO", "9º ANO", "3ª SÉRIE"], n),
+        "Responsável": [f"RESPONSÁVEL {i}" for i in rng.integers(0, n * 2, n)],
+        "Turno": rng.choice(["MANHÃ", "TARDE", "INTEGRAL"], n),
+        "CPF_Resp": [f"{i:011d}" for i in rng.integers(0, 10 ** 11, n)],
+    })
+
+
+def gerar_lista(n):
+    # Responsáveis com mais de um filho em sequência, como na lista ordenada do relatório
+    df = gerar_pendencias(n, "MARCA", seed=7)
+    df["CPF_Resp"] = df["CPF_Resp"].iloc[(pd.RangeIndex(n) // 2) * 2].to_numpy()
+    return df[COLS_EXPORT]
+
+
+def _formatos(wb):
+    return {
+        "header": wb.add_format({'bold': True, 'font_color': 'white', 'bg_color': '#203764', 'border': 1}),
+        "critico": wb.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006', 'border': 1, 'align': 'center'}),
+        "atencao": wb.add_format({'bg_color': '#FFEB9C', 'font_color': '#9C5700', 'border': 1, 'align': 'center'}),
+        "novo": wb.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100', 'border': 1, 'align': 'center'}),
+        "familia_a": wb.add_format({'bg_color': '#FFFFFF', 'border': 1, 'valign': 'vcenter'}),
+        "familia_b": wb.add_format({'bg_color': '#F2F2F2', 'border': 1, 'valign': 'vcenter'}),
+        "manual": wb.add_format({'bg_color': '#FFFFE0', 'border': 1}),
+    }
+
+
+def escrever_anterior(ws, df, f):
+    cpf_ant = None
+    cor_base = f["familia_a"]
+    for i, linha in enumerate(df.itertuples(index=False)):
+        row_idx = i + 1
+        if linha.CPF_Resp != cpf_ant:
+            cor_base = f["familia_b"] if cor_base == f["familia_a"] else f["familia_a"]
+            cpf_ant = linha.CPF_Resp
+        bg_status = f["critico"] if linha.Status_Prioridade == 'Crítico' else (
+            f["atencao"] if linha.Status_Prioridade == 'Atenção' else f["novo"])
+        ws.write(row_idx, 0, linha.Status_Prioridade, bg_status)
+        for col, valor in enumerate(linha[1:], start=1):
+            ws.write(row_idx, col, valor, cor_base)
+        ws.write(row_idx, 11, "", f["manual"])
+    for i, col_name in enumerate(COLS_EXPORT):
+        max_len_dados = df[col_name].astype(str).map(len).max()
+        ws.set_column(i, i, min(max(max_len_dados, len(HEADERS[i])) + 2, 50))
+
+
+def escrever_nova(ws, df, f):
+    from src.engines.pendencia.report import PendenciaReporter
+    PendenciaReporter._escrever_lista_acao(
+        ws, df, fmts_status=(f["critico"], f["atencao"], f["novo"]),
+        fmts_familia=(f["familia_a"], f["familia_b"]), fmt_manual=f["manual"],
+    )
+    for i, largura in enumerate(PendenciaReporter._larguras_colunas(df, HEADERS)):
+        ws.set_column(i, i, largura)
+
+
+def executar_variante(variante, n, caminho, fila):
+    import xlsxwriter
+
+    df = gerar_lista(n).fillna('')
+    rss_base = pico_rss_mb()
+    inicio = time.perf_counter()
+    wb = xlsxwriter.Workbook(caminho, {'constant_memory': variante == "nova + constant_memory"})
+    f = _formatos(wb)
+    ws = wb.add_worksheet('Lista de Ação')
+    ws.write_row(0, 0, HEADERS, f["header"])
+    (escrever_anterior if variante == "anterior" else escrever_nova)(ws, df, f)
+    wb.close()
+    tempo = time.perf_counter() - inicio
+    fila.put((tempo, rss_base, pico_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[20_000, 100_000])
+    args = parser.parse_args()
+
+    silenciar_logs()
+    contexto = multiprocessing.get_context("spawn")
+    pasta = tempfile.mkdtemp(prefix="escrita_excel_")
+    variantes = ["anterior", "nova", "nova + constant_memory"]
+
+    linhas = []
+    for n in args.linhas:
+        for variante in variantes:
+            caminho = os.path.join(pasta, f"{n}_{variantes.index(variante)}.xlsx")
+            fila = contexto.Queue()
+            processo = contexto.Process(target=executar_variante, args=(variante, n, caminho, fila))
+            processo.start()
+            tempo, rss_base, pico = fila.get()
+            processo.join()
+            linhas.append({
+                "linhas": n,
+                "escrita": variante,
+                "tempo (s)": f"{tempo:.3f}",
+                "linhas/s": f"{n / tempo:,.0f}",
+                "pico RSS (MB)": "n/d" if pico is None else f"{pico:.0f}",
+                "acréscimo (MB)": "n/d" if pico is None else f"{pico - rss_base:.0f}",
+            })
+
+    imprimir_tabela(
+        "Escrita da Lista de Ação (xlsxwriter)",
+        linhas, ["linhas", "escrita", "tempo (s)", "linhas/s", "pico RSS (MB)", "acréscimo (MB)"],
+    )
+
+
+if __name__ == "__main__":
+    main()
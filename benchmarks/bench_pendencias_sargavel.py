@@ -0,0 +1,64 @@
+"""
+Harness dos dois modos da consulta de pendências no backend de replay:
+- servidor: SQL_PENDENTES_AVANCADO (join com CAST/UPPER/TRIM + DISTINCT da matriz + GROUP BY no banco);
+- local: só a busca sargável por (CODPERLET, STATUS), matriz válida em cache e
+  hash join + agrupamento em memória.
+Mostra o plano de cada consulta e os tempos; a paridade entre os modos fica em tests/test_pendencia.py.
+
+    python -m benchmarks.bench_pendencias_sargavel --matriculas 1000000
+"""
+import os
+import argparse
+import tempfile
+
+from benchmarks.comum import preparar_replay, cronometrar, imprimir_tabela, silenciar_logs
+
+
+def plano(db, sql, params):
+    with db.connect() as conn:
+        linhas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [linha[-1] for linha in linhas]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=200_000)
+    parser.add_argument("--matriculas", type=int, default=500_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    silenciar_logs()
+    os.environ["QUERY_CACHE_DIR"] = tempfile.mkdtemp(prefix="cache_pendencias_")
+    db = preparar_replay(args.leads, args.matriculas)
+
+    from src.engines.pendencia.engine import PendenciaEngine
+    from src.utils.query_registry import get_query_registry
+
+    servidor = PendenciaEngine(modo="servidor")
+    local = PendenciaEngine(modo="local")
+    params = servidor._params_pendentes()
+
+    for nome, sql in (("servidor", get_query_registry().obter("pendencia.pendentes").sql),
+                      ("local (linhas)", PendenciaEngine.SQL_PENDENTES_LINHAS),
+                      ("local (matriz)", PendenciaEngine.SQL_MATRIZ_VALIDA)):
+        print(f"\nPlano {nome}:")
+        for passo in plano(db, sql, params if ":" in sql else {}):
+            print(f"  {passo}")
+
+    linhas = []
+    tempo, df_servidor = cronometrar(lambda: servidor._consultar_pendentes(ignorar_cache=True), args.repeticoes)
+    linhas.append({"modo": "servidor (join + GROUP BY no banco)", "tempo (s)": f"{tempo:.4f}"})
+
+    tempo, _ = cronometrar(lambda: local.get_matriz_valida(ignorar_cache=True), args.repeticoes)
+    linhas.append({"modo": "local: recarga da matriz válida (rara)", "tempo (s)": f"{tempo:.4f}"})
+    tempo, _ = cronometrar(lambda: local._consultar_pendentes(ignorar_cache=True), args.repeticoes)
+    linhas.append({"modo": "local: linhas sargáveis + hash join em memória", "tempo (s)": f"{tempo:.4f}"})
+
+    imprimir_tabela(
+        f"Pendências ({args.matriculas} linhas de painel, {len(df_servidor)} pendentes, melhor de {args.repeticoes})",
+        linhas, ["modo", "tempo (s)"],
+    )
+
+
+if __name__ == "__main__":
+    main()
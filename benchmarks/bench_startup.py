@@ -0,0 +1,106 @@
+"""
+Benchmark da abertura do app, sempre em interpretador novo (imports frios):
+- import do app (só o menu principal) e quais módulos pesados já foram carregados;
+- construção dos widgets até o menu aparecer (precisa de customtkinter e de display);
+- import das engines (o que a primeira tela de módulo paga) e construção da FunnelEngine;
+- primeira consulta (criação da engine de banco + relatório do funil, backend de replay).
+
+    python -m benchmarks.bench_startup --repeticoes 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+from benchmarks.comum import preparar_replay, imprimir_tabela
+
+MODULOS_PESADOS = ["pandas", "numpy", "sqlalchemy", "xlsxwriter", "openpyxl", "pyarrow"]
+
+SCRIPT_FILHO = r"""
+import sys, time, json
+tempos, erros = {}, {}
+
+app_modulo = None
+try:
+    t = time.perf_counter()
+    import src.ui.app as app_modulo
+    tempos["import_app"] = time.perf_counter() - t
+except Exception as e:
+    erros["import_app"] = erros["widgets_menu"] = f"{type(e).__name__}: {e}"
+carregados = [m for m in MODULOS if m in sys.modules]
+
+if app_modulo is not None:
+    try:
+        t = time.perf_counter()
+        app = app_modulo.App()
+        app.update()
+        tempos["widgets_menu"] = time.perf_counter() - t
+        app.destroy()
+    except Exception as e:
+        erros["widgets_menu"] = f"{type(e).__name__}: {e}"
+
+t = time.perf_counter()
+from src.engines.funil.captacao.engine import FunnelEngine
+import src.engines.pendencia.engine  # noqa: F401
+tempos["import_engines"] = time.perf_counter() - t
+
+t = time.perf_counter()
+engine = FunnelEngine()
+tempos["construir_engine"] = time.perf_counter() - t
+
+t = time.perf_counter()
+df = engine.generate_full_report(ignorar_cache=True)
+tempos["primeira_consulta"] = time.perf_counter() - t
+
+print(json.dumps({"tempos": tempos, "erros": erros, "carregados": carregados, "linhas": len(df)}))
+"""
+
+
+def executar_filho(ambiente):
+    script = f"MODULOS = {MODULOS_PESADOS!r}\n" + SCRIPT_FILHO
+    saida = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, env=ambiente, check=True
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=200_000)
+    parser.add_argument("--matriculas", type=int, default=50_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    preparar_replay(args.leads, args.matriculas)
+    ambiente = {**os.environ, "PYTHONPATH": os.getcwd()}
+
+    execucoes = []
+    for _ in range(args.repeticoes):
+        try:
+            execucoes.append(executar_filho(ambiente))
+        except subprocess.CalledProcessError as e:
+            print(f"Execução falhou:\n{e.stderr}")
+            return
+        except ValueError:
+            print("Saída inesperada do processo filho.")
+            return
+
+    fases = ["import_app", "widgets_menu", "import_engines", "construir_engine", "primeira_consulta"]
+    linhas = []
+    for fase in fases:
+        valores = [e["tempos"][fase] for e in execucoes if fase in e["tempos"]]
+        if valores:
+            linhas.append({"fase": fase, "mediana (s)": f"{statistics.median(valores):.3f}", "máx (s)": f"{max(valores):.3f}"})
+        else:
+            motivo = execucoes[0]["erros"].get(fase, "não medido")
+            linhas.append({"fase": fase, "mediana (s)": "n/d", "máx (s)": motivo[:60]})
+
+    imprimir_tabela(f"Abertura do app ({args.repeticoes} processos novos)", linhas, ["fase", "mediana (s)", "máx (s)"])
+    if "import_app" in execucoes[0]["tempos"]:
+        print(f"\nMódulos pesados carregados após o import do app: {execucoes[0]['carregados'] or 'nenhum'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Utilitários compartilhados pelos benchmarks (sempre sobre o backend de replay).
+
+Uso típico:
+    python -m benchmarks.bench_crm_agregado --leads 1000000
+"""
+import os
+import time
+import logging
+
+from sqlalchemy import text
+
+
+def preparar_replay(n_leads, n_matriculas, caminho=None, seed=42):
+    """
+    Aponta o db_manager para o replay e garante a base com o volume pedido.
+    Só regera os dados quando a contagem de leads/painel é diferente.
+    """
+    from src.utils.replay_backend import CAMINHO_PADRAO, criar_engine_replay, gerar_dados_sinteticos
+    from src.utils.db_manager import reset_db_engine, get_db_engine
+
+    caminho = caminho or os.getenv("REPLAY_DB_PATH", CAMINHO_PADRAO)
+    os.environ["DB_BACKEND"] = "replay"
+    os.environ["REPLAY_DB_PATH"] = caminho
+
+    engine = criar_engine_replay(caminho)
+    with engine.connect() as conn:
+        qtd_leads = conn.execute(text("SELECT COUNT(*) FROM Tabela_Leads_Raiz_v2")).scalar()
+        qtd_painel = conn.execute(text("SELECT COUNT(*) FROM Z_PAINELMATRICULA")).scalar()
+
+    if (qtd_leads, qtd_painel) != (n_leads, n_matriculas):
+        print(f"Gerando replay: {n_leads} leads / {n_matriculas} linhas de painel...")
+        gerar_dados_sinteticos(engine, n_leads, n_matriculas, seed=seed)
+    engine.dispose()
+
+    reset_db_engine()
+    return get_db_engine()
+
+
+def cronometrar(func, repeticoes=3):
+    """Executa `func` n vezes e devolve (melhor tempo em segundos, último resultado)."""
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def tamanho_mb(df):
+    """Tamanho em memória do DataFrame (proxy do volume transferido)."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def imprimir_tabela(titulo, linhas, colunas):
+    """Imprime uma tabela simples alinhada (lista de dicts)."""
+    print(f"\n{titulo}")
+    larguras = {c: max(len(c), *(len(str(l[c])) for l in linhas)) for c in colunas}
+    print("  ".join(c.ljust(larguras[c]) for c in colunas))
+    for linha in linhas:
+        print("  ".join(str(linha[c]).ljust(larguras[c]) for c in colunas))
+
+
+def silenciar_logs():
+    logging.basicConfig(level=logging.WARNING)
@@ -1,7 +1,11 @@
 import pandas as pd
 import logging
+import time
 from abc import ABC
 from src.utils.db_manager import get_db_engine
+from src.utils.query_registry import get_query_registry
+
+# Cache de consultas e métricas do banco são importados na primeira query (não no import das engines)
 
 class EngineBase(ABC):
     """
@@ -10,29 +14,150 @@ class EngineBase(ABC):
     """
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
-        try:
-            # Centraliza a obtenção da conexão
-            self.db_engine = get_db_engine()
-        except Exception as e:
-            self.logger.error(f"Não foi possível vincular o DB Manager: {e}")
-            self.db_engine = None
+        # A engine só é criada na primeira consulta (construir a engine não abre conexão com o banco)
+        self._db_engine = None
+
+        # Consultas nomeadas com parâmetros tipados (estatísticas por consulta)
+        self.queries = get_query_registry()
+
+    @property
+    def db_engine(self):
+        """Engine SQLAlchemy obtida sob demanda; None (com log) se o DB Manager falhar."""
+        if self._db_engine is None:
+            try:
+                # Centraliza a obtenção da conexão
+                self._db_engine = get_db_engine()
+            except Exception as e:
+                self.logger.error(f"Não foi possível vincular o DB Manager: {e}")
+        return self._db_engine
 
-    def executar_query(self, query: str, params=None) -> pd.DataFrame:
+    def executar_query(self, query: str, params=None, ttl=None, ignorar_cache=False) -> pd.DataFrame:
         """
         Executa uma consulta SQL e retorna um DataFrame.
         Trata erros e logs de forma centralizada.
+        Com `ttl` (segundos), o resultado é reaproveitado do cache em disco;
+        `ignorar_cache=True` força a ida ao banco.
         """
         if not self.db_engine:
             self.logger.error("Tentativa de query sem conexão ativa.")
             return pd.DataFrame()
 
+        from src.utils.query_cache import get_query_cache, gerar_chave
+        from src.utils.db_metrics import get_db_metrics
+
         try:
+            chave = None
+            if ttl:
+                origem = self.db_engine.url.render_as_string(hide_password=True)
+                chave = gerar_chave(query, params if isinstance(params, dict) else {"_": params}, origem)
+                if not ignorar_cache:
+                    df = get_query_cache().obter(chave, ttl)
+                    if df is not None:
+                        self.logger.info(f"Query servida do cache. Linhas retornadas: {len(df)}")
+                        return df
+
             self.logger.debug(f"Executando query (início): {query[:50]}...")
             # O Pandas gerencia abrir/fechar a conexão automaticamente ao receber a engine
+            inicio = time.perf_counter()
             df = pd.read_sql(query, self.db_engine, params=params)
+            get_db_metrics().registrar_resultado(time.perf_counter() - inicio, df)
             self.logger.info(f"Query executada com sucesso. Linhas retornadas: {len(df)}")
+
+            if chave:
+                get_query_cache().gravar(chave, df, consulta=self.__class__.__name__)
             return df
         except Exception as e:
             self.logger.error(f"Erro na execução da query: {e}")
             # Retorna DataFrame vazio para não quebrar pipelines que esperam DF
-            return pd.DataFrame()
\ No newline at end of file
+            return pd.DataFrame()
+
+    def executar_consulta(self, nome: str, params=None, ignorar_cache=False) -> pd.DataFrame:
+        """
+        Executa uma consulta registrada no QueryRegistry (bind parameters tipados,
+        texto SQL estável, cache conforme o TTL da consulta). Mesmo contrato de erro de executar_query.
+        """
+        if not self.db_engine:
+            self.logger.error("Tentativa de query sem conexão ativa.")
+            return pd.DataFrame()
+
+        try:
+            df = self.queries.executar(nome, self.db_engine, params, ignorar_cache=ignorar_cache)
+            self.logger.info(f"Consulta '{nome}' executada com sucesso. Linhas retornadas: {len(df)}")
+            return df
+        except Exception as e:
+            self.logger.error(f"Erro na execução da consulta '{nome}': {e}")
+            return pd.DataFrame()
+
+    def executar_consulta_em_blocos(self, nome: str, params=None, chunksize: int = 50_000, dtype=None, parse_dates=None):
+        """
+        Versão em streaming de executar_consulta (ver executar_query_em_blocos).
+        Falha no meio da leitura é contabilizada como erro da consulta e propagada.
+        """
+        consulta = self.queries.obter(nome)
+        try:
+            valores = consulta.preparar_parametros(params)
+        except Exception as e:
+            self.logger.error(f"Parâmetros inválidos para a consulta '{nome}': {e}")
+            return
+
+        inicio = time.perf_counter()
+        linhas = 0
+        memoria = {"bytes_antes": 0, "bytes_depois": 0}
+        try:
+            for bloco in self.executar_query_em_blocos(
+                consulta.statement, valores, chunksize=chunksize, dtype=dtype, parse_dates=parse_dates
+            ):
+                # Esquema aplicado bloco a bloco (para juntar os blocos: esquema_ingestao.concatenar_blocos)
+                bloco, relatorio = consulta.tipar(bloco)
+                if relatorio:
+                    memoria["bytes_antes"] += relatorio["bytes_antes"]
+                    memoria["bytes_depois"] += relatorio["bytes_depois"]
+                linhas += len(bloco)
+                yield bloco
+        except Exception:
+            self.queries.registrar_execucao(nome, time.perf_counter() - inicio, linhas, erro=True)
+            raise
+        self.queries.registrar_execucao(
+            nome, time.perf_counter() - inicio, linhas, relatorio=memoria if consulta.esquema else None
+        )
+
+    def executar_query_em_blocos(self, query, params=None, chunksize: int = 50_000, dtype=None, parse_dates=None):
+        """
+        Variante em streaming de executar_query (aceita texto SQL ou TextClause):
+        gera DataFrames de até `chunksize` linhas,
+        já tipados via `dtype`/`parse_dates`, sem materializar o resultado inteiro em memória.
+        Em caso de erro no meio da leitura, loga e propaga a exceção: os blocos já entregues
+        são um resultado parcial e o consumidor precisa abortar (não há como sinalizar isso
+        com um DataFrame vazio, como em executar_query). Sem conexão, não gera nenhum bloco.
+        """
+        if not self.db_engine:
+            self.logger.error("Tentativa de query sem conexão ativa.")
+            return
+
+        from src.utils.db_metrics import get_db_metrics
+
+        total = 0
+        bytes_lidos = 0
+        tempo_leitura = 0.0
+        try:
+            self.logger.debug(f"Executando query em blocos de {chunksize} (início): {str(query)[:50]}...")
+            # stream_results pede cursor de servidor quando o driver suporta
+            with self.db_engine.connect().execution_options(stream_results=True) as conn:
+                leitor = pd.read_sql(
+                    query, conn, params=params, chunksize=chunksize, dtype=dtype, parse_dates=parse_dates
+                )
+                while True:
+                    # Só o tempo dentro do read_sql conta para o fetch, não o consumo pelo chamador
+                    inicio = time.perf_counter()
+                    bloco = next(leitor, None)
+                    tempo_leitura += time.perf_counter() - inicio
+                    if bloco is None:
+                        break
+                    total += len(bloco)
+                    bytes_lidos += int(bloco.memory_usage(deep=True).sum())
+                    yield bloco
+            get_db_metrics().registrar_resultado(tempo_leitura, linhas=total, bytes_=bytes_lidos)
+            self.logger.info(f"Query em blocos concluída. Linhas retornadas: {total}")
+        except Exception as e:
+            self.logger.error(f"Erro na execução da query em blocos (após {total} linhas): {e}")
+            raise
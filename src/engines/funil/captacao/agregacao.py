@@ -0,0 +1,87 @@
+"""
+Kernel de agregação do funil sobre códigos inteiros.
+
+Uma única passada (np.bincount) monta a matriz unidade x estágio de contagens; tudo o
+que o funil precisa sai dessa matriz pequena (centenas de unidades x poucos estágios):
+- rótulos normalizados/traduzidos: soma de linhas/colunas com o mesmo rótulo;
+- funil acumulado (>= estágio): soma reversa acumulada sobre os estágios ordenados por peso;
+- cohort (onde o lead está parado): colunas agrupadas pelo rótulo do estágio.
+
+Usado por FunnelBusinessRules.transformar_dados_crm e FunnelEngine._process_data.
+"""
+import numpy as np
+import pandas as pd
+
+
+def fatorar(serie):
+    """
+    Códigos inteiros (0..n-1) e valores distintos da coluna. Nulos viram um valor próprio
+    (NaN em `distintos`), como o apply/astype(str) das versões linha a linha fazia.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy().astype(np.int64)
+        distintos = list(serie.cat.categories)
+        if (codigos == -1).any():
+            codigos = np.where(codigos == -1, len(distintos), codigos)
+            distintos.append(np.nan)
+        return codigos, distintos
+
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=False)
+    return codigos.astype(np.int64), list(distintos)
+
+
+def montar_matriz(unidades, estagios, pesos=None):
+    """
+    Matriz de contagens unidade x estágio em uma passada.
+    `pesos` (ex: coluna Leads do CRM pré-agregado) soma o valor em vez de contar linhas.
+    Devolve (unidades_distintas, estagios_distintos, matriz int64).
+    """
+    cod_unidade, rotulos_unidade = fatorar(unidades)
+    cod_estagio, rotulos_estagio = fatorar(estagios)
+    n_unidades, n_estagios = len(rotulos_unidade), len(rotulos_estagio)
+
+    pesos_array = None if pesos is None else np.asarray(pesos, dtype=np.float64)
+    plano = np.bincount(
+        cod_unidade * n_estagios + cod_estagio,
+        weights=pesos_array,
+        minlength=n_unidades * n_estagios,
+    )
+    matriz = np.rint(plano).astype(np.int64).reshape(n_unidades, n_estagios)
+    return rotulos_unidade, rotulos_estagio, matriz
+
+
+def _indicadora(rotulos, ordem=None):
+    """Matriz 0/1 (n_rotulos x n_distintos) que soma as posições de mesmo rótulo via produto matricial."""
+    if ordem is None:
+        ordem = sorted(set(rotulos), key=str)
+    posicao = {r: i for i, r in enumerate(ordem)}
+    indicadora = np.zeros((len(rotulos), len(ordem)), dtype=np.int64)
+    for i, rotulo in enumerate(rotulos):
+        if rotulo in posicao:
+            indicadora[i, posicao[rotulo]] = 1
+    return list(ordem), indicadora
+
+
+def agrupar_colunas(matriz, rotulos, ordem=None):
+    """Soma as colunas que recebem o mesmo rótulo (ex: código do estágio -> nome do card)."""
+    nomes, indicadora = _indicadora(rotulos, ordem)
+    return nomes, matriz @ indicadora
+
+
+def agrupar_linhas(matriz, rotulos, ordem=None):
+    """Soma as linhas que recebem o mesmo rótulo (ex: alias da unidade -> nome canônico)."""
+    nomes, indicadora = _indicadora(rotulos, ordem)
+    return nomes, indicadora.T @ matriz
+
+
+def funil_acumulado(matriz, pesos_estagio, niveis):
+    """
+    Contagens acumuladas por nível: coluna j = leads com peso >= niveis[j].
+    `pesos_estagio` traz o peso de cada coluna da matriz (0 para estágios fora do funil).
+    """
+    pesos_estagio = np.asarray(pesos_estagio, dtype=np.int64)
+    maior = int(max(pesos_estagio.max(initial=0), max(niveis)))
+    _, por_peso = agrupar_colunas(matriz, list(pesos_estagio), ordem=list(range(maior + 1)))
+    # Soma reversa acumulada: posição p = total com peso >= p
+    acumulado = por_peso[:, ::-1].cumsum(axis=1)[:, ::-1]
+    return acumulado[:, list(niveis)]
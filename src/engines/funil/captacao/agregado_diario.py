@@ -0,0 +1,151 @@
+import os
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.utils.persistencia import gravar_dataframe, ler_dataframe, gravar_json, ler_json
+from src.utils.esquema_ingestao import concatenar_blocos
+
+
+class AgregadoDiarioCRM:
+    """
+    Agregado materializado de leads por (dia de hs_createdate, unidade, estágio).
+
+    Mantido a partir do EspelhoCRM: a cada sincronização do espelho, as versões antigas
+    dos leads alterados saem das contagens e as novas entram (só o delta é lido do banco
+    e só o delta é agregado). Recargas completas do espelho, ou um espelho sincronizado
+    por outro caminho, reconstroem o agregado localmente a partir do espelho.
+    Tendências semanais/mensais somam linhas já agregadas (dias x unidades x estágios).
+    """
+
+    COLUNAS = ["dia", "unidade", "hs_pipeline_stage", "Leads"]
+    GRANULARIDADES = ("dia", "semana", "mes")
+
+    def __init__(self, espelho, pasta="historico_dados_local/agregado_diario_crm"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.espelho = espelho
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self.df = None
+        self.estado = {}
+        os.makedirs(self.pasta, exist_ok=True)
+
+    # --- Persistência ---
+
+    @property
+    def _caminho_dados(self):
+        """Caminho base (sem extensão) do DataFrame persistido."""
+        return os.path.join(self.pasta, "agregado_diario")
+
+    @property
+    def _caminho_estado(self):
+        return os.path.join(self.pasta, "estado.json")
+
+    def _carregar(self):
+        if self.df is not None:
+            return
+        try:
+            self.estado = ler_json(self._caminho_estado)
+            self.df = ler_dataframe(self._caminho_dados) if self.estado else None
+        except FileNotFoundError:
+            self.estado, self.df = {}, None
+        except Exception as e:
+            self.logger.warning(f"Agregado diário ilegível, será reconstruído: {e}")
+            self.estado, self.df = {}, None
+
+    def _salvar(self):
+        # Dados antes do estado: um estado novo nunca aponta para dados antigos
+        gravar_dataframe(self.df, self._caminho_dados)
+        gravar_json(self._caminho_estado, self.estado)
+
+    # --- Manutenção ---
+
+    @classmethod
+    def contar(cls, leads):
+        """Contagens por (dia, unidade, estágio) de um conjunto de leads do espelho."""
+        if leads is None or leads.empty:
+            return pd.DataFrame(columns=cls.COLUNAS)
+        chaves = [
+            leads["hs_createdate"].dt.normalize().rename("dia"),
+            leads["unidade"],
+            leads["hs_pipeline_stage"],
+        ]
+        return leads.groupby(chaves, dropna=False, observed=True).size().rename("Leads").reset_index()
+
+    @classmethod
+    def _consolidar(cls, partes):
+        """Soma partes no formato do agregado, descarta contagens zeradas e ordena por dia."""
+        df = concatenar_blocos([p for p in partes if not p.empty])
+        df = df.groupby(
+            ["dia", "unidade", "hs_pipeline_stage"], dropna=False, observed=True
+        )["Leads"].sum().reset_index()
+        df = df[df["Leads"] != 0]
+        df["Leads"] = df["Leads"].astype("int32")
+        return df.reset_index(drop=True)
+
+    def sincronizar(self, conexao, data_inicio, forcar_completo=False):
+        """
+        Sincroniza o espelho (delta por hs_lastmodifieddate) e aplica a diferença ao agregado.
+        Retorna o número de linhas lidas do banco pelo espelho.
+        """
+        with self._lock:
+            self._carregar()
+            marca_anterior = self.espelho.estado.get("marca_dagua")
+            lidas = self.espelho.sincronizar(conexao, data_inicio, forcar_completo=forcar_completo)
+            delta = self.espelho.ultimo_delta or {"completo": True}
+
+            # O delta só vale se o agregado refletia exatamente o espelho antes desta sincronização
+            incremental = (
+                not delta["completo"]
+                and self.df is not None
+                and marca_anterior is not None
+                and self.estado.get("marca_dagua_espelho") == marca_anterior
+            )
+            if incremental:
+                removidos = self.contar(delta["removidos"])
+                removidos["Leads"] = -removidos["Leads"]
+                self.df = self._consolidar([self.df, self.contar(delta["novos"]), removidos])
+            else:
+                self.logger.info("Agregado diário: reconstruindo a partir do espelho...")
+                self.df = self._consolidar([self.contar(self.espelho.df)])
+
+            self.estado["marca_dagua_espelho"] = self.espelho.estado.get("marca_dagua")
+            self.estado["atualizado_em"] = datetime.now().isoformat()
+            self._salvar()
+            return lidas
+
+    # --- Consulta ---
+
+    def consultar(self, inicio=None, fim=None):
+        """Linhas diárias com dia entre inicio e fim (inclusive), via busca binária no agregado ordenado."""
+        with self._lock:
+            self._carregar()
+            if self.df is None or self.df.empty:
+                return pd.DataFrame(columns=self.COLUNAS)
+            df = self.df
+
+        dias = df["dia"].to_numpy()
+        ini = 0 if inicio is None else np.searchsorted(dias, np.datetime64(pd.Timestamp(inicio)), side="left")
+        fim = len(df) if fim is None else np.searchsorted(dias, np.datetime64(pd.Timestamp(fim)), side="right")
+        return df.iloc[ini:fim]
+
+    def tendencia(self, granularidade="semana", inicio=None, fim=None):
+        """
+        Leads por (periodo, unidade, hs_pipeline_stage) somando os dias do agregado.
+        granularidade: 'dia', 'semana' (período = segunda-feira) ou 'mes' (período = dia 1).
+        """
+        if granularidade not in self.GRANULARIDADES:
+            raise ValueError(f"Granularidade inválida: {granularidade}. Use uma de {list(self.GRANULARIDADES)}.")
+
+        df = self.consultar(inicio, fim)
+        periodo = pd.to_datetime(df["dia"])
+        if granularidade == "semana":
+            periodo = periodo - pd.to_timedelta(periodo.dt.weekday, unit="D")
+        elif granularidade == "mes":
+            periodo = periodo.dt.to_period("M").dt.to_timestamp()
+
+        chaves = [periodo.rename("periodo"), df["unidade"], df["hs_pipeline_stage"]]
+        return df.groupby(chaves, dropna=False, observed=True)["Leads"].sum().reset_index()
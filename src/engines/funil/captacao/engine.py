@@ -1,45 +1,160 @@
+import math
 import pandas as pd
 import logging
 import json
-from sqlalchemy import text
+from functools import partial
 from src.utils.db_manager import get_db_engine
+from src.utils.concorrencia import executar_em_paralelo
+from src.utils.query_registry import get_query_registry
+from src.utils.esquema_ingestao import mapear_categorias, concatenar_blocos
+from src.utils.dimensao_unidades import get_dimensao_unidades
+from src.engines.funil.captacao.espelho_crm import EspelhoCRM
+from src.engines.funil.captacao.agregado_diario import AgregadoDiarioCRM
+from src.engines.funil.captacao.snapshots import SnapshotsFunil
+from src.engines.funil.captacao.agregacao import montar_matriz, agrupar_linhas, agrupar_colunas
 
 
 class FunnelEngine:
+    # Fontes independentes extraídas em paralelo: nome -> método da engine.
+    # Novas fontes (renovação, metas) entram aqui sem mexer no orquestrador.
+    FONTES_EXTRACAO = {
+        "crm": "_get_crm_data",
+        "erp": "_get_erp_data",
+    }
+
+    # Limite de threads de extração (bem abaixo do pool_size=10 do db_manager)
+    MAX_WORKERS_EXTRACAO = 4
+
+    # Validade (segundos) dos resultados no cache de consultas
+    TTL_CRM = 15 * 60
+    TTL_ERP = 15 * 60
+    # Períodos letivos encerrados não mudam mais: o resultado fica no cache sem expirar
+    TTL_PERIODO_FECHADO = math.inf
+
+    # CRM pré-agregado no banco (GROUP BY unidade, estágio) em vez de linha a linha
+    MODO_CRM_AGREGADO = True
+
+    # CRM agregado a partir do espelho local (só busca leads alterados desde a última execução)
+    MODO_CRM_INCREMENTAL = False
+
+    # Expressões de agrupamento temporal do CRM (DATEFROMPARTS existe no SQL Server 2012+)
+    BUCKETS_CRM = {
+        None: None,
+        "dia": "DATEFROMPARTS(YEAR(hs_createdate), MONTH(hs_createdate), DAY(hs_createdate))",
+        "semana": None,
+        "mes": "DATEFROMPARTS(YEAR(hs_createdate), MONTH(hs_createdate), 1)",
+    }
+
+    STATUS_MATRICULADO = ["Matriculado", "Pré-Matriculado"]
+
+    # Grava a fotografia diária do relatório consolidado (base das colunas Var%/Delta)
+    GRAVAR_SNAPSHOT = True
+    REFERENCIAS_COMPARACAO = ("D-1", "D-7")
+    METRICAS_COMPARACAO = ["Leads", "Visita Agendada", "Visita Realizada", "Matricula"]
+
+    # --- MAPA DE TRADUÇÃO (DE-PARA) ---
+    # Converte os IDs numéricos do HubSpot para os nomes usados no Dashboard
+    STAGE_MAPPER = {
+        "1018380105": "Novos Leads",  # LEADS (Entrada)
+        "1018380106": "Leads Contatados",  # LEADS_CONTATADOS
+        "1022335280": "Visita Agendada",  # AGENDAMENTO_REALIZADO (Nome exato do Card)
+        "1018314554": "Visita Realizada",  # VISITA_REALIZADA (Nome exato do Card)
+        "1111696774": "Matriculado CRM",  # MATRICULADO_TOTAL (No CRM)
+        "1018314555": "Declinado",  # DECLINADO
+    }
+
+    # Tipos das colunas na ingestão (unidade/estágio repetidos em todas as linhas viram category)
+    ESQUEMA_CRM = {"unidade": "categoria", "hs_pipeline_stage": "categoria", "Leads": "inteiro", "periodo": "data"}
+    ESQUEMA_ERP = {"unidade": "categoria", "periodo_letivo": "categoria", "Matricula": "inteiro"}
+
+    # --- SQL (parametrizado; registrado no QueryRegistry ao final do módulo) ---
+    SQL_CRM_DETALHADO = """
+        SELECT 
+            unidade, 
+            hs_pipeline_stage,
+            1 as Leads
+        FROM Tabela_Leads_Raiz_v2
+        WHERE hs_createdate >= :data_inicio
+        """
+
+    SQL_CRM_AGREGADO = """
+        SELECT 
+            unidade, 
+            hs_pipeline_stage{col_periodo},
+            COUNT(*) AS Leads
+        FROM Tabela_Leads_Raiz_v2
+        WHERE hs_createdate >= :data_inicio
+        GROUP BY unidade, hs_pipeline_stage{group_periodo}
+        """
+
+    # Um período por consulta: cada ano tem sua própria entrada no cache (e seu próprio TTL)
+    SQL_ERP_MATRICULAS = """
+        SELECT 
+            T1.FILIAL AS unidade, 
+            T1.CODPERLET AS periodo_letivo,
+            COUNT(DISTINCT T1.RA) AS Matricula
+        FROM Z_PAINELMATRICULA T1
+        INNER JOIN Tabela_Matrizcurricular T2 
+            ON T1.GRADE = T2.GRADE 
+            AND T1.CODCOLIGADA = T2.CODCOLIGADA
+            AND T1.CODFILIAL = T2.CODFILIAL
+        WHERE T1.CODPERLET = :codperlet
+        AND T1.STATUS IN :statuses
+        AND T2.[Matricula Validade] = 'S'
+        GROUP BY T1.FILIAL, T1.CODPERLET
+        """
+
     def __init__(self):
-        self.db = get_db_engine()
+        self._db = None
         self.logger = logging.getLogger(__name__)
-        self.unit_map = {}
+        self.tempos_extracao = {}
+        self.queries = get_query_registry()
+        self.queries.registrar_grupo("funil", _registrar_consultas)
+        self._espelho_crm = None
+        self._agregado_diario = None
+        self._snapshots = None
 
         try:
             with open("src/utils/config.json", "r") as f:
                 config = json.load(f)
                 self.data_inicio = config.get("DATA_INICIO")
+                self.periodo_ativo = str(config.get("PERIODO_LETIVO", "2026"))
+                self.periodos_letivos = [self.periodo_ativo]
         except Exception as e:
             self.logger.error(f"Erro ao carregar config.json: {e}")
             self.data_inicio = "2025-01-01"  # Fallback de segurança
+            self.periodo_ativo = "2026"
+            self.periodos_letivos = ["2026"]
+
+    @property
+    def db(self):
+        """Engine do banco criada no primeiro uso (a tela do funil abre sem tocar no banco)."""
+        if self._db is None:
+            self._db = get_db_engine()
+        return self._db
+
+    @property
+    def dimensao_unidades(self):
+        """Dimensão de unidades (id inteiro -> nome oficial, marca, status, sucessora)."""
+        return get_dimensao_unidades()
 
     def extract_marca(self, unidade_str):
         """
-        Método auxiliar para extrair a MARCA de uma string 'MARCA - UNIDADE'.
-        Chamado pela UI para agrupar os cards.
+        MARCA de uma unidade, pela dimensão do normalization.json (nome oficial ou alias).
+        Preferir lookups por id_unidade (dimensao_unidades.marcas) em vez de chamar por linha.
         """
-        if pd.isna(unidade_str) or not isinstance(unidade_str, str):
-            return "OUTROS"
+        return self.dimensao_unidades.marca_de(unidade_str)
 
-        parts = unidade_str.split("-")
-        if parts:
-            return parts[0].strip()
-        return unidade_str
-
-    def generate_full_report(self):
+    def generate_full_report(self, ignorar_cache=False):
         """
         Orquestra a busca de dados do CRM e ERP e consolida as informações.
+        `ignorar_cache=True` força a ida ao banco em todas as fontes.
         """
         try:
-            # 1. Buscar dados
-            df_crm = self._get_crm_data()
-            df_erp = self._get_erp_data()
+            # 1. Buscar dados (fontes em paralelo)
+            dados, erros = self._extrair_fontes(ignorar_cache=ignorar_cache)
+            df_crm = dados["crm"]
+            df_erp = dados["erp"]
 
             # 2. Validação se tudo falhar
             if df_crm.empty and df_erp.empty:
@@ -51,9 +166,17 @@ class FunnelEngine:
             # 3. Processamento / Merge
             df_consolidado = self._process_data(df_crm, df_erp)
 
+            # 4. Chave inteira da unidade: UI e relatórios agrupam por marca via lookup do id
             if not df_consolidado.empty and "unidade" in df_consolidado.columns:
-                unique_units = df_consolidado["unidade"].unique()
-                self.unit_map = {u: u for u in unique_units}
+                df_consolidado["id_unidade"] = self.dimensao_unidades.codificar(df_consolidado["unidade"])
+
+            # Fotografia só com as duas fontes completas: metade dos números viraria falsa
+            # queda no D-1/D-7 de amanhã
+            fontes_incompletas = sorted(erros | {n for n, df in dados.items() if df.empty})
+            if self.GRAVAR_SNAPSHOT and fontes_incompletas:
+                self.logger.warning(f"Snapshot do dia não gravado (fontes vazias ou com falha: {fontes_incompletas}).")
+            elif self.GRAVAR_SNAPSHOT:
+                self._gravar_snapshot(df_consolidado.drop(columns=["id_unidade"], errors="ignore"))
 
             self.logger.info(
                 f"Relatório consolidado gerado: {len(df_consolidado)} linhas."
@@ -64,94 +187,299 @@ class FunnelEngine:
             self.logger.error(f"Erro no fluxo do Funil: {e}")
             return pd.DataFrame()
 
-    def _get_crm_data(self):
-        """Busca volumetria do CRM (Leads, Inscritos, etc)"""
-        self.logger.info("Extraindo dados do CRM...")
+    def _extrair_fontes(self, ignorar_cache=False):
+        """
+        Executa as consultas de FONTES_EXTRACAO concorrentemente.
+        A latência fica no max() das fontes; falha em uma fonte vira DataFrame vazio.
+        Todo método de fonte aceita o argumento `ignorar_cache`.
+        Retorna (resultados por fonte, conjunto com os nomes das fontes que falharam).
+        """
+        tarefas = {
+            nome: partial(getattr(self, metodo), ignorar_cache=ignorar_cache)
+            for nome, metodo in self.FONTES_EXTRACAO.items()
+        }
+        resultados, self.tempos_extracao, erros = executar_em_paralelo(
+            tarefas, max_workers=self.MAX_WORKERS_EXTRACAO, fallback=pd.DataFrame
+        )
 
-        query = f"""
-        SELECT 
-            unidade, 
-            hs_pipeline_stage,
-            1 as Leads
-        FROM Tabela_Leads_Raiz_v2
-        WHERE hs_createdate >= '{self.data_inicio}'
+        resumo = ", ".join(f"{nome}={t:.2f}s" for nome, t in self.tempos_extracao.items())
+        self.logger.info(f"Extração concluída ({resumo}).")
+        if erros:
+            self.logger.warning(f"Fontes com falha: {sorted(erros)}")
+
+        return resultados, set(erros)
+
+    def _get_crm_data(self, agregado=None, bucket=None, ignorar_cache=False):
+        """
+        Busca volumetria do CRM (Leads, Inscritos, etc).
+
+        agregado=True  -> GROUP BY unidade/estágio no banco (poucas centenas de linhas,
+                          coluna Leads = contagem). Padrão, definido por MODO_CRM_AGREGADO.
+        agregado=False -> uma linha por lead (drill-down), com Leads = 1.
+        bucket         -> None, 'dia', 'semana' ou 'mes': adiciona a coluna 'periodo'
+                          (apenas no modo agregado).
+        """
+        if agregado is None:
+            agregado = self.MODO_CRM_AGREGADO
+
+        if not agregado:
+            return self._get_crm_data_detalhado(ignorar_cache)
+
+        if bucket not in self.BUCKETS_CRM:
+            raise ValueError(f"Bucket inválido: {bucket}. Use um de {list(self.BUCKETS_CRM)}.")
+
+        if self.MODO_CRM_INCREMENTAL:
+            return self._get_crm_data_espelho(bucket)
+
+        self.logger.info(f"Extraindo dados do CRM (agregado, bucket={bucket})...")
+
+        # Semana é derivada do bucket diário no Pandas (DATEADD/week varia entre bancos)
+        nome_consulta = "funil.crm_agregado"
+        if bucket:
+            nome_consulta += "_" + ("dia" if bucket == "semana" else bucket)
+
+        df = self._executar_consulta(nome_consulta, {"data_inicio": self.data_inicio}, "CRM", ignorar_cache)
+
+        if bucket and not df.empty:
+            df["periodo"] = pd.to_datetime(df["periodo"])
+            if bucket == "semana":
+                # Início da semana (segunda-feira)
+                df["periodo"] = df["periodo"] - pd.to_timedelta(df["periodo"].dt.weekday, unit="D")
+                df = df.groupby(
+                    ["unidade", "hs_pipeline_stage", "periodo"], as_index=False, dropna=False, observed=True
+                )["Leads"].sum()
+        return df
+
+    def _get_crm_data_detalhado(self, ignorar_cache=False):
+        """Busca o CRM linha a linha (um registro por lead), para drill-down."""
+        self.logger.info("Extraindo dados do CRM (detalhado)...")
+        return self._executar_consulta(
+            "funil.crm_detalhado", {"data_inicio": self.data_inicio}, "CRM", ignorar_cache
+        )
+
+    # --- Snapshots (comparação D-1 / D-7) ---
+
+    def preparar_exportacao(self, df):
+        """
+        Relatório pronto para o GeradorRelatorio: colunas Var%/Delta dos snapshots
+        e coluna Marca (lookup pelo id_unidade) no lugar da chave inteira.
+        """
+        df = self.comparar_periodos(df)
+        if df is None or "id_unidade" not in df.columns:
+            return df
+        df = df.drop(columns=["id_unidade"]).assign(Marca=self.dimensao_unidades.marcas(df["id_unidade"]))
+        colunas = ["unidade", "Marca"] + [c for c in df.columns if c not in ("unidade", "Marca")]
+        return df[colunas]
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            self._snapshots = SnapshotsFunil()
+        return self._snapshots
+
+    def _gravar_snapshot(self, df_consolidado):
+        try:
+            self.snapshots.gravar(df_consolidado)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar snapshot do funil: {e}")
+
+    def comparar_periodos(self, df, referencias=None, metricas=None):
+        """
+        Acrescenta ao relatório as colunas "<métrica> Var% (ref)" e "<métrica> Delta (ref)"
+        contra os snapshots gravados ('D-1', 'D-7' ou datas explícitas). Sem acesso ao banco.
+        Em caso de erro devolve o relatório sem as colunas de variação.
+        """
+        try:
+            return self.snapshots.comparar(
+                df, referencias or self.REFERENCIAS_COMPARACAO, metricas or self.METRICAS_COMPARACAO
+            )
+        except Exception as e:
+            self.logger.error(f"Erro ao comparar com snapshots: {e}")
+            return df
+
+    @staticmethod
+    def traduzir_estagio(codigo):
+        """
+        Garante que o estágio seja string limpa para bater com o dicionário e aplica a tradução.
+        Se o código não estiver no mapa, mantém o original.
+        """
+        codigo = str(codigo).strip()
+        return FunnelEngine.STAGE_MAPPER.get(codigo, codigo)
+
+    @property
+    def espelho_crm(self):
+        if self._espelho_crm is None:
+            self._espelho_crm = EspelhoCRM()
+        return self._espelho_crm
+
+    def _get_crm_data_espelho(self, bucket=None, forcar_completo=False):
+        """
+        Sincroniza o espelho local do CRM (delta por hs_lastmodifieddate) e agrega a partir dele.
+        Se a sincronização falhar, agrega o espelho como está (dados da última execução).
         """
+        self.logger.info(f"Extraindo dados do CRM (espelho incremental, bucket={bucket})...")
         try:
             with self.db.connect() as conn:
-                df = pd.read_sql(text(query), conn)
-                return df
+                self.espelho_crm.sincronizar(conn, self.data_inicio, forcar_completo=forcar_completo)
         except Exception as e:
-            self.logger.error(f"Erro query CRM: {e}")
-            return pd.DataFrame()
+            self.logger.error(f"Erro ao sincronizar espelho do CRM: {e}")
+        return self.espelho_crm.agregar(bucket)
+
+    # --- Tendência (agregado diário materializado) ---
+
+    @property
+    def agregado_diario(self):
+        if self._agregado_diario is None:
+            self._agregado_diario = AgregadoDiarioCRM(self.espelho_crm)
+        return self._agregado_diario
+
+    def sincronizar_agregado_diario(self, forcar_completo=False):
+        """Atualiza o agregado diário pelo delta do espelho do CRM. Falha mantém a última versão."""
+        try:
+            with self.db.connect() as conn:
+                return self.agregado_diario.sincronizar(conn, self.data_inicio, forcar_completo=forcar_completo)
+        except Exception as e:
+            self.logger.error(f"Erro ao sincronizar agregado diário do CRM: {e}")
+            return 0
+
+    def get_tendencia(self, granularidade="semana", inicio=None, fim=None, unidades=None, sincronizar=True):
+        """
+        Série de leads por período e unidade a partir do agregado diário (dia de hs_createdate).
+
+        granularidade -> 'dia', 'semana' (segunda-feira) ou 'mes' (dia 1)
+        inicio / fim  -> faixa de dias (inclusive); None = desde DATA_INICIO / até hoje
+        unidades      -> filtra unidades (nomes já normalizados em caixa alta)
+        sincronizar   -> busca antes o delta no banco; False usa só o agregado local
+
+        Retorna colunas periodo, unidade, uma coluna por estágio (nomes do Dashboard) e Leads (total).
+        """
+        if sincronizar:
+            self.sincronizar_agregado_diario()
+
+        df = self.agregado_diario.tendencia(granularidade, inicio, fim)
+        if df.empty:
+            return pd.DataFrame(columns=["periodo", "unidade", "Leads"])
+
+        # Normalização e tradução sobre os valores distintos; estágios somados via kernel
+        normalizar = lambda x: str(x).strip().upper()
+        df["unidade"] = mapear_categorias(df["unidade"], normalizar, valor_nulo="NAN")
+        if unidades is not None:
+            df = df[df["unidade"].isin([normalizar(u) for u in unidades])]
+
+        tabela = df.groupby(
+            ["periodo", "unidade", "hs_pipeline_stage"], dropna=False, observed=True
+        )["Leads"].sum().unstack(fill_value=0)
+        nomes, valores = agrupar_colunas(
+            tabela.to_numpy(), [self.traduzir_estagio(c) for c in tabela.columns]
+        )
+        resultado = pd.DataFrame(valores, columns=nomes, index=tabela.index)
+        resultado["Leads"] = resultado.sum(axis=1)
+        return resultado.reset_index()
 
-    def _get_erp_data(self):
-        """Busca dados financeiros/acadêmicos do ERP"""
+    def _get_erp_data(self, ignorar_cache=False):
+        """Busca dados financeiros/acadêmicos do ERP (matrículas somadas sobre self.periodos_letivos)"""
         self.logger.info("Extraindo dados do ERP...")
-        query = """
-        SELECT 
-            T1.FILIAL AS unidade, 
-            COUNT(DISTINCT T1.RA) AS Matricula
-        FROM Z_PAINELMATRICULA T1
-        INNER JOIN Tabela_Matrizcurricular T2 
-            ON T1.GRADE = T2.GRADE 
-            AND T1.CODCOLIGADA = T2.CODCOLIGADA
-            AND T1.CODFILIAL = T2.CODFILIAL
-        WHERE T1.CODPERLET IN ('2026')
-        AND T1.STATUS IN ('Matriculado', 'Pré-Matriculado')
-        AND T2.[Matricula Validade] = 'S'
-        GROUP BY T1.FILIAL
+        df = self.get_matriculas_por_periodo(self.periodos_letivos, ignorar_cache=ignorar_cache)
+        if df.empty:
+            return pd.DataFrame()
+        return df.groupby("unidade", observed=True)["Matricula"].sum().reset_index()
+
+    # --- Matrículas por período letivo ---
+
+    def periodo_fechado(self, periodo):
+        """Períodos anteriores ao PERIODO_LETIVO do config.json estão encerrados."""
+        try:
+            return int(periodo) < int(self.periodo_ativo)
+        except (TypeError, ValueError):
+            return False
+
+    def get_matriculas_por_periodo(self, periodos=None, ignorar_cache=False):
+        """
+        Matrículas por (unidade, periodo_letivo), uma consulta por período executada em paralelo.
+
+        Períodos encerrados ficam no cache sem expirar (TTL_PERIODO_FECHADO): depois da primeira
+        execução só o período ativo volta ao banco. ignorar_cache força a releitura de todos.
+        """
+        periodos = [str(p) for p in (periodos or self.periodos_letivos)]
+        tarefas = {
+            periodo: partial(
+                self._executar_consulta,
+                "funil.erp_matriculas",
+                {"codperlet": periodo, "statuses": self.STATUS_MATRICULADO},
+                f"ERP {periodo}",
+                ignorar_cache,
+                ttl=self.TTL_PERIODO_FECHADO if self.periodo_fechado(periodo) else None,
+            )
+            for periodo in dict.fromkeys(periodos)
+        }
+        resultados, _, _ = executar_em_paralelo(
+            tarefas, max_workers=self.MAX_WORKERS_EXTRACAO, fallback=pd.DataFrame
+        )
+
+        blocos = [resultados[p] for p in tarefas if not resultados[p].empty]
+        if not blocos:
+            return pd.DataFrame(columns=["unidade", "periodo_letivo", "Matricula"])
+        df = concatenar_blocos(blocos)
+        df["periodo_letivo"] = df["periodo_letivo"].astype(str)
+        return df
+
+    def comparar_matriculas(self, periodos):
+        """
+        Comparativo de matrículas entre períodos letivos: uma linha por unidade (normalizada),
+        colunas "Matricula (<período>)" e, para cada par consecutivo, "Matricula Var% (<ant>→<atual>)"
+        e "Matricula Delta (<ant>→<atual>)".
         """
+        periodos = sorted(dict.fromkeys(str(p) for p in periodos))
+        df = self.get_matriculas_por_periodo(periodos)
+        if df.empty:
+            return pd.DataFrame(columns=["unidade"])
+
+        unidade = mapear_categorias(df["unidade"], lambda x: str(x).strip().upper(), valor_nulo="NAN")
+        tabela = (
+            df.groupby([unidade.astype(str), df["periodo_letivo"]], observed=True)["Matricula"].sum()
+            .unstack(fill_value=0)
+            .reindex(columns=periodos, fill_value=0)
+        )
+        resultado = tabela.rename(columns=lambda p: f"Matricula ({p})")
+        for anterior, atual in zip(periodos, periodos[1:]):
+            base = tabela[anterior].astype("float64")
+            delta = tabela[atual] - tabela[anterior]
+            resultado[f"Matricula Var% ({anterior}→{atual})"] = (delta / base.where(base != 0)).astype("float64")
+            resultado[f"Matricula Delta ({anterior}→{atual})"] = delta
+        return resultado.rename_axis("unidade").reset_index()
+
+    def _executar_consulta(self, nome, params, rotulo, ignorar_cache=False, ttl=None):
+        """Executa uma consulta do registro; em caso de erro loga e devolve DataFrame vazio."""
         try:
             with self.db.connect() as conn:
-                df = pd.read_sql(text(query), conn)
-                return df
+                return self.queries.executar(nome, conn, params, ignorar_cache=ignorar_cache, ttl=ttl)
         except Exception as e:
-            self.logger.error(f"Erro query ERP: {e}")
+            self.logger.error(f"Erro query {rotulo}: {e}")
             return pd.DataFrame()
 
     def _process_data(self, df_crm, df_erp):
         """Cruza os dados do CRM e ERP pela Unidade, Traduz os Códigos do Pipeline e Pivota"""
 
         # 1. Normalização das Chaves (Unidade) - Upper e Strip para garantir o match
-        if not df_crm.empty:
-            df_crm["unidade"] = df_crm["unidade"].astype(str).str.strip().str.upper()
-
+        # (aplicado às categorias distintas, não a cada linha)
+        normalizar = lambda x: str(x).strip().upper()
         if not df_erp.empty:
-            df_erp["unidade"] = df_erp["unidade"].astype(str).str.strip().str.upper()
+            df_erp["unidade"] = mapear_categorias(df_erp["unidade"], normalizar, valor_nulo="NAN")
 
         # 2. Tratamento do CRM (Tradução dos Códigos e Pivotagem)
         if not df_crm.empty:
-            # --- MAPA DE TRADUÇÃO (DE-PARA) ---
-            # Converte os IDs numéricos do HubSpot para os nomes usados no Dashboard
-            stage_mapper = {
-                "1018380105": "Novos Leads",  # LEADS (Entrada)
-                "1018380106": "Leads Contatados",  # LEADS_CONTATADOS
-                "1022335280": "Visita Agendada",  # AGENDAMENTO_REALIZADO (Nome exato do Card)
-                "1018314554": "Visita Realizada",  # VISITA_REALIZADA (Nome exato do Card)
-                "1111696774": "Matriculado CRM",  # MATRICULADO_TOTAL (No CRM)
-                "1018314555": "Declinado",  # DECLINADO
-            }
-
-            # Garante que a coluna de estágio seja string limpa para bater com o dicionário
-            df_crm["hs_pipeline_stage"] = (
-                df_crm["hs_pipeline_stage"].astype(str).str.strip()
+            # Pivota em uma passada: matriz unidade x estágio (values = Leads) sobre códigos inteiros;
+            # normalização da unidade e tradução do estágio somam linhas/colunas da matriz.
+            unidades, estagios, matriz = montar_matriz(
+                df_crm["unidade"], df_crm["hs_pipeline_stage"], pesos=df_crm["Leads"]
             )
-
-            # Aplica a tradução. Se o código não estiver no mapa, mantém o original.
-            df_crm["hs_pipeline_stage"] = df_crm["hs_pipeline_stage"].replace(
-                stage_mapper
+            nomes_unidade, matriz = agrupar_linhas(matriz, [normalizar(u) for u in unidades])
+            presentes = matriz.sum(axis=0) > 0
+            nomes_estagio, matriz = agrupar_colunas(
+                matriz[:, presentes], [self.traduzir_estagio(e) for e, p in zip(estagios, presentes) if p]
             )
-
-            # Pivota: Transforma linhas (estágios) em colunas
-            # index = Unidade
-            # columns = Estágios (Visita Agendada, Visita Realizada, etc.)
-            # values = Leads (contagem)
-            df_crm_pivot = df_crm.pivot_table(
-                index="unidade",
-                columns="hs_pipeline_stage",
-                values="Leads",
-                aggfunc="sum",
-                fill_value=0,
+            df_crm_pivot = pd.DataFrame(
+                matriz, columns=nomes_estagio, index=pd.Index(nomes_unidade, name="unidade")
             )
 
             # 3. Cálculo do Total de LEADS
@@ -183,6 +511,7 @@ class FunnelEngine:
 
         # 6. Merge Final (União CRM + ERP)
         # Outer Join: Mantém unidades que só existem no CRM e unidades que só existem no ERP
+        df_erp = df_erp.astype({"unidade": str})
         df_final = pd.merge(df_crm_pivot, df_erp, on="unidade", how="outer").fillna(0)
 
         # 7. Limpeza Final
@@ -193,3 +522,29 @@ class FunnelEngine:
                 df_final[col] = 0
 
         return df_final
+
+
+def _registrar_consultas(registro):
+    """Registra as consultas do funil (uma por variação de texto SQL)."""
+    registro.registrar(
+        "funil.crm_detalhado", FunnelEngine.SQL_CRM_DETALHADO, {"data_inicio": "data"},
+        ttl=FunnelEngine.TTL_CRM, esquema=FunnelEngine.ESQUEMA_CRM,
+    )
+    for bucket, expr in FunnelEngine.BUCKETS_CRM.items():
+        if bucket and not expr:
+            continue
+        nome = "funil.crm_agregado" + (f"_{bucket}" if bucket else "")
+        sql = FunnelEngine.SQL_CRM_AGREGADO.format(
+            col_periodo=f", {expr} AS periodo" if expr else "",
+            group_periodo=f", {expr}" if expr else "",
+        )
+        registro.registrar(
+            nome, sql, {"data_inicio": "data"}, ttl=FunnelEngine.TTL_CRM, esquema=FunnelEngine.ESQUEMA_CRM
+        )
+    registro.registrar(
+        "funil.erp_matriculas",
+        FunnelEngine.SQL_ERP_MATRICULAS,
+        {"codperlet": "texto", "statuses": "lista_texto"},
+        ttl=FunnelEngine.TTL_ERP,
+        esquema=FunnelEngine.ESQUEMA_ERP,
+    )
@@ -0,0 +1,180 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+from src.utils.query_registry import get_query_registry
+from src.utils.persistencia import gravar_dataframe, ler_dataframe, gravar_json, ler_json
+from src.utils.esquema_ingestao import concatenar_blocos
+
+
+class EspelhoCRM:
+    """
+    Espelho local das linhas de Tabela_Leads_Raiz_v2 usadas pelo funil, indexado por hs_object_id.
+
+    A cada sincronização busca apenas os leads com hs_lastmodifieddate posterior à
+    marca d'água da última execução, faz upsert no espelho e o funil é recalculado
+    localmente. Uma recarga completa acontece na primeira execução, quando o
+    DATA_INICIO muda ou a cada RESYNC_COMPLETO_DIAS (captura leads excluídos no CRM).
+    """
+
+    COLUNAS = ["hs_object_id", "unidade", "hs_pipeline_stage", "hs_createdate", "hs_lastmodifieddate"]
+
+    # Tipos na ingestão; unidade/estágio como category mantêm o espelho compacto em memória e no Parquet
+    ESQUEMA = {
+        "hs_object_id": "inteiro",
+        "unidade": "categoria",
+        "hs_pipeline_stage": "categoria",
+        "hs_createdate": "data",
+        "hs_lastmodifieddate": "data",
+    }
+
+    # Sobreposição da marca d'água: cobre registros gravados com o mesmo timestamp da última leitura
+    SOBREPOSICAO = timedelta(minutes=5)
+    RESYNC_COMPLETO_DIAS = 7
+
+    SQL_COMPLETO = """
+        SELECT hs_object_id, unidade, hs_pipeline_stage, hs_createdate, hs_lastmodifieddate
+        FROM Tabela_Leads_Raiz_v2
+        WHERE hs_createdate >= :data_inicio
+        """
+
+    SQL_DELTA = """
+        SELECT hs_object_id, unidade, hs_pipeline_stage, hs_createdate, hs_lastmodifieddate
+        FROM Tabela_Leads_Raiz_v2
+        WHERE hs_lastmodifieddate >= :marca_dagua
+        AND hs_createdate >= :data_inicio
+        """
+
+    def __init__(self, pasta="historico_dados_local/espelho_crm"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pasta = pasta
+        self.queries = get_query_registry()
+        self.queries.registrar_grupo("funil.crm_espelho", _registrar_consultas)
+        self._lock = threading.Lock()
+        self.df = None
+        self.estado = {}
+        # Última sincronização: {"completo": bool, "removidos": versões antigas, "novos": versões novas}
+        self.ultimo_delta = None
+        os.makedirs(self.pasta, exist_ok=True)
+
+    # --- Persistência ---
+
+    @property
+    def _caminho_dados(self):
+        """Caminho base (sem extensão) do DataFrame persistido."""
+        return os.path.join(self.pasta, "leads")
+
+    @property
+    def _caminho_estado(self):
+        return os.path.join(self.pasta, "estado.json")
+
+    def _carregar(self):
+        if self.df is not None:
+            return
+        try:
+            self.estado = ler_json(self._caminho_estado)
+            self.df = ler_dataframe(self._caminho_dados) if self.estado else None
+        except FileNotFoundError:
+            self.estado, self.df = {}, None
+        except Exception as e:
+            self.logger.warning(f"Espelho CRM ilegível, será recarregado: {e}")
+            self.estado, self.df = {}, None
+
+    def _salvar(self):
+        # Dados antes do estado: um estado novo nunca aponta para dados antigos
+        gravar_dataframe(self.df, self._caminho_dados)
+        gravar_json(self._caminho_estado, self.estado)
+
+    # --- Sincronização ---
+
+    def _precisa_recarga_completa(self, data_inicio):
+        if self.df is None or not self.estado.get("marca_dagua"):
+            return True
+        if self.estado.get("data_inicio") != data_inicio:
+            return True
+        ultima = datetime.fromisoformat(self.estado.get("ultima_carga_completa", "1900-01-01"))
+        return datetime.now() - ultima > timedelta(days=self.RESYNC_COMPLETO_DIAS)
+
+    @staticmethod
+    def _tipar(df):
+        """Colunas do espelho com chave int64 (as demais já chegam tipadas pelo ESQUEMA)."""
+        df = df[EspelhoCRM.COLUNAS].copy()
+        df["hs_object_id"] = df["hs_object_id"].astype("int64")
+        return df
+
+    def sincronizar(self, conexao, data_inicio, forcar_completo=False):
+        """
+        Atualiza o espelho a partir do banco. Retorna o número de linhas lidas do banco
+        (o total do período na recarga completa; só as alteradas no modo incremental).
+        """
+        with self._lock:
+            self._carregar()
+            completo = forcar_completo or self._precisa_recarga_completa(data_inicio)
+
+            if completo:
+                self.logger.info("Espelho CRM: recarga completa...")
+                novos = self.queries.executar(
+                    "funil.crm_espelho_completo", conexao, {"data_inicio": data_inicio}
+                )
+                self.df = self._tipar(novos)
+                self.estado["ultima_carga_completa"] = datetime.now().isoformat()
+                self.ultimo_delta = {"completo": True}
+            else:
+                marca = pd.Timestamp(self.estado["marca_dagua"]) - self.SOBREPOSICAO
+                novos = self.queries.executar(
+                    "funil.crm_espelho_delta", conexao,
+                    {"marca_dagua": marca, "data_inicio": data_inicio},
+                )
+                removidos = self.df.iloc[:0]
+                if not novos.empty:
+                    novos = self._tipar(novos)
+                    # Upsert por hs_object_id: a versão nova substitui a antiga
+                    substituidos = self.df["hs_object_id"].isin(novos["hs_object_id"])
+                    removidos = self.df[substituidos]
+                    self.df = concatenar_blocos([self.df[~substituidos], novos])
+                self.ultimo_delta = {"completo": False, "removidos": removidos, "novos": novos}
+                self.logger.info(f"Espelho CRM: {len(novos)} leads alterados desde {marca}.")
+
+            if not self.df.empty:
+                self.estado["marca_dagua"] = self.df["hs_lastmodifieddate"].max().isoformat()
+            self.estado["data_inicio"] = data_inicio
+            self.estado["atualizado_em"] = datetime.now().isoformat()
+            self._salvar()
+            return len(novos)
+
+    # --- Consulta ---
+
+    def agregar(self, bucket=None):
+        """
+        Mesmo formato do CRM agregado no banco: unidade, hs_pipeline_stage[, periodo], Leads.
+        bucket: None, 'dia', 'semana' ou 'mes' (sobre hs_createdate).
+        """
+        with self._lock:
+            if self.df is None or self.df.empty:
+                return pd.DataFrame(columns=["unidade", "hs_pipeline_stage", "Leads"])
+            df = self.df
+
+        chaves = [df["unidade"], df["hs_pipeline_stage"]]
+        if bucket:
+            datas = df["hs_createdate"].dt.normalize()
+            if bucket == "semana":
+                datas = datas - pd.to_timedelta(datas.dt.weekday, unit="D")
+            elif bucket == "mes":
+                datas = datas.dt.to_period("M").dt.to_timestamp()
+            chaves.append(datas.rename("periodo"))
+
+        return df.groupby(chaves, dropna=False, observed=True).size().rename("Leads").reset_index()
+
+
+def _registrar_consultas(registro):
+    """Registra as consultas de carga completa e incremental do espelho."""
+    registro.registrar(
+        "funil.crm_espelho_completo", EspelhoCRM.SQL_COMPLETO, {"data_inicio": "data"},
+        esquema=EspelhoCRM.ESQUEMA,
+    )
+    registro.registrar(
+        "funil.crm_espelho_delta", EspelhoCRM.SQL_DELTA, {"marca_dagua": "data", "data_inicio": "data"},
+        esquema=EspelhoCRM.ESQUEMA,
+    )
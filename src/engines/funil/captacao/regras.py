@@ -1,6 +1,18 @@
 import pandas as pd
 import unicodedata
 import logging
+from functools import lru_cache
+from src.utils.esquema_ingestao import mapear_categorias
+from src.engines.funil.captacao.agregacao import (
+    montar_matriz, agrupar_linhas, agrupar_colunas, funil_acumulado
+)
+
+
+@lru_cache(maxsize=None)
+def _dobrar_acentos(texto):
+    """Tabela memoizada de remoção de acentos (cada string distinta é decomposta uma única vez)."""
+    return ''.join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
 
 class FunnelBusinessRules:
     """
@@ -11,6 +23,8 @@ class FunnelBusinessRules:
         self.config = config
         self.unit_map = unit_map
         self.alias_to_canonical, self.inactive_units = self._build_alias_map()
+        # Memo valor bruto -> nome canônico (reaproveitado entre blocos e chamadas)
+        self._cache_unidades = {}
         
         # Colunas exigidas pela UI
         self.required_ui_columns = [
@@ -22,7 +36,7 @@ class FunnelBusinessRules:
     # Helpers de Texto 
     def remove_accents(self, text):
         if not isinstance(text, str): return text
-        return ''.join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+        return _dobrar_acentos(text)
 
     def _normalize_key(self, text):
         if not isinstance(text, str): return str(text)
@@ -65,55 +79,122 @@ class FunnelBusinessRules:
         key = self._normalize_key(str(name))
         return self.alias_to_canonical.get(key, name)
 
+    def _normaliza_nome_marca_memo(self, name):
+        try:
+            return self._cache_unidades[name]
+        except KeyError:
+            canonico = self._cache_unidades[name] = self.normaliza_nome_marca(name)
+            return canonico
+        except TypeError:
+            # Valor não hasheável: normaliza sem memo
+            return self.normaliza_nome_marca(name)
+
+    def normalizar_unidades(self, serie):
+        """
+        Versão vetorizada de serie.apply(normaliza_nome_marca): fatora a coluna, normaliza
+        cada valor distinto uma única vez (memo entre chamadas) e remapeia os códigos.
+        Devolve coluna categórica com os nomes canônicos.
+        """
+        return mapear_categorias(
+            serie, self._normaliza_nome_marca_memo, valor_nulo=self.normaliza_nome_marca(None)
+        )
+
     # --- Lógica de Transformação CRM ---
+    COHORT_COLS_MAP = {
+        "LEADS": "Inertes em Lead",
+        "LEADS_CONTATADOS": "Aguardando Agendamento",
+        "AGENDAMENTO_REALIZADO": "Aguardando Visita",
+        "VISITA_REALIZADA": "Em Negociação",
+        "MATRICULADO_TOTAL": "Finalizados (Matrícula)"
+    }
+
+    # Colunas do funil acumulado -> peso mínimo do estágio
+    NIVEIS_ACUMULADOS = {
+        "Leads": 0,
+        "Contato Produtivo": 2,
+        "Visita Agendada": 3,
+        "Visita Realizada": 4,
+    }
+
+    def _pesos_estagio(self):
+        return {
+            self.config.get("LEADS", "1018380105"): 1,
+            self.config.get("LEADS_CONTATADOS", "1018380106"): 2,
+            self.config.get("AGENDAMENTO_REALIZADO", "1022335280"): 3,
+            self.config.get("VISITA_REALIZADA", "1018314554"): 4,
+            self.config.get("MATRICULADO_TOTAL", "1111696774"): 5
+        }
+
     def transformar_dados_crm(self, df):
         """
         Recebe o DataFrame bruto do SQL do CRM e aplica as regras de funil:
         labels, pesos, cohort e acumulação.
+
+        Uma passada sobre as linhas (matriz unidade x estágio em agregacao.montar_matriz);
+        normalização de unidade, rótulos, cohort e acumulados são feitos sobre a matriz.
+        Se houver coluna Leads (CRM pré-agregado), ela é usada como contagem.
         """
         if df.empty: return pd.DataFrame()
 
-        # 1. Normalização de Unidade
-        df["unidade"] = df["unidade"].apply(self.normaliza_nome_marca)
+        pesos = df["Leads"] if "Leads" in df.columns else None
+        unidades, estagios, matriz = montar_matriz(df["unidade"], df["hs_pipeline_stage"], pesos)
+
+        # 1. Normalização de Unidade (por valor distinto; aliases somam na mesma linha)
+        nomes, matriz = agrupar_linhas(matriz, [self._normaliza_nome_marca_memo(u) for u in unidades])
 
-        # 2. Mapeamento de Status
+        # 2. Mapeamento de Status (código do estágio como texto simples)
+        codigos = [str(e) for e in estagios]
         stage_labels = {v: k for k, v in self.config.items()}
-        df["status_atual"] = df["hs_pipeline_stage"].map(stage_labels).fillna("OUTROS")
-        
+        status = [stage_labels.get(c, "OUTROS") for c in codigos]
+
         # 3. Cohort (Onde o lead está parado hoje)
-        cohort_cols_map = {
-            "LEADS": "Inertes em Lead",
-            "LEADS_CONTATADOS": "Aguardando Agendamento",
-            "AGENDAMENTO_REALIZADO": "Aguardando Visita",
-            "VISITA_REALIZADA": "Em Negociação",
-            "MATRICULADO_TOTAL": "Finalizados (Matrícula)"
-        }
-        
-        cohort_counts = df.groupby(["unidade", "status_atual"]).size().unstack(fill_value=0)
-        cohort_counts = cohort_counts.rename(columns=cohort_cols_map)
+        presentes = matriz.sum(axis=0) > 0
+        status_cohort, cohort = agrupar_colunas(
+            matriz[:, presentes], [s for s, p in zip(status, presentes) if p]
+        )
+
+        # 4. Pesos e Funil Acumulado (soma reversa acumulada sobre os pesos)
+        weights = self._pesos_estagio()
+        acumulado = funil_acumulado(
+            matriz, [weights.get(c, 0) for c in codigos], list(self.NIVEIS_ACUMULADOS.values())
+        )
 
-        # 4. Cálculo de Pesos e Funil Acumulado
-        weights = {
-            self.config.get("LEADS", "1018380105"): 1,
-            self.config.get("LEADS_CONTATADOS", "1018380106"): 2,
-            self.config.get("AGENDAMENTO_REALIZADO", "1022335280"): 3,
-            self.config.get("VISITA_REALIZADA", "1018314554"): 4,
-            self.config.get("MATRICULADO_TOTAL", "1111696774"): 5
-        }
-        
-        df["rank"] = df["hs_pipeline_stage"].map(weights).fillna(0)
-        df["Leads"] = 1 
-        df["Contato Produtivo"] = (df["rank"] >= 2).astype(int)
-        df["Visita Agendada"] = (df["rank"] >= 3).astype(int)
-        df["Visita Realizada"] = (df["rank"] >= 4).astype(int)
-        
-        cols_accum = ["Leads", "Contato Produtivo", "Visita Agendada", "Visita Realizada"]
-        res_acumulado = df.groupby("unidade")[cols_accum].sum().reset_index()
-        
         # Merge final do processamento CRM
-        df_merged = pd.merge(res_acumulado, cohort_counts, on="unidade", how="left").fillna(0)
+        df_merged = pd.DataFrame(acumulado, columns=list(self.NIVEIS_ACUMULADOS))
+        df_merged.insert(0, "unidade", nomes)
+        colunas_cohort = [self.COHORT_COLS_MAP.get(s, s) for s in status_cohort]
+        df_merged[colunas_cohort] = cohort
         return df_merged
 
+    # --- Agregação Incremental (Streaming) ---
+    def acumular_bloco_crm(self, acumulado, df_bloco):
+        """
+        Hook de agregação incremental: transforma um bloco bruto do CRM e soma
+        ao acumulado (indexado por unidade). Todas as colunas do funil são contagens,
+        então a soma dos blocos é igual ao processamento do resultado inteiro.
+        """
+        parcial = self.transformar_dados_crm(df_bloco)
+        if parcial.empty:
+            return acumulado
+
+        parcial = parcial.set_index("unidade")
+        if acumulado is None:
+            return parcial
+        return acumulado.add(parcial, fill_value=0)
+
+    def transformar_dados_crm_em_blocos(self, blocos):
+        """
+        Consome um iterável de DataFrames (ex: EngineBase.executar_query_em_blocos)
+        e devolve o mesmo resultado de transformar_dados_crm com memória constante.
+        """
+        acumulado = None
+        for df_bloco in blocos:
+            acumulado = self.acumular_bloco_crm(acumulado, df_bloco)
+
+        if acumulado is None:
+            return pd.DataFrame()
+        return acumulado.fillna(0).astype(int).reset_index()
+
     # --- Lógica de Consolidação Final ---
     def consolidar_relatorios(self, df_crm, df_erp):
         """
@@ -121,10 +202,10 @@ class FunnelBusinessRules:
         """
         # Merge
         df_final = pd.merge(df_crm, df_erp, on="unidade", how="outer").fillna(0)
-        df_final["unidade"] = df_final["unidade"].apply(self.normaliza_nome_marca)
+        df_final["unidade"] = self.normalizar_unidades(df_final["unidade"])
         
         # Agrupamento final para garantir unicidade
-        df_final = df_final.groupby("unidade", as_index=False).sum(numeric_only=True)
+        df_final = df_final.groupby("unidade", as_index=False, observed=True).sum(numeric_only=True)
 
         # Filtro de inativos e vazios
         df_final = df_final[~df_final["unidade"].isin(self.inactive_units)]
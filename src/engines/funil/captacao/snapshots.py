@@ -0,0 +1,184 @@
+import os
+import re
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.utils.persistencia import (
+    gravar_dataframe, ler_dataframe, gravar_json, ler_json, remover_arquivo,
+)
+
+
+class SnapshotsFunil:
+    """
+    Fotografias diárias do funil consolidado (unidade x métrica), uma por dia de execução.
+
+    Cada dia vira um arquivo pequeno (a última execução do dia substitui as anteriores)
+    e o indice.json guarda as datas disponíveis, então comparar com D-1 / D-7 lê só
+    o arquivo da data de referência. As colunas de variação seguem o padrão que o
+    GeradorRelatorio já ordena e colore ("<métrica> Var% (...)" e "<métrica> Delta (...)").
+    """
+
+    RETENCAO_DIAS = 400
+    CHAVE = "unidade"
+
+    _RE_REFERENCIA = re.compile(r"^D-(\d+)$", re.IGNORECASE)
+
+    def __init__(self, pasta="historico_dados_local/snapshots_funil"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._indice = None
+        self._memoria = {}
+        os.makedirs(self.pasta, exist_ok=True)
+
+    # --- Índice ---
+
+    @property
+    def _caminho_indice(self):
+        return os.path.join(self.pasta, "indice.json")
+
+    def _caminho_dia(self, dia):
+        """Caminho base (sem extensão) do arquivo do dia; o formato é escolhido na gravação."""
+        return os.path.join(self.pasta, dia.isoformat())
+
+    def _carregar_indice(self):
+        if self._indice is None:
+            self._indice = ler_json(self._caminho_indice, descricao="Índice de snapshots")
+        return self._indice
+
+    def _salvar_indice(self):
+        gravar_json(self._caminho_indice, self._indice)
+
+    def datas(self):
+        """Datas com snapshot, em ordem crescente."""
+        with self._lock:
+            return sorted(date.fromisoformat(d) for d in self._carregar_indice())
+
+    # --- Gravação ---
+
+    def gravar(self, df, dia=None):
+        """
+        Grava a fotografia do dia (padrão: hoje) com a chave e as colunas numéricas de `df`.
+        Inteiros ficam em int32 e a unidade como category (arquivo e memória compactos).
+        """
+        if df is None or df.empty or self.CHAVE not in df.columns:
+            return None
+
+        dia = pd.Timestamp(dia or date.today()).date()
+        metricas = [c for c in df.columns if c != self.CHAVE and pd.api.types.is_numeric_dtype(df[c])]
+        foto = df[[self.CHAVE] + metricas].copy()
+        foto[self.CHAVE] = foto[self.CHAVE].astype(str).astype("category")
+        for coluna in metricas:
+            if pd.api.types.is_integer_dtype(foto[coluna]) or (foto[coluna] % 1 == 0).all():
+                foto[coluna] = foto[coluna].astype("int32")
+        foto = foto.groupby(self.CHAVE, observed=True).sum().reset_index()
+
+        with self._lock:
+            # Parquet com fallback para pickle (escrita atômica)
+            caminho = gravar_dataframe(foto, self._caminho_dia(dia))
+
+            indice = self._carregar_indice()
+            indice[dia.isoformat()] = {
+                "arquivo": os.path.basename(caminho),
+                "unidades": len(foto),
+                "metricas": metricas,
+                "gravado_em": datetime.now().isoformat(),
+            }
+            self._memoria.pop(dia, None)
+            self._aplicar_retencao()
+            self._salvar_indice()
+        return dia
+
+    def _aplicar_retencao(self):
+        """Remove snapshots mais antigos que RETENCAO_DIAS em relação ao mais recente."""
+        mais_recente = max(date.fromisoformat(d) for d in self._indice)
+        limite = mais_recente - timedelta(days=self.RETENCAO_DIAS)
+        for chave in [d for d in self._indice if date.fromisoformat(d) < limite]:
+            info = self._indice.pop(chave)
+            self._memoria.pop(date.fromisoformat(chave), None)
+            remover_arquivo(os.path.join(self.pasta, info["arquivo"]))
+
+    # --- Leitura ---
+
+    def carregar(self, dia):
+        """Fotografia de um dia (DataFrame unidade + métricas) ou None se não existir."""
+        dia = pd.Timestamp(dia).date()
+        with self._lock:
+            if dia in self._memoria:
+                return self._memoria[dia]
+            info = self._carregar_indice().get(dia.isoformat())
+            if info is None:
+                return None
+            try:
+                foto = ler_dataframe(os.path.join(self.pasta, info["arquivo"]))
+            except Exception as e:
+                self.logger.warning(f"Snapshot de {dia} ilegível: {e}")
+                return None
+            self._memoria[dia] = foto
+            return foto
+
+    def resolver(self, referencia, dia_base=None):
+        """
+        Data de snapshot para uma referência: 'D-N' (o snapshot mais recente até N dias antes
+        do dia base, cobrindo fins de semana sem execução) ou uma data explícita (exata).
+        """
+        dia_base = pd.Timestamp(dia_base or date.today()).date()
+        m = self._RE_REFERENCIA.match(str(referencia).strip())
+        if not m:
+            alvo = pd.Timestamp(referencia).date()
+            return alvo if alvo in self.datas() else None
+
+        limite = dia_base - timedelta(days=int(m.group(1)))
+        candidatas = [d for d in self.datas() if d <= limite]
+        return candidatas[-1] if candidatas else None
+
+    # --- Comparação ---
+
+    def comparar(self, df_atual, referencias=("D-1", "D-7"), metricas=None, dia_base=None):
+        """
+        Acrescenta a df_atual as colunas "<métrica> Var% (<ref> dd/mm)" e "<métrica> Delta (<ref> dd/mm)"
+        alinhando por unidade com o snapshot de cada referência (um merge por referência).
+        Unidades sem histórico ficam com NaN; Var% também fica NaN quando a base é zero.
+        """
+        if df_atual is None or df_atual.empty:
+            return df_atual
+
+        if metricas is None:
+            metricas = [
+                c for c in df_atual.columns
+                if c != self.CHAVE and pd.api.types.is_numeric_dtype(df_atual[c])
+            ]
+        resultado = df_atual.copy()
+        chave_atual = resultado[self.CHAVE].astype(str)
+
+        for referencia in referencias:
+            dia = self.resolver(referencia, dia_base)
+            foto = self.carregar(dia) if dia else None
+            if foto is None:
+                self.logger.info(f"Sem snapshot para {referencia}; colunas de variação omitidas.")
+                continue
+
+            comuns = [m for m in metricas if m in foto.columns]
+            anterior = (
+                pd.DataFrame({self.CHAVE: chave_atual})
+                .merge(foto.astype({self.CHAVE: str})[[self.CHAVE] + comuns], on=self.CHAVE, how="left")
+            )
+            atual = resultado[comuns].to_numpy(dtype="float64")
+            base = anterior[comuns].to_numpy(dtype="float64")
+            delta = atual - base
+            with np.errstate(divide="ignore", invalid="ignore"):
+                var_pct = np.where(base != 0, delta / base, np.nan)
+
+            rotulo = f"{referencia} {dia.strftime('%d/%m')}" if self._RE_REFERENCIA.match(str(referencia)) \
+                else dia.strftime("%d/%m/%Y")
+            novas = {}
+            for i, metrica in enumerate(comuns):
+                novas[f"{metrica} Var% ({rotulo})"] = var_pct[:, i]
+                novas[f"{metrica} Delta ({rotulo})"] = delta[:, i]
+            resultado = pd.concat([resultado, pd.DataFrame(novas, index=resultado.index)], axis=1)
+
+        return resultado
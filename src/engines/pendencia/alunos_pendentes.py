@@ -34,25 +34,37 @@ class EnginePendencia:
         
         self.df_final = None
 
-    def executar(self):
+    def executar(self, chunksize=None):
         """
         Método único que roda todo o processo: Extração -> Transformação -> Carga (Relatório)
+        Se `chunksize` for informado, extração e regras rodam em streaming (memória limitada ao bloco).
         """
         logging.info("Orchestrator: Iniciando carga SQL (PendenciaEngine)...")
         
         # 1. Extração SQL
-        df_bruto = self.loader.get_pendentes()
         set_matriculados = self.loader.get_matriculados_ra()
-        
-        if df_bruto is None:
-            logging.error("Orchestrator: Falha crítica na carga de dados SQL.")
-            return False
 
-        logging.info("Orchestrator: Dados carregados. Iniciando regras de negócio e cruzamento...")
-        
-        # 2. Aplicação de Regras
-        # 5. Correção: O método no regras.py é 'aplicar_regras', não 'preparar_dados'
-        self.df_final = self.regras.aplicar_regras(df_bruto, set_matriculados)
+        if chunksize:
+            # Regras aplicadas bloco a bloco, conforme as linhas chegam do banco
+            blocos = self.loader.get_pendentes_em_blocos(chunksize=chunksize)
+            try:
+                self.df_final = self.regras.aplicar_regras_em_blocos(blocos, set_matriculados)
+            except Exception as e:
+                # Resultado parcial não vira relatório nem fotografia do histórico
+                logging.error(f"Orchestrator: Falha crítica na carga de dados SQL em blocos: {e}")
+                return False
+        else:
+            df_bruto = self.loader.get_pendentes()
+            
+            if df_bruto is None:
+                logging.error("Orchestrator: Falha crítica na carga de dados SQL.")
+                return False
+
+            logging.info("Orchestrator: Dados carregados. Iniciando regras de negócio e cruzamento...")
+            
+            # 2. Aplicação de Regras
+            # 5. Correção: O método no regras.py é 'aplicar_regras', não 'preparar_dados'
+            self.df_final = self.regras.aplicar_regras(df_bruto, set_matriculados)
         
         qtd_pendentes = len(self.df_final) if self.df_final is not None else 0
         logging.info(f"Orchestrator: Processamento concluído. Total de pendências reais: {qtd_pendentes}")
@@ -1,7 +1,14 @@
 import pandas as pd
 import os
-from datetime import datetime
+import time
+import hashlib
+from datetime import datetime, timedelta
 from src.engines.base import EngineBase
+import numpy as np
+from src.utils.esquema_ingestao import mapear_categorias, ordenar_lista_agregada
+from src.utils.exportador_async import get_exportador
+from src.engines.pendencia.indice_ra import IndiceRA
+from src.engines.pendencia.exclusoes import RegrasExclusao, get_regras_exclusao
 
 
 class PendenciaEngine(EngineBase):
@@ -15,18 +22,8 @@ class PendenciaEngine(EngineBase):
     - Limpeza visual via Pandas.
     """
 
-    SQL_PENDENTES_AVANCADO = """
-    WITH CTE_MatrizValida AS (
-        SELECT DISTINCT 
-            CAST(CODCOLIGADA AS VARCHAR) AS CODCOLIGADA, 
-            CAST(CODFILIAL AS VARCHAR) AS CODFILIAL, 
-            UPPER(LTRIM(RTRIM(GRADE))) AS GRADE
-        FROM Tabela_Matrizcurricular
-        WHERE [Matricula Validade] = 'S'
-    ),
-    
-    CTE_DadosBrutos AS (
-        SELECT 
+    # Colunas e filtros do painel compartilhados pelos dois modos de execução (servidor e local)
+    SQL_COLUNAS_PAINEL = """
             CAST(P.CODCOLIGADA AS VARCHAR) AS CODCOLIGADA,
             P.CODFILIAL,
             CASE 
@@ -46,24 +43,35 @@ class PendenciaEngine(EngineBase):
             UPPER(LTRIM(RTRIM(P.GRADE))) AS GRADE,
             UPPER(LTRIM(RTRIM(P.TURNO))) AS Turno,
             UPPER(LTRIM(RTRIM(P.STATUS))) AS Status_CRM,
-            P.[DATA CADASTRO] AS Data_Cadastro
+            P.[DATA CADASTRO] AS Data_Cadastro"""
+
+    # Só os filtros sargáveis; as exclusões de teste/lixo vêm do exclusoes_pendencia.json (RegrasExclusao)
+    SQL_FILTROS_PAINEL = """
+            P.CODPERLET = :codperlet
+            AND P.STATUS = :status"""
+
+    SQL_MATRIZ_VALIDA = """
+        SELECT DISTINCT 
+            CAST(CODCOLIGADA AS VARCHAR) AS CODCOLIGADA, 
+            CAST(CODFILIAL AS VARCHAR) AS CODFILIAL, 
+            UPPER(LTRIM(RTRIM(GRADE))) AS GRADE
+        FROM Tabela_Matrizcurricular
+        WHERE [Matricula Validade] = 'S'"""
+
+    # Modo servidor: validação da grade, deduplicação e agregação no banco (uma consulta)
+    SQL_PENDENTES_AVANCADO = f"""
+    WITH CTE_MatrizValida AS ({SQL_MATRIZ_VALIDA}
+    ),
+    
+    CTE_DadosBrutos AS (
+        SELECT {SQL_COLUNAS_PAINEL}
             -- Removemos o DATEDIFF daqui, faremos no agrupamento final
         FROM Z_PAINELMATRICULA P
         INNER JOIN CTE_MatrizValida M 
             ON CAST(P.CODCOLIGADA AS VARCHAR) = M.CODCOLIGADA 
             AND CAST(P.CODFILIAL AS VARCHAR) = M.CODFILIAL 
             AND UPPER(LTRIM(RTRIM(P.GRADE))) = M.GRADE
-        WHERE 
-            P.CODPERLET = '2026'
-            AND P.STATUS = 'Pendente'
-            AND P.ALUNO NOT LIKE '%TESTE%'
-            AND P.ALUNO NOT LIKE '%SARAH DAWSEY%' 
-            AND P.ALUNO NOT LIKE '%ESCOLA%'       
-            AND P.ALUNO NOT LIKE '%INFANTIL%'     
-            AND NOT (P.NOMEGRUPO LIKE '%QI%' AND P.FILIAL LIKE '%BOTAFOGO%')
-            AND NOT (P.NOMEGRUPO LIKE '%UNIFICADO%' AND P.FILIAL LIKE '%RAMIRO%')
-            AND NOT (P.NOMEGRUPO LIKE '%AO CUBO%' AND (P.FILIAL LIKE '%RECREIO%' OR P.FILIAL LIKE '%TIJUCA%'))
-            AND NOT (P.NOMEGRUPO LIKE '%APOGEU%' AND (P.FILIAL LIKE '%DIVINÓPOLIS%' OR P.FILIAL LIKE '%UBÁ%'))
+        WHERE {SQL_FILTROS_PAINEL}{{exclusoes}}
     )
 
     -- Etapa 3: Agrupamento final COM DATA MÍNIMA
@@ -98,60 +106,167 @@ class PendenciaEngine(EngineBase):
     ORDER BY Dias_Pendente DESC
     """
 
-    def __init__(self):
+    # Modo local: só os filtros sargáveis (CODPERLET, STATUS); exclusões, validação da grade
+    # (matriz em cache) e agrupamento são feitos em memória sobre as linhas em cache
+    SQL_PENDENTES_LINHAS = f"""
+        SELECT {SQL_COLUNAS_PAINEL},
+            P.NOMEGRUPO,
+            P.FILIAL
+        FROM Z_PAINELMATRICULA P
+        WHERE {SQL_FILTROS_PAINEL}
+    """
+
+    CHAVES_MATRIZ = ["CODCOLIGADA", "CODFILIAL", "GRADE"]
+    CHAVES_PENDENTE = [
+        "CODCOLIGADA", "CODFILIAL", "Marca", "Filial_Tratada", "RA", "Aluno", "Curso", "Serie", "Status_CRM",
+    ]
+
+    # RAs distintos com matrícula no período (cruzamento pendente x matriculado)
+    SQL_MATRICULADOS_RA = """
+        SELECT DISTINCT LTRIM(RTRIM(P.RA)) AS RA
+        FROM Z_PAINELMATRICULA P
+        WHERE P.CODPERLET = :codperlet
+        AND P.STATUS IN :statuses
+        """
+
+    STATUS_MATRICULADO = ["Matriculado", "Pré-Matriculado"]
+
+    # Tipos das colunas na ingestão (textos repetidos viram category, datas com parse explícito)
+    ESQUEMA_PENDENTES = {
+        "CODCOLIGADA": "categoria",
+        "CODFILIAL": "inteiro",
+        "Marca": "categoria",
+        "Filial_Tratada": "categoria",
+        "RA": "texto",
+        "Aluno": "texto",
+        "Curso": "categoria",
+        "Serie": "categoria",
+        "GRADE": "categoria",
+        "Turno": "categoria",
+        "Status_CRM": "categoria",
+        "Data_Cadastro": "data",
+        "Dias_Pendente": "inteiro",
+    }
+
+    ESQUEMA_PENDENTES_LINHAS = {**ESQUEMA_PENDENTES, "NOMEGRUPO": "categoria", "FILIAL": "categoria"}
+
+    # Faixas de SLA na ordem de gravidade; LIMITES_SLA são os dias em que cada faixa seguinte começa
+    # (menos de 7 dias: Novo; de 7 a 90: Atenção; acima de 90: Crítico)
+    CATEGORIAS_SLA = ["Novo", "Atenção", "Crítico"]
+    LIMITES_SLA = [7, 91]
+
+    PERIODO_LETIVO_PADRAO = "2026"
+
+    # Validade (segundos) do resultado no cache de consultas
+    TTL_PENDENTES = 10 * 60
+    # A matriz curricular válida muda raramente: cache longo
+    TTL_MATRIZ_VALIDA = 12 * 60 * 60
+
+    # 'servidor': SQL_PENDENTES_AVANCADO (join e agrupamento no banco);
+    # 'local': SQL_PENDENTES_LINHAS + matriz válida em cache, join e agrupamento em memória
+    MODOS_PENDENTES = ("servidor", "local")
+    MODO_PENDENTES = "servidor"
+
+    # Índice de RAs matriculados persistido entre execuções (reaproveitado enquanto tiver menos que a validade)
+    PASTA_INDICE_RA = "historico_dados_local/indice_ra"
+    VALIDADE_INDICE_RA = timedelta(minutes=10)
+
+    # Dump da análise bruta (opt-in): formato em PENDENCIA_ANALISE_BRUTA no .env
+    # ('parquet', 'csv' ou 'xlsx'; vazio desliga). Gravado em segundo plano, com retenção.
+    PASTA_ANALISE_BRUTA = "historico_dados_local/analise_bruta"
+    MANTER_ANALISES = 10
+
+    def __init__(self, periodo_letivo=None, formato_analise=None, modo=None, exclusoes=None):
         super().__init__()
+        self.queries.registrar_grupo("pendencia", _registrar_consultas)
+        self.periodo_letivo = periodo_letivo or self.PERIODO_LETIVO_PADRAO
+        self.modo = modo or self.MODO_PENDENTES
+        if self.modo not in self.MODOS_PENDENTES:
+            raise ValueError(f"Modo inválido: {self.modo}. Use um de {list(self.MODOS_PENDENTES)}.")
+        if formato_analise is None:
+            formato_analise = os.getenv("PENDENCIA_ANALISE_BRUTA", "")
+        self.formato_analise = formato_analise.strip().lower() or None
 
-    def get_pendentes(self) -> pd.DataFrame:
-        self.logger.info("Executando Query 2026 Final (Agrupamento por Data Mínima)...")
+        # Exclusões de registros de teste/lixo (compiladas no WHERE do modo servidor e numa
+        # máscara no modo local); None = regras do exclusoes_pendencia.json, lidas no primeiro uso
+        self._exclusoes = exclusoes
+        self._consulta_pendentes = None
 
-        try:
-            df = self.executar_query(self.SQL_PENDENTES_AVANCADO)
+    @property
+    def exclusoes(self) -> RegrasExclusao:
+        if self._exclusoes is None:
+            self._exclusoes = get_regras_exclusao()
+        return self._exclusoes
 
-            if df is not None and not df.empty:
-                # Tratamento de datas
-                df["Data_Cadastro"] = pd.to_datetime(
-                    df["Data_Cadastro"], dayfirst=True, errors="coerce"
+    @property
+    def consulta_pendentes(self):
+        """
+        Nome da consulta do modo servidor para as exclusões desta engine: 'pendencia.pendentes'
+        com as regras do JSON; outras regras ganham uma consulta própria (registrada no primeiro uso).
+        """
+        if self._consulta_pendentes is None:
+            exclusoes = self.exclusoes
+            predicado = exclusoes.predicado_sql("P")
+            if predicado == get_regras_exclusao().predicado_sql("P"):
+                nome = "pendencia.pendentes"
+            else:
+                nome = "pendencia.pendentes." + hashlib.sha1(predicado.encode("utf-8")).hexdigest()[:10]
+                self.queries.registrar_grupo(
+                    nome, lambda registro: _registrar_consulta_pendentes(registro, nome, exclusoes)
                 )
+            self._consulta_pendentes = nome
+        return self._consulta_pendentes
 
-                # Tratamento numérico
-                df["Dias_Pendente"] = (
-                    pd.to_numeric(df["Dias_Pendente"], errors="coerce")
-                    .fillna(0)
-                    .astype(int)
-                )
+    def _params_pendentes(self):
+        return {"codperlet": self.periodo_letivo, "status": "Pendente"}
 
-                # Regra de SLA
-                def definir_prioridade(dias):
-                    if dias > 90:
-                        return "Crítico"
-                    if dias < 7:
-                        return "Novo"
-                    return "Atenção"
+    def _caminho_indice_ra(self):
+        return os.path.join(self.PASTA_INDICE_RA, f"matriculados_{self.periodo_letivo}.npz")
 
-                df["SLA_Status"] = df["Dias_Pendente"].apply(definir_prioridade)
+    def get_matriculados_ra(self, ignorar_cache=False) -> IndiceRA:
+        """
+        RAs matriculados no período como IndiceRA (inteiros ordenados, pertinência vetorizada).
 
-                # Normalização final
-                df["Marca"] = df["Marca"].astype(str).str.strip().str.upper()
-                df["Filial_Tratada"] = (
-                    df["Filial_Tratada"].astype(str).str.strip().str.upper()
-                )
+        O índice fica gravado em disco: dentro de VALIDADE_INDICE_RA é reaproveitado sem ir
+        ao banco; se a consulta falhar, o último índice gravado é usado (mesmo vencido).
+        """
+        caminho = self._caminho_indice_ra()
+        indice, meta = IndiceRA.carregar(caminho)
+        if indice is not None and not ignorar_cache:
+            idade = datetime.now() - datetime.fromisoformat(meta.get("gerado_em", "1900-01-01"))
+            if idade <= self.VALIDADE_INDICE_RA:
+                self.logger.info(f"Índice de matriculados reaproveitado: {len(indice)} RAs.")
+                return indice
 
-                # Limpeza e Ordenação Visual das Strings Agrupadas
-                def limpar_duplicatas_string(texto, separador):
-                    if pd.isna(texto):
-                        return ""
-                    items = [x.strip() for x in str(texto).split(separador)]
-                    return separador.join(sorted(set(items)))
+        params = {"codperlet": self.periodo_letivo, "statuses": self.STATUS_MATRICULADO}
+        try:
+            inicio = time.perf_counter()
+            df = self.queries.executar("pendencia.matriculados_ra", self.db_engine, params)
+            novo = IndiceRA.de_valores(df["RA"])
+            novo.salvar(caminho, periodo_letivo=self.periodo_letivo)
+            self.logger.info(
+                f"Índice de matriculados: {len(novo)} RAs em {time.perf_counter() - inicio:.2f}s."
+            )
+            return novo
+        except Exception as e:
+            if indice is not None:
+                self.logger.warning(f"Falha ao consultar matriculados ({e}); usando índice de {meta.get('gerado_em')}.")
+                return indice
+            self.logger.error(f"Falha ao consultar matriculados, cruzamento desativado: {e}")
+            return None
 
-                df["Turno"] = df["Turno"].apply(
-                    lambda x: limpar_duplicatas_string(x, ",")
-                )
-                df["GRADE"] = df["GRADE"].apply(
-                    lambda x: limpar_duplicatas_string(x, "|")
-                )
+    def get_pendentes(self, ignorar_cache=False) -> pd.DataFrame:
+        self.logger.info(f"Executando Query {self.periodo_letivo} Final (Agrupamento por Data Mínima)...")
 
-                # Geração automática do Excel de conferência
-                self.exportar_analise_bruta(df)
+        try:
+            df = self._consultar_pendentes(ignorar_cache)
+
+            if df is not None and not df.empty:
+                df = self._pos_processar(df)
+
+                # Dump de conferência (se habilitado) vai para a fila de gravação; não bloqueia o retorno
+                if self.formato_analise:
+                    self.exportar_analise_bruta(df)
 
             return df
 
@@ -159,11 +274,183 @@ class PendenciaEngine(EngineBase):
             self.logger.error(f"Erro Crítico no Engine: {e}")
             return None
 
-    def exportar_analise_bruta(self, df: pd.DataFrame):
+    def get_pendentes_em_blocos(self, chunksize: int = 50_000):
+        """
+        Versão em streaming de get_pendentes: gera blocos já pós-processados,
+        prontos para ProcessadorRegras.aplicar_regras_em_blocos.
+        Não gera o Excel de conferência (exige o resultado completo).
+        """
+        if self.modo == "local":
+            # O agrupamento local precisa de todas as linhas; os blocos saem do resultado pronto
+            df = self._consultar_pendentes()
+            for inicio in range(0, len(df), chunksize):
+                yield self._pos_processar(df.iloc[inicio:inicio + chunksize].copy())
+            return
+
+        self.logger.info(f"Executando Query {self.periodo_letivo} em blocos de {chunksize} linhas...")
+        # Datas já chegam tipadas pelo ESQUEMA_PENDENTES (parse ISO explícito, igual em todos os blocos)
+        blocos = self.executar_consulta_em_blocos(
+            self.consulta_pendentes, self._params_pendentes(), chunksize=chunksize
+        )
+        for bloco in blocos:
+            if not bloco.empty:
+                yield self._pos_processar(bloco)
+
+    # --- Consulta de pendentes (modo servidor / modo local) ---
+
+    def _consultar_pendentes(self, ignorar_cache=False) -> pd.DataFrame:
+        if self.modo == "local":
+            return self._consultar_pendentes_local(ignorar_cache)
+        return self.executar_consulta(self.consulta_pendentes, self._params_pendentes(), ignorar_cache=ignorar_cache)
+
+    def get_matriz_valida(self, ignorar_cache=False) -> pd.DataFrame:
+        """Chaves (CODCOLIGADA, CODFILIAL, GRADE) da matriz curricular válida, servidas do cache (TTL_MATRIZ_VALIDA)."""
+        return self.executar_consulta("pendencia.matriz_valida", ignorar_cache=ignorar_cache)
+
+    def _consultar_pendentes_local(self, ignorar_cache=False) -> pd.DataFrame:
+        """
+        Mesmo resultado de SQL_PENDENTES_AVANCADO, com o banco fazendo só a busca por
+        (CODPERLET, STATUS): as linhas em cache passam pela máscara de exclusões, por um hash
+        join com a matriz válida e são agrupadas por aluno aqui (STRING_AGG de GRADE/Turno,
+        data mínima, dias). Mudar as exclusões não exige nova leitura do banco.
+        """
+        matriz = self.get_matriz_valida()
+        linhas = self.executar_consulta(
+            "pendencia.pendentes_linhas", self._params_pendentes(), ignorar_cache=ignorar_cache
+        )
+        if linhas.empty or matriz.empty:
+            return pd.DataFrame()
+
+        linhas = linhas[self.exclusoes.mascara(linhas)]
+        validas = self._chave_matriz(linhas).isin(self._chave_matriz(matriz.dropna(subset=self.CHAVES_MATRIZ)))
+        df, _ = self.queries.obter("pendencia.pendentes").tipar(self._agrupar_pendentes(linhas[validas]))
+        return df
+
+    def recarregar_exclusoes(self, regras=None):
+        """
+        Troca as regras de exclusão desta engine (padrão: relê o exclusoes_pendencia.json); o
+        modo servidor passa a usar a consulta compilada com elas. O modo local aplica as novas
+        regras já na próxima chamada, sobre as linhas em cache. Outras engines não são afetadas.
+        """
+        self._exclusoes = regras if regras is not None else RegrasExclusao.carregar()
+        self._consulta_pendentes = None
+
+    @classmethod
+    def _chave_matriz(cls, df):
+        # Textos dos dois lados, como os CAST(... AS VARCHAR) do join no banco
+        return pd.MultiIndex.from_arrays([df[c].astype(str) for c in cls.CHAVES_MATRIZ])
+
+    @staticmethod
+    def _concatenar_por_grupo(valores, grupos, n_grupos, separador):
+        """STRING_AGG vetorizado: junta os valores não nulos de cada grupo (None se o grupo não tiver nenhum)."""
+        valores = pd.Series(valores).astype(object)
+        presentes = valores.notna().to_numpy()
+        ids = grupos[presentes]
+        ordem = np.argsort(ids, kind="stable")
+        ids = ids[ordem]
+        resultado = np.full(n_grupos, None, dtype=object)
+        if len(ids):
+            pecas = (separador + valores[presentes].astype(str)).to_numpy(dtype=object)[ordem]
+            inicios = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            juntos = pd.Series(np.add.reduceat(pecas, inicios), dtype=object).str.slice(len(separador))
+            resultado[ids[inicios]] = juntos.to_numpy(dtype=object)
+        return resultado
+
+    def _agrupar_pendentes(self, linhas):
+        """GROUP BY de SQL_PENDENTES_AVANCADO sobre as linhas já validadas (ids de grupo inteiros)."""
+        colunas = self.CHAVES_PENDENTE[:8] + ["GRADE", "Turno", "Status_CRM", "Data_Cadastro", "Dias_Pendente"]
+        if linhas.empty:
+            return pd.DataFrame(columns=colunas)
+
+        grupos = linhas.groupby(self.CHAVES_PENDENTE, dropna=False, observed=True, sort=False).ngroup().to_numpy()
+        n_grupos = int(grupos.max()) + 1
+        _, primeiras = np.unique(grupos, return_index=True)
+
+        df = linhas.iloc[primeiras][self.CHAVES_PENDENTE].reset_index(drop=True)
+        df["GRADE"] = self._concatenar_por_grupo(linhas["GRADE"], grupos, n_grupos, " | ")
+        df["Turno"] = self._concatenar_por_grupo(linhas["Turno"], grupos, n_grupos, ", ")
+        datas = pd.to_datetime(linhas["Data_Cadastro"], errors="coerce")
+        df["Data_Cadastro"] = datas.groupby(grupos).min().reindex(range(n_grupos)).to_numpy()
+        # DATEDIFF(day, ...): dias de calendário entre a data mínima e hoje
+        df["Dias_Pendente"] = (pd.Timestamp.now().normalize() - df["Data_Cadastro"].dt.normalize()).dt.days
+
+        return df[colunas].sort_values("Dias_Pendente", ascending=False, kind="stable").reset_index(drop=True)
+
+    def _pos_processar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Tratamentos linha a linha sobre o resultado SQL (independem de outros blocos)."""
+        # Tratamento de datas (normalmente já tipadas pelo ESQUEMA_PENDENTES)
+        if not pd.api.types.is_datetime64_any_dtype(df["Data_Cadastro"]):
+            df["Data_Cadastro"] = pd.to_datetime(
+                df["Data_Cadastro"], dayfirst=True, errors="coerce"
+            )
+
+        # Tratamento numérico
+        df["Dias_Pendente"] = (
+            pd.to_numeric(df["Dias_Pendente"], errors="coerce")
+            .fillna(0)
+            .astype("int32")
+        )
+
+        # Regra de SLA (faixa de cada linha por busca nos limites, sem apply)
+        df["SLA_Status"] = pd.Categorical.from_codes(
+            np.digitize(df["Dias_Pendente"].to_numpy(), self.LIMITES_SLA), categories=self.CATEGORIAS_SLA
+        )
+
+        # Normalização final (sobre as categorias distintas, não sobre cada linha)
+        normalizar = lambda x: str(x).strip().upper()
+        df["Marca"] = mapear_categorias(df["Marca"], normalizar, valor_nulo="NAN")
+        df["Filial_Tratada"] = mapear_categorias(df["Filial_Tratada"], normalizar, valor_nulo="NAN")
+
+        # Limpeza e Ordenação Visual das Strings Agrupadas (itens únicos, em ordem alfabética)
+        df["Turno"] = ordenar_lista_agregada(df["Turno"], ",", valor_nulo="")
+        df["GRADE"] = ordenar_lista_agregada(df["GRADE"], "|", valor_nulo="")
+        return df
+
+    def exportar_analise_bruta(self, df: pd.DataFrame, formato=None):
+        """Enfileira o dump de conferência (padrão: self.formato_analise, ou parquet); retorna o caminho previsto."""
         try:
-            filename = f"analise_2026_unificado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            df.to_excel(filename, index=False)
-            self.logger.info(f"✅ Arquivo de conferência gerado: {filename}")
-            print(f"\n[DEBUG] Relatório gerado com {len(df)} linhas únicas: {filename}")
+            return get_exportador().enviar(
+                df,
+                self.PASTA_ANALISE_BRUTA,
+                f"analise_{self.periodo_letivo}_unificado",
+                formato=formato or self.formato_analise or "parquet",
+                manter=self.MANTER_ANALISES,
+            )
         except Exception as e:
-            self.logger.error(f"Falha ao gerar excel: {e}")
+            self.logger.error(f"Falha ao agendar a análise bruta: {e}")
+            return None
+
+
+def _registrar_consulta_pendentes(registro, nome, exclusoes):
+    """Registra a consulta do modo servidor com as exclusões compiladas no WHERE."""
+    registro.registrar(
+        nome,
+        PendenciaEngine.SQL_PENDENTES_AVANCADO.format(exclusoes=exclusoes.predicado_sql("P")),
+        {"codperlet": "texto", "status": "texto"},
+        ttl=PendenciaEngine.TTL_PENDENTES,
+        esquema=PendenciaEngine.ESQUEMA_PENDENTES,
+    )
+
+
+def _registrar_consultas(registro):
+    """Registra as consultas das pendências (a do modo servidor com as regras do JSON)."""
+    _registrar_consulta_pendentes(registro, "pendencia.pendentes", get_regras_exclusao())
+    registro.registrar(
+        "pendencia.pendentes_linhas",
+        PendenciaEngine.SQL_PENDENTES_LINHAS,
+        {"codperlet": "texto", "status": "texto"},
+        ttl=PendenciaEngine.TTL_PENDENTES,
+        esquema=PendenciaEngine.ESQUEMA_PENDENTES_LINHAS,
+    )
+    registro.registrar(
+        "pendencia.matriz_valida",
+        PendenciaEngine.SQL_MATRIZ_VALIDA,
+        {},
+        ttl=PendenciaEngine.TTL_MATRIZ_VALIDA,
+        esquema={"CODCOLIGADA": "categoria", "CODFILIAL": "categoria", "GRADE": "categoria"},
+    )
+    registro.registrar(
+        "pendencia.matriculados_ra",
+        PendenciaEngine.SQL_MATRICULADOS_RA,
+        {"codperlet": "texto", "statuses": "lista_texto"},
+    )
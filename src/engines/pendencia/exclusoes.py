@@ -0,0 +1,115 @@
+import os
+import re
+import json
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.engines.funil.captacao.regras import _dobrar_acentos
+
+CAMINHO_EXCLUSOES = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "utils", "exclusoes_pendencia.json")
+)
+
+# Regras do exclusoes_pendencia.json, lidas no primeiro uso e compartilhadas pelas engines
+_regras_instance = None
+_regras_lock = threading.Lock()
+
+
+class RegrasExclusao:
+    """
+    Exclusões de registros de teste/lixo das pendências, lidas do exclusoes_pendencia.json:
+    - aluno_contem: trechos que, presentes no nome do aluno, descartam a linha;
+    - grupo_filial: pares grupo x filiais (ex: QI x BOTAFOGO) descartados juntos.
+
+    As mesmas regras compilam para os dois modos da PendenciaEngine: um predicado SQL
+    (modo servidor, empurrado para o WHERE) e uma máscara vetorizada (modo local, sobre as
+    linhas em cache). A máscara imita a collation CI_AI do banco (trechos e valores comparados
+    sem caixa e sem acento) e segue a lógica de três valores do SQL: nome de aluno nulo
+    descarta a linha (NULL NOT LIKE não é verdadeiro), e um par só mantém a linha quando
+    grupo ou filial comprovadamente não casam.
+    """
+
+    _CARACTERES_CORINGA = set("%_[]")
+
+    def __init__(self, aluno_contem=None, grupo_filial=None):
+        self.aluno_contem = [str(t) for t in (aluno_contem or [])]
+        self.grupo_filial = [
+            (str(par["grupo"]), [str(f) for f in par.get("filial", [])]) for par in (grupo_filial or [])
+        ]
+        for trecho in self.aluno_contem + [t for g, fs in self.grupo_filial for t in [g, *fs]]:
+            if not trecho or self._CARACTERES_CORINGA & set(trecho):
+                raise ValueError(f"Trecho de exclusão inválido: {trecho!r} (vazio ou com curinga de LIKE).")
+
+        # Regex pré-compiladas: uma para os nomes de aluno, uma por grupo e uma por lista de filiais
+        self._re_aluno = self._compilar(self.aluno_contem)
+        self._re_pares = [(self._compilar([g]), self._compilar(fs)) for g, fs in self.grupo_filial]
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_EXCLUSOES):
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            return cls(config.get("aluno_contem"), config.get("grupo_filial"))
+        except Exception as e:
+            logging.error(f"Erro ao carregar exclusoes_pendencia.json: {e}")
+            return cls()
+
+    @staticmethod
+    def _compilar(trechos):
+        if not trechos:
+            return None
+        return re.compile("|".join(re.escape(_dobrar_acentos(t)) for t in trechos), re.IGNORECASE)
+
+    # --- Modo servidor ---
+
+    @staticmethod
+    def _padrao(trecho):
+        return "'%" + trecho.replace("'", "''") + "%'"
+
+    def predicado_sql(self, alias="P"):
+        """Condições "AND ..." para o WHERE (vazio se não houver regras)."""
+        condicoes = [f"{alias}.ALUNO NOT LIKE {self._padrao(t)}" for t in self.aluno_contem]
+        for grupo, filiais in self.grupo_filial:
+            cond_filial = " OR ".join(f"{alias}.FILIAL LIKE {self._padrao(f)}" for f in filiais)
+            if len(filiais) > 1:
+                cond_filial = f"({cond_filial})"
+            condicoes.append(f"NOT ({alias}.NOMEGRUPO LIKE {self._padrao(grupo)} AND {cond_filial})")
+        return "".join(f"\n            AND {c}" for c in condicoes)
+
+    # --- Modo local ---
+
+    @staticmethod
+    def _casa(serie, regex):
+        """(casa, presente): regex testada uma vez por valor distinto e devolvida por linha."""
+        codigos, distintos = pd.factorize(serie)
+        presente = codigos >= 0
+        if regex is None or len(distintos) == 0:
+            return np.zeros(len(codigos), dtype=bool), presente
+        sem_acento = pd.Series(distintos, dtype=object).map(lambda v: _dobrar_acentos(v) if isinstance(v, str) else v)
+        casa_distinto = sem_acento.str.contains(regex, regex=True).to_numpy(dtype=bool)
+        return np.append(casa_distinto, False)[codigos], presente
+
+    def mascara(self, df, aluno="Aluno", grupo="NOMEGRUPO", filial="FILIAL"):
+        """Array booleano: True para as linhas que sobrevivem às exclusões."""
+        manter = np.ones(len(df), dtype=bool)
+        if self._re_aluno is not None:
+            casa, presente = self._casa(df[aluno], self._re_aluno)
+            manter &= presente & ~casa
+        for re_grupo, re_filiais in self._re_pares:
+            casa_g, presente_g = self._casa(df[grupo], re_grupo)
+            casa_f, presente_f = self._casa(df[filial], re_filiais)
+            manter &= (presente_g & ~casa_g) | (presente_f & ~casa_f)
+        return manter
+
+
+def get_regras_exclusao():
+    """Retorna a instância única das regras do exclusoes_pendencia.json (lidas no primeiro uso)."""
+    global _regras_instance
+
+    with _regras_lock:
+        if _regras_instance is None:
+            _regras_instance = RegrasExclusao.carregar()
+        return _regras_instance
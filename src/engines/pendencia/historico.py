@@ -0,0 +1,181 @@
+import os
+import re
+import glob
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.utils.persistencia import gravar_dataframe, ler_dataframe, gravar_json, ler_json, remover_arquivo
+
+
+class HistoricoPendencias:
+    """
+    Fotografias das pendências por marca, uma por execução do relatório, usadas como base
+    do comparativo (novas entradas x resolvidos).
+
+    Cada fotografia é um arquivo colunar pequeno em <pasta>/<marca>/<AAAAMMDD_HHMMSS>.parquet
+    e o indice.json guarda, por marca, a lista ordenada de momentos. O mais recente é o
+    último item da lista e um D-N é uma busca binária, então a base do comparativo sai
+    lendo um único arquivo (só das colunas pedidas), sem varrer a pasta.
+
+    Retenção: fotografias dos últimos DIAS_INTRADIARIOS dias ficam todas; mais antigas são
+    compactadas para a última de cada dia; além de RETENCAO_DIAS são removidas.
+    """
+
+    RETENCAO_DIAS = 400
+    DIAS_INTRADIARIOS = 7
+    FORMATO_MOMENTO = "%Y%m%d_%H%M%S"
+
+    _RE_REFERENCIA = re.compile(r"^D-(\d+)$", re.IGNORECASE)
+    _RE_LEGADO = re.compile(r"_(\d{8}_\d{6})\.xlsx$")
+
+    def __init__(self, pasta="historico_dados_local/Pendentes"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._indice = None
+        os.makedirs(self.pasta, exist_ok=True)
+
+    # --- Índice ---
+
+    @property
+    def _caminho_indice(self):
+        return os.path.join(self.pasta, "indice.json")
+
+    def _carregar_indice(self):
+        if self._indice is None:
+            self._indice = ler_json(self._caminho_indice, descricao="Índice do histórico de pendências")
+        return self._indice
+
+    def _salvar_indice(self):
+        gravar_json(self._caminho_indice, self._indice)
+
+    def _entradas(self, marca):
+        """Entradas da marca ({"momento", "arquivo", "linhas"}) em ordem crescente de momento."""
+        return self._carregar_indice().setdefault(marca, [])
+
+    def momentos(self, marca):
+        """Momentos (datetime) com fotografia da marca, em ordem crescente."""
+        with self._lock:
+            return [datetime.strptime(e["momento"], self.FORMATO_MOMENTO) for e in self._entradas(marca)]
+
+    # --- Gravação ---
+
+    def gravar(self, marca, df, momento=None):
+        """
+        Grava a fotografia de `df` para a marca (padrão: agora). RA vai como texto e as
+        demais colunas de texto como category (dicionário no Parquet). Uma nova fotografia
+        no mesmo segundo substitui a anterior.
+        """
+        if df is None or df.empty:
+            return None
+
+        momento = (momento or datetime.now()).strftime(self.FORMATO_MOMENTO)
+        foto = df.copy()
+        if "RA" in foto.columns:
+            foto["RA"] = foto["RA"].astype(str).str.strip()
+        for coluna in foto.columns:
+            if coluna != "RA" and (foto[coluna].dtype == object or pd.api.types.is_string_dtype(foto[coluna])):
+                foto[coluna] = foto[coluna].astype("category")
+
+        with self._lock:
+            arquivo = self._gravar_arquivo(foto, marca, momento)
+
+            entradas = self._entradas(marca)
+            chaves = [e["momento"] for e in entradas]
+            posicao = bisect.bisect_left(chaves, momento)
+            entrada = {"momento": momento, "arquivo": arquivo, "linhas": len(foto)}
+            if posicao < len(chaves) and chaves[posicao] == momento:
+                if entradas[posicao]["arquivo"] != arquivo:
+                    self._remover_arquivo(entradas[posicao]["arquivo"])
+                entradas[posicao] = entrada
+            else:
+                entradas.insert(posicao, entrada)
+            self._aplicar_retencao(marca)
+            self._salvar_indice()
+        return momento
+
+    def _gravar_arquivo(self, foto, marca, momento):
+        """Grava a fotografia (Parquet, ou pickle no fallback); retorna o caminho relativo à pasta."""
+        caminho = gravar_dataframe(foto, os.path.join(self.pasta, marca, momento), compression="zstd")
+        return os.path.relpath(caminho, self.pasta)
+
+    def _aplicar_retencao(self, marca):
+        """Compacta (última do dia) as fotografias fora da janela intradiária e descarta as expiradas."""
+        entradas = self._entradas(marca)
+        mais_recente = datetime.strptime(entradas[-1]["momento"], self.FORMATO_MOMENTO)
+        limite_intradiario = (mais_recente - timedelta(days=self.DIAS_INTRADIARIOS)).strftime(self.FORMATO_MOMENTO)
+        limite_retencao = (mais_recente - timedelta(days=self.RETENCAO_DIAS)).strftime(self.FORMATO_MOMENTO)
+
+        manter, remover = [], []
+        for i, entrada in enumerate(entradas):
+            momento = entrada["momento"]
+            proxima_mesmo_dia = i + 1 < len(entradas) and entradas[i + 1]["momento"][:8] == momento[:8]
+            if momento < limite_retencao or (momento < limite_intradiario and proxima_mesmo_dia):
+                remover.append(entrada)
+            else:
+                manter.append(entrada)
+
+        entradas[:] = manter
+        for entrada in remover:
+            self._remover_arquivo(entrada["arquivo"])
+
+    def _remover_arquivo(self, arquivo):
+        remover_arquivo(os.path.join(self.pasta, arquivo))
+
+    def importar_legado(self, marca, pasta_marca):
+        """
+        Migra para o histórico a planilha DB_Pend_*.xlsx mais recente da pasta da marca
+        (formato anterior), se a marca ainda não tem fotografias. As planilhas não são apagadas.
+        """
+        if self.momentos(marca):
+            return None
+        arquivos = glob.glob(os.path.join(pasta_marca, "DB_Pend_*.xlsx"))
+        if not arquivos:
+            return None
+        try:
+            arquivo_recente = max(arquivos, key=os.path.getctime)
+            m = self._RE_LEGADO.search(arquivo_recente)
+            momento = datetime.strptime(m.group(1), self.FORMATO_MOMENTO) if m \
+                else datetime.fromtimestamp(os.path.getctime(arquivo_recente))
+            return self.gravar(marca, pd.read_excel(arquivo_recente), momento)
+        except Exception as e:
+            self.logger.warning(f"Falha ao importar histórico legado de {marca}: {e}")
+            return None
+
+    # --- Leitura ---
+
+    def resolver(self, marca, referencia="ultimo", momento_base=None):
+        """
+        Entrada do índice para uma referência: 'ultimo' (a mais recente) ou 'D-N' (a mais
+        recente até N dias antes do momento base, cobrindo dias sem execução). None se não houver.
+        """
+        with self._lock:
+            entradas = self._entradas(marca)
+            if not entradas:
+                return None
+            if str(referencia).strip().lower() == "ultimo":
+                return entradas[-1]
+
+            m = self._RE_REFERENCIA.match(str(referencia).strip())
+            if not m:
+                raise ValueError(f"Referência inválida: {referencia}. Use 'ultimo' ou 'D-N'.")
+            limite = (momento_base or datetime.now()) - timedelta(days=int(m.group(1)))
+            chaves = [e["momento"] for e in entradas]
+            posicao = bisect.bisect_right(chaves, limite.strftime(self.FORMATO_MOMENTO))
+            return entradas[posicao - 1] if posicao else None
+
+    def carregar(self, marca, referencia="ultimo", colunas=None, momento_base=None):
+        """Fotografia da marca para a referência (só as `colunas` pedidas) ou DataFrame vazio."""
+        entrada = self.resolver(marca, referencia, momento_base)
+        if entrada is None:
+            return pd.DataFrame()
+        caminho = os.path.join(self.pasta, entrada["arquivo"])
+        try:
+            return ler_dataframe(caminho, colunas)
+        except Exception as e:
+            self.logger.warning(f"Fotografia {entrada['arquivo']} ilegível: {e}")
+            return pd.DataFrame()
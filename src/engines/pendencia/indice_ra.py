@@ -0,0 +1,129 @@
+import os
+import json
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.utils.persistencia import gravar_atomico
+
+
+class IndiceRA:
+    """
+    Conjunto de RAs compacto: RAs numéricos viram int64 num array ordenado e sem repetição
+    (8 bytes por aluno, busca binária); RAs com letras, raros, ficam num segundo array
+    ordenado de textos. Pertinência, diferença e interseção são operações vetorizadas
+    sobre esses arrays, sem sets de strings do Python.
+
+    RAs são comparados depois do strip; em RAs numéricos zeros à esquerda não diferenciam
+    ("00123" e "123" são o mesmo aluno).
+    """
+
+    def __init__(self, inteiros=None, textos=None):
+        self.inteiros = np.unique(np.asarray(inteiros if inteiros is not None else [], dtype=np.int64))
+        self.textos = np.unique(np.array([str(t) for t in (textos if textos is not None else [])], dtype=object))
+
+    # --- Construção ---
+
+    @staticmethod
+    def _decompor(valores):
+        """
+        Decompõe os valores em (inteiros, máscara numérica, máscara de texto, textos), com cada
+        valor distinto interpretado uma única vez. Nulos e vazios ficam fora das duas máscaras.
+        """
+        codigos, distintos = pd.factorize(pd.Series(valores, dtype=object), use_na_sentinel=True)
+        distintos = pd.Series(distintos, dtype=object).astype(str).str.strip()
+        numericos = distintos.str.fullmatch(r"\d{1,18}").to_numpy(dtype=bool)
+        textos = distintos.to_numpy(dtype=object)
+        eh_texto_distinto = ~numericos & (textos != "")
+        inteiros = np.zeros(len(distintos), dtype=np.int64)
+        inteiros[numericos] = distintos[numericos].astype(np.int64).to_numpy()
+
+        # Nulos (código -1) caem num código extra que não é número nem texto
+        codigos = np.where(codigos >= 0, codigos, len(distintos))
+        numericos = np.append(numericos, False)
+        eh_texto_distinto = np.append(eh_texto_distinto, False)
+
+        eh_numerico = numericos[codigos]
+        eh_texto = eh_texto_distinto[codigos]
+        valores_inteiros = np.append(inteiros, 0)[codigos]
+        return valores_inteiros, eh_numerico, eh_texto, textos[codigos[eh_texto]]
+
+    @classmethod
+    def de_valores(cls, valores):
+        """Índice a partir de uma coluna/iterável de RAs (str ou int)."""
+        if isinstance(valores, cls):
+            return valores
+        if isinstance(valores, (set, frozenset)):
+            valores = list(valores)
+        inteiros, eh_numerico, _, textos = cls._decompor(valores)
+        return cls(inteiros[eh_numerico], textos)
+
+    # --- Consulta ---
+
+    def __len__(self):
+        return len(self.inteiros) + len(self.textos)
+
+    def __contains__(self, ra):
+        return bool(self.contem([ra])[0])
+
+    @staticmethod
+    def _pertence(valores, ordenados):
+        if len(ordenados) == 0 or len(valores) == 0:
+            return np.zeros(len(valores), dtype=bool)
+        posicoes = np.searchsorted(ordenados, valores)
+        return ordenados[np.minimum(posicoes, len(ordenados) - 1)] == valores
+
+    def contem(self, valores):
+        """Array booleano: cada RA de `valores` está no índice? (nulos -> False)"""
+        inteiros, eh_numerico, eh_texto, textos = self._decompor(valores)
+        resultado = np.zeros(len(inteiros), dtype=bool)
+        resultado[eh_numerico] = self._pertence(inteiros[eh_numerico], self.inteiros)
+        if len(textos):
+            resultado[eh_texto] = np.isin(textos, self.textos)
+        return resultado
+
+    def diferenca(self, outro):
+        """RAs deste índice que não estão em `outro`."""
+        return IndiceRA(
+            np.setdiff1d(self.inteiros, outro.inteiros, assume_unique=True),
+            np.setdiff1d(self.textos, outro.textos, assume_unique=True),
+        )
+
+    def intersecao(self, outro):
+        """RAs presentes nos dois índices."""
+        return IndiceRA(
+            np.intersect1d(self.inteiros, outro.inteiros, assume_unique=True),
+            np.intersect1d(self.textos, outro.textos, assume_unique=True),
+        )
+
+    # --- Persistência ---
+
+    def salvar(self, caminho, **metadados):
+        """Grava o índice em .npz (escrita atômica) com metadados livres (período, data de geração)."""
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        metadados.setdefault("gerado_em", datetime.now().isoformat())
+
+        def escrever(temporario):
+            # Arquivo aberto pelo chamador: np.savez não acrescenta ".npz" ao nome temporário
+            with open(temporario, "wb") as f:
+                np.savez(f, inteiros=self.inteiros, textos=self.textos.astype(str),
+                         metadados=np.array(json.dumps(metadados)))
+
+        gravar_atomico(caminho, escrever)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Devolve (índice, metadados) ou (None, {}) se o arquivo não existir ou estiver ilegível."""
+        try:
+            with np.load(caminho, allow_pickle=False) as dados:
+                indice = cls.__new__(cls)
+                indice.inteiros = dados["inteiros"].astype(np.int64)
+                indice.textos = dados["textos"].astype(object)
+                return indice, json.loads(str(dados["metadados"]))
+        except FileNotFoundError:
+            return None, {}
+        except Exception as e:
+            logging.warning(f"Índice de RAs ilegível ({caminho}): {e}")
+            return None, {}
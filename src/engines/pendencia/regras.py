@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 import logging
+from src.utils.esquema_ingestao import concatenar_blocos
+from src.engines.pendencia.indice_ra import IndiceRA
 
 class ProcessadorRegras:
     """
@@ -11,53 +13,87 @@ class ProcessadorRegras:
     def __init__(self, config=None):
         # Estes atributos são lidos pelo report.py
         self.cruzamento_realizado = False
-        self.ras_matriculados_atuais = set()
+        self.ras_matriculados_atuais = IndiceRA()
         self.config = config
-        
+
     def aplicar_regras(self, df_pendentes, set_matriculados=None):
         """
         Recebe o DF bruto do SQL e aplica as colunas calculadas necessárias para o dashboard.
         Também filtra falsos positivos (quem já está matriculado).
         """
-        # Inicializa set vazio se for None para evitar erro
-        if set_matriculados is None:
-            set_matriculados = set()
-
         # Retorna DF vazio se não houver dados de entrada
         if df_pendentes is None or df_pendentes.empty:
             return pd.DataFrame()
 
         logging.info("Business: Calculando indicadores de tempo e prioridade...")
-        
+
         # 1. Armazena matriculados para o report usar depois
-        self.ras_matriculados_atuais = set_matriculados
-        self.cruzamento_realizado = True
+        self._registrar_matriculados(set_matriculados)
+
+        df = self._processar_bloco(df_pendentes)
+        if df.empty:
+            logging.warning("Business: Todos os pendentes já constam como matriculados ou lista vazia.")
+            return df
+
+        # 5. Ordenação para o relatório sair bonito
+        self._ordenar(df)
+
+        logging.info(f"Business: {len(df)} pendências reais identificadas após cruzamento.")
+        return df
+
+    def aplicar_regras_em_blocos(self, blocos, set_matriculados=None):
+        """
+        Hook de agregação incremental: aplica as regras a cada bloco assim que ele chega
+        (ex: EngineBase.executar_query_em_blocos) e só concatena as linhas que sobrevivem
+        ao cruzamento. A ordenação é feita uma única vez no final.
+        """
+        self._registrar_matriculados(set_matriculados)
+
+        partes = []
+        for df_bloco in blocos:
+            if df_bloco is None or df_bloco.empty:
+                continue
+            parte = self._processar_bloco(df_bloco)
+            if not parte.empty:
+                partes.append(parte)
+
+        if not partes:
+            logging.warning("Business: Todos os pendentes já constam como matriculados ou lista vazia.")
+            return pd.DataFrame()
+
+        # Une as categorias dos blocos (concat puro transformaria as colunas category em object)
+        df = concatenar_blocos(partes)
+        self._ordenar(df)
+
+        logging.info(f"Business: {len(df)} pendências reais identificadas após cruzamento (em blocos).")
+        return df
+
+    def _registrar_matriculados(self, set_matriculados):
+        # Aceita IndiceRA (PendenciaEngine.get_matriculados_ra) ou qualquer coleção de RAs;
+        # None significa que a lista de matriculados não pôde ser obtida
+        self.cruzamento_realizado = set_matriculados is not None
+        self.ras_matriculados_atuais = IndiceRA.de_valores(
+            set_matriculados if set_matriculados is not None else []
+        )
 
-        # 2. Remove Pendentes que JÁ estão Matriculados 
+    def _processar_bloco(self, df_pendentes):
+        """Regras linha a linha (independentes entre blocos): cruzamento, filial, dias e prioridade."""
+        # 2. Remove Pendentes que JÁ estão Matriculados
         if 'RA' in df_pendentes.columns:
-            # .astype(str) garante que a comparação funcione mesmo se um lado for int e outro str
-            df = df_pendentes[~df_pendentes['RA'].astype(str).isin(self.ras_matriculados_atuais)].copy()
+            # Busca binária no índice de RAs (int ou str, com strip, dos dois lados)
+            df = df_pendentes[~self.ras_matriculados_atuais.contem(df_pendentes['RA'])].copy()
         else:
             df = df_pendentes.copy()
-        
+
         if df.empty:
-            logging.warning("Business: Todos os pendentes já constam como matriculados ou lista vazia.")
             return df
 
         # 3. Limpeza final de nomes de Filial (Refinamento Visual)
-        def limpar_nome_filial(row):
-            # O .get evita erro se a coluna não existir
-            marca = str(row.get('Marca', ''))
-            filial = str(row.get('Filial', ''))
-            if filial.startswith(marca):
-                return filial[len(marca):].strip(" -|")
-            return filial
-
-        df['Filial'] = df.apply(limpar_nome_filial, axis=1)
+        df['Filial'] = self.limpar_nome_filial(df)
 
         # 4. Cálculo de Dias e Prioridade (CRÍTICO PARA O EXCEL)
         hoje = pd.Timestamp.now().normalize()
-        
+
         # Correção: Identifica qual coluna de data está disponível
         coluna_data = None
         if 'Data_Pendencia' in df.columns:
@@ -81,11 +117,26 @@ class ProcessadorRegras:
         conditions = [(df['Dias_Pendente'] > 15), (df['Dias_Pendente'] >= 7)]
         choices = ['Crítico', 'Atenção']
         df['Status_Prioridade'] = np.select(conditions, choices, default='Novo')
+        return df
 
-        # 5. Ordenação para o relatório sair bonito
+    @staticmethod
+    def limpar_nome_filial(df):
+        """
+        Filial sem o prefixo da marca ("QI - TIJUCA" na marca QI -> "TIJUCA").
+        O corte é feito uma vez por par distinto (Marca, Filial) e volta às linhas pelos códigos do par.
+        """
+        vazio = pd.Series("", index=df.index, dtype=object)
+        cod_marca, marcas = pd.factorize(df['Marca'] if 'Marca' in df.columns else vazio, use_na_sentinel=False)
+        cod_filial, filiais = pd.factorize(df['Filial'] if 'Filial' in df.columns else vazio, use_na_sentinel=False)
+
+        codigos, pares = pd.factorize(cod_marca.astype(np.int64) * len(filiais) + cod_filial)
+        limpos = []
+        for par in pares:
+            m, f = str(marcas[par // len(filiais)]), str(filiais[par % len(filiais)])
+            limpos.append(f[len(m):].strip(" -|") if f.startswith(m) else f)
+        return pd.Series(np.array(limpos, dtype=object)[codigos], index=df.index, dtype=object)
+
+    def _ordenar(self, df):
         cols_ordenacao = [c for c in ['Marca', 'Filial', 'Aluno'] if c in df.columns]
         if cols_ordenacao:
             df.sort_values(by=cols_ordenacao, inplace=True)
-
-        logging.info(f"Business: {len(df)} pendências reais identificadas após cruzamento.")
-        return df
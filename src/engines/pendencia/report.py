@@ -1,123 +1,298 @@
+import numpy as np
 import pandas as pd
 import os
-import glob
+import shutil
 import logging
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from src.engines.pendencia.indice_ra import IndiceRA
+from src.engines.pendencia.historico import HistoricoPendencias
+from src.utils.persistencia import PARQUET_DISPONIVEL
+
+
+def _renderizar_particao(config, caminho_particao, caminho, nome_escola, fluxo):
+    """
+    Ponto de entrada do processo de renderização: lê a partição da marca (Arrow IPC) e monta o Excel.
+    Retorna (sucesso, segundos); o tempo é medido aqui, sem a espera na fila do pool.
+    """
+    inicio = time.perf_counter()
+    if caminho_particao.endswith(".arrow"):
+        import pyarrow.feather as feather
+        df_escola = feather.read_table(caminho_particao, memory_map=True).to_pandas()
+    else:
+        df_escola = pd.read_pickle(caminho_particao)
+    sucesso = PendenciaReporter(config, None)._exportar_excel(df_escola, fluxo, caminho, nome_escola)
+    return sucesso, time.perf_counter() - inicio
+
+
+class _EscritaPorLinha:
+    """
+    Acumula as escritas de uma aba e as emite em ordem de linha. No modo constant_memory o
+    xlsxwriter grava cada linha assim que a seguinte começa e descarta escritas em linhas
+    anteriores; por isso, com `memoria_constante`, mesclagens só podem ocupar uma linha.
+    """
+
+    def __init__(self, ws, memoria_constante=False):
+        self.ws = ws
+        self.memoria_constante = memoria_constante
+        self._escritas = []
+
+    def write(self, row, col, *args):
+        self._escritas.append((row, col, self.ws.write, (row, col, *args)))
+
+    def merge_range(self, first_row, first_col, last_row, last_col, *args):
+        if self.memoria_constante and first_row != last_row:
+            raise ValueError("Mesclagem com mais de uma linha não é compatível com a escrita por linha.")
+        self._escritas.append((first_row, first_col, self.ws.merge_range, (first_row, first_col, last_row, last_col, *args)))
+
+    def emitir(self):
+        for _, _, escrever, args in sorted(self._escritas, key=lambda e: (e[0], e[1])):
+            escrever(*args)
+        self._escritas.clear()
+
 
 class PendenciaReporter:
+    # Fotografia usada como base do comparativo: "ultimo" (execução anterior) ou "D-N"
+    REFERENCIA_COMPARATIVO = "ultimo"
+
+    # Renderização paralela (opcional): processos por relatório, limitados ao número de núcleos.
+    # Com 1 (padrão) tudo roda no próprio processo; o pool só compensa o custo de subir os
+    # processos e serializar as partições a partir de LINHAS_MINIMAS_PROCESSOS linhas no total.
+    MAX_PROCESSOS = 1
+    LINHAS_MINIMAS_PROCESSOS = 50_000
+
+    # A partir deste número de linhas o workbook é gerado em constant_memory (memória constante)
+    LINHAS_MEMORIA_CONSTANTE = 20_000
+
     def __init__(self, config, pasta_historico_raiz):
         self.config = config
         self.pasta_historico_raiz = pasta_historico_raiz
+        self._historico = None
+
+    @property
+    def historico(self):
+        if self._historico is None:
+            self._historico = HistoricoPendencias(self.pasta_historico_raiz)
+        return self._historico
+
+    def gerar_por_marca(self, df_atual, pasta_destino, business_obj, max_processos=None):
+        """
+        Gera os relatórios individuais de cada marca.
+
+        O DataFrame é particionado por marca uma única vez. Histórico e fluxo do comparativo
+        são resolvidos aqui (leituras rápidas e um único escritor do índice); só a montagem
+        dos workbooks, que domina o tempo, pode ir para um pool de processos (`max_processos`
+        ou MAX_PROCESSOS > 1), com cada partição passada em Arrow IPC (mapeada em memória pelo
+        processo). Com um núcleo, uma marca ou menos de LINHAS_MINIMAS_PROCESSOS linhas,
+        tudo roda no próprio processo.
 
-    def gerar_por_marca(self, df_atual, pasta_destino, business_obj):
-        """Itera sobre as marcas e gera os relatórios individuais."""
+        Retorna {marca: segundos de renderização} das marcas geradas com sucesso.
+        """
         if df_atual is None or df_atual.empty:
             logging.warning("Nenhum dado para gerar relatório.")
-            return
+            return {}
 
-        marcas_unicas = df_atual['Marca'].unique()
-        
-        for marca in marcas_unicas:
+        data_str = datetime.now().strftime("%Y-%m-%d")
+        particoes = {}
+        for marca, posicoes in df_atual.groupby('Marca', sort=False, observed=True).indices.items():
             # Limpeza do nome da pasta
             nome_marca_limpo = str(marca).strip().replace(" ", "_").replace("/", "-")
-            
-            # Gerenciamento de Pastas e Histórico
-            pasta_hist_marca = os.path.join(self.pasta_historico_raiz, nome_marca_limpo)
-            os.makedirs(pasta_hist_marca, exist_ok=True)
+            df_escola = df_atual.take(posicoes).reset_index(drop=True)
 
-            # Filtra dados da escola específica
-            df_escola = df_atual[df_atual['Marca'] == marca].copy()
-            
             # Carrega Histórico Anterior (para o comparativo do Dashboard - D-1 ou D-7)
-            df_ant = self._carregar_historico_recente(pasta_hist_marca)
-
-            # Define nomes de arquivo
-            data_str = datetime.now().strftime("%Y-%m-%d")
-            caminho_relatorio = os.path.join(pasta_destino, f"Pendencias_{nome_marca_limpo}_{data_str}.xlsx")
-            
-            # Chama a função completa de exportação visual
-            sucesso = self._exportar_excel(df_escola, df_ant, caminho_relatorio, marca, business_obj)
+            df_ant = self._carregar_historico_recente(nome_marca_limpo)
+            particoes[marca] = {
+                "df": df_escola,
+                "nome_limpo": nome_marca_limpo,
+                "fluxo": self._calcular_fluxo(df_escola, df_ant, business_obj),
+                "caminho": os.path.join(pasta_destino, f"Pendencias_{nome_marca_limpo}_{data_str}.xlsx"),
+            }
+
+        processos = min(max_processos or self.MAX_PROCESSOS or 1, len(particoes), os.cpu_count() or 1)
+        if processos > 1 and len(df_atual) >= self.LINHAS_MINIMAS_PROCESSOS:
+            sucessos, tempos = self._renderizar_em_processos(particoes, processos)
+        else:
+            sucessos, tempos = self._renderizar_sequencial(particoes)
 
+        for marca, p in particoes.items():
+            logging.info(f"Relatório {marca}: {len(p['df'])} linhas em {tempos.get(marca, 0):.2f}s")
             # Salva novo histórico (Snapshot atual) se deu tudo certo
-            if sucesso:
-                self._salvar_historico(df_escola, pasta_hist_marca, nome_marca_limpo)
-
-    def _carregar_historico_recente(self, pasta):
-        """Busca o arquivo .xlsx mais recente na pasta de histórico da marca."""
-        arquivos = glob.glob(os.path.join(pasta, "*.xlsx"))
-        if not arquivos:
-            return pd.DataFrame()
-        
+            if sucessos.get(marca):
+                self._salvar_historico(p["df"], p["nome_limpo"])
+        return {marca: tempos[marca] for marca in particoes if sucessos.get(marca)}
+
+    def _renderizar_sequencial(self, particoes):
+        sucessos, tempos = {}, {}
+        for marca, p in particoes.items():
+            inicio = time.perf_counter()
+            sucessos[marca] = self._exportar_excel(p["df"], p["fluxo"], p["caminho"], marca)
+            tempos[marca] = time.perf_counter() - inicio
+        return sucessos, tempos
+
+    def _renderizar_em_processos(self, particoes, processos):
+        pasta_ipc = tempfile.mkdtemp(prefix="pendencias_ipc_")
         try:
-            arquivo_recente = max(arquivos, key=os.path.getctime)
-            df = pd.read_excel(arquivo_recente)
-            # Garante que RA é string para comparação correta
-            if 'RA' in df.columns:
-                df['RA'] = df['RA'].astype(str).str.strip()
-            return df
-        except Exception:
-            return pd.DataFrame()
-
-    def _salvar_historico(self, df, pasta, nome_marca):
+            caminhos_ipc = {
+                marca: self._gravar_particao(p["df"], os.path.join(pasta_ipc, str(i)))
+                for i, (marca, p) in enumerate(particoes.items())
+            }
+            sucessos, tempos, erros = {}, {}, []
+            with ProcessPoolExecutor(max_workers=processos) as pool:
+                futuros = {
+                    pool.submit(
+                        _renderizar_particao, self.config, caminhos_ipc[marca], p["caminho"], marca, p["fluxo"]
+                    ): marca
+                    for marca, p in particoes.items()
+                }
+                for futuro in as_completed(futuros):
+                    marca = futuros[futuro]
+                    try:
+                        sucessos[marca], tempos[marca] = futuro.result()
+                    except Exception as e:
+                        logging.error(f"Renderização de {marca} falhou no pool de processos: {e}")
+                        erros.append(marca)
+        finally:
+            shutil.rmtree(pasta_ipc, ignore_errors=True)
+
+        # Marca cujo processo falhou (ex: pool quebrado) é gerada no próprio processo
+        if erros:
+            refeitos, tempos_refeitos = self._renderizar_sequencial({m: particoes[m] for m in erros})
+            sucessos.update(refeitos)
+            tempos.update(tempos_refeitos)
+        return sucessos, tempos
+
+    @staticmethod
+    def _gravar_particao(df, caminho_base):
+        """Arrow IPC (Feather) quando o pyarrow está disponível e as colunas permitem; senão pickle."""
+        if PARQUET_DISPONIVEL:
+            try:
+                df.to_feather(caminho_base + ".arrow")
+                return caminho_base + ".arrow"
+            except Exception:
+                # Colunas object com tipos mistos não vão para Arrow
+                pass
+        df.to_pickle(caminho_base + ".pickle")
+        return caminho_base + ".pickle"
+
+    def _carregar_historico_recente(self, nome_marca):
+        """Fotografia de referência da marca (só a coluna RA, que é o que o comparativo usa)."""
+        # Marcas que só têm as planilhas DB_Pend_*.xlsx do formato anterior são migradas uma vez
+        self.historico.importar_legado(nome_marca, os.path.join(self.pasta_historico_raiz, nome_marca))
+        return self.historico.carregar(nome_marca, self.REFERENCIA_COMPARATIVO, colunas=['RA'])
+
+    def _salvar_historico(self, df, nome_marca):
         """Salva um snapshot dos dados atuais para ser usado como histórico no futuro."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        caminho = os.path.join(pasta, f"DB_Pend_{nome_marca}_{timestamp}.xlsx")
         try:
-            df.to_excel(caminho, index=False)
+            self.historico.gravar(nome_marca, df)
         except Exception as e:
             logging.error(f"Erro ao salvar histórico DB: {e}")
 
-    def _exportar_excel(self, df_atual, df_anterior, caminho, nome_escola, business_obj):
-        """
-        Gera relatório com dashboard, aplicando formatação condicional e gráficos.
-        """
-        
-        # 1: Configuração de cores (Lê do config injetado)
-        colors = self.config.get('cores_excel', {})
-        c_brand = colors.get('brand_primary', '#203764')       
-        c_brand_light = colors.get('brand_secondary', '#4472C4') 
-        c_pos_bg = colors.get('positivo_bg', '#C6EFCE')
-        c_pos_font = colors.get('positivo_font', '#006100')
-        c_neg_bg = colors.get('negativo_bg', '#FFC7CE')
-        c_neg_font = colors.get('negativo_font', '#9C0006')
-        c_alert_bg = colors.get('alerta_bg', '#FFEB9C')
-        c_alert_font = colors.get('alerta_font', '#9C5700')
-        c_neu_bg = colors.get('neutro_bg', '#E6E6E6')
-        c_neu_font = colors.get('neutro_font', '#203764')
-
-        # 2: Cálculo dos dados (Fluxo de Conversão vs Desistência)
+    def _calcular_fluxo(self, df_atual, df_anterior, business_obj):
+        """Fluxo de Conversão vs Desistência da marca em relação à fotografia anterior."""
         qtd_anterior = 0
         qtd_novos = 0
         qtd_convertidos = 0 
         qtd_desistentes = 0
         
         if not df_anterior.empty:
-            ras_antigos = set(df_anterior['RA'].astype(str).str.strip())
-            ras_atuais = set(df_atual['RA'].astype(str).str.strip())
+            ras_antigos = IndiceRA.de_valores(df_anterior['RA'])
+            ras_atuais = IndiceRA.de_valores(df_atual['RA'])
             
             qtd_anterior = len(ras_antigos)
-            qtd_novos = len(ras_atuais - ras_antigos)
+            qtd_novos = len(ras_atuais.diferenca(ras_antigos))
             
             # RAs que estavam na lista antiga e SUMIRAM da lista atual
-            ras_resolvidos = ras_antigos - ras_atuais
+            ras_resolvidos = ras_antigos.diferenca(ras_atuais)
             
             # Lógica de Classificação (Convertido ou Desistente?)
-            if business_obj.cruzamento_realizado:
-                for ra in ras_resolvidos:
-                    # Se sumiu da lista de pendentes E apareceu na lista de matriculados (SQL)
-                    if ra in business_obj.ras_matriculados_atuais:
-                        qtd_convertidos += 1
-                    else:
-                        qtd_desistentes += 1
+            if business_obj is not None and business_obj.cruzamento_realizado:
+                # Se sumiu da lista de pendentes E apareceu na lista de matriculados (SQL)
+                matriculados = IndiceRA.de_valores(business_obj.ras_matriculados_atuais)
+                qtd_convertidos = len(ras_resolvidos.intersecao(matriculados))
+                qtd_desistentes = len(ras_resolvidos) - qtd_convertidos
             else:
                 # Se não houve cruzamento, assumimos apenas saída da lista
                 qtd_desistentes = len(ras_resolvidos)
         else:
             qtd_novos = len(df_atual)
 
-        df = df_atual.fillna('')
+        return {
+            'anterior': qtd_anterior,
+            'novos': qtd_novos,
+            'convertidos': qtd_convertidos,
+            'desistentes': qtd_desistentes,
+        }
+
+    @staticmethod
+    def _escrever_lista_acao(ws, df_lista, fmts_status, fmts_familia, fmt_manual, bloco=5_000):
+        """
+        Linhas da Lista de Ação (a partir da linha 1, em ordem, compatível com constant_memory).
+        Os formatos de cada linha são calculados antes, por coluna, e cada linha sai em três
+        chamadas (status, bloco de dados com a cor da família, coluna manual) em vez de doze.
+        """
+        if df_lista.empty:
+            return
+        status = df_lista['Status_Prioridade'].to_numpy(dtype=object)
+        idx_status = np.select([status == 'Crítico', status == 'Atenção'], [0, 1], 2)
+
+        # A cor de fundo alterna a cada troca de CPF do responsável (irmãos ficam na mesma faixa)
+        cpf = df_lista['CPF_Resp'].to_numpy(dtype=object)
+        troca = np.ones(len(cpf), dtype=bool)
+        troca[1:] = cpf[1:] != cpf[:-1]
+        idx_familia = np.cumsum(troca) % 2
+
+        # Os valores viram objetos Python em blocos de linhas, não a lista inteira de uma vez
+        write, write_row, write_blank = ws.write, ws.write_row, ws.write_blank
+        for inicio in range(0, len(df_lista), bloco):
+            dados = df_lista.iloc[inicio:inicio + bloco, 1:].to_numpy(dtype=object)
+            for j, valores in enumerate(dados):
+                i = inicio + j
+                write(i + 1, 0, status[i], fmts_status[idx_status[i]])
+                write_row(i + 1, 1, valores, fmts_familia[idx_familia[i]])
+                write_blank(i + 1, 11, None, fmt_manual)
+
+    @staticmethod
+    def _larguras_colunas(df_lista, cabecalhos, maximo=50):
+        """Largura de cada coluna: maior texto entre dados e cabeçalho (+2, até `maximo`), medido nos valores distintos."""
+        larguras = []
+        for col_name, cabecalho in zip(df_lista.columns, cabecalhos):
+            max_len_dados = 0
+            if not df_lista.empty:
+                max_len_dados = pd.Series(df_lista[col_name].unique()).astype(str).str.len().max()
+            larguras.append(min(max(max_len_dados, len(cabecalho)) + 2, maximo))
+        return larguras
+
+    def _exportar_excel(self, df_atual, fluxo, caminho, nome_escola):
+        """
+        Gera relatório com dashboard, aplicando formatação condicional e gráficos.
+        """
         
+        # 1: Configuração de cores (Lê do config injetado)
+        colors = self.config.get('cores_excel', {})
+        c_brand = colors.get('brand_primary', '#203764')       
+        c_brand_light = colors.get('brand_secondary', '#4472C4') 
+        c_pos_bg = colors.get('positivo_bg', '#C6EFCE')
+        c_pos_font = colors.get('positivo_font', '#006100')
+        c_neg_bg = colors.get('negativo_bg', '#FFC7CE')
+        c_neg_font = colors.get('negativo_font', '#9C0006')
+        c_alert_bg = colors.get('alerta_bg', '#FFEB9C')
+        c_alert_font = colors.get('alerta_font', '#9C5700')
+        c_neu_bg = colors.get('neutro_bg', '#E6E6E6')
+        c_neu_font = colors.get('neutro_font', '#203764')
+
+        # 2: Fluxo de Conversão vs Desistência (calculado antes, junto do histórico)
+        qtd_anterior = fluxo['anterior']
+        qtd_novos = fluxo['novos']
+        qtd_convertidos = fluxo['convertidos']
+        qtd_desistentes = fluxo['desistentes']
+
+        # Colunas category (esquema de ingestão) voltam a texto: fillna('') falharia nelas
+        # e o dashboard abaixo agrupa/ordena como texto
+        categoricas = df_atual.select_dtypes('category').columns
+        df = df_atual.astype({coluna: object for coluna in categoricas}).fillna('')
+
         # 3: Dataframes Auxiliares para o Dashboard
         
         # Tempo de Espera (Aging)
@@ -165,7 +340,12 @@ class PendenciaReporter:
         qtd_zombies = df[df['Dias_Pendente'] > 90].shape[0]
 
         try:
-            writer = pd.ExcelWriter(caminho, engine='xlsxwriter')
+            # Marcas grandes: constant_memory (cada linha vai para o disco assim que a próxima
+            # começa), por isso as duas abas são escritas em ordem de linha
+            memoria_constante = len(df) >= self.LINHAS_MEMORIA_CONSTANTE
+            writer = pd.ExcelWriter(
+                caminho, engine='xlsxwriter', engine_kwargs={'options': {'constant_memory': memoria_constante}}
+            )
             wb = writer.book
 
             # --- Definição de Estilos (Mantida do original) ---
@@ -200,41 +380,18 @@ class PendenciaReporter:
                 ws_lista.write(0, col, val, fmt_header)
             ws_lista.write(0, 11, "Ação da Secretaria", fmt_header)
 
-            cpf_ant = None
-            cor_base = fmt_familia_a
             cols_export = ['Status_Prioridade', 'Dias_Pendente', 'Marca', 'Filial', 'RA', 'Tipo_Matricula', 'Aluno', 'Série', 'Responsável', 'Turno', 'CPF_Resp']
-
-            for i, linha in enumerate(df[cols_export].itertuples(index=False)):
-                row_idx = i + 1
-                if linha.CPF_Resp != cpf_ant:
-                    cor_base = fmt_familia_b if cor_base == fmt_familia_a else fmt_familia_a
-                    cpf_ant = linha.CPF_Resp
-                
-                bg_status = fmt_critico if linha.Status_Prioridade == 'Crítico' else (fmt_atencao if linha.Status_Prioridade == 'Atenção' else fmt_novo)
-                
-                ws_lista.write(row_idx, 0, linha.Status_Prioridade, bg_status)
-                ws_lista.write(row_idx, 1, linha.Dias_Pendente, cor_base)
-                ws_lista.write(row_idx, 2, linha.Marca, cor_base)
-                ws_lista.write(row_idx, 3, linha.Filial, cor_base)
-                ws_lista.write(row_idx, 4, linha.RA, cor_base)
-                ws_lista.write(row_idx, 5, linha.Tipo_Matricula, cor_base)
-                ws_lista.write(row_idx, 6, linha.Aluno, cor_base)
-                ws_lista.write(row_idx, 7, linha.Série, cor_base)
-                ws_lista.write(row_idx, 8, linha.Responsável, cor_base)
-                ws_lista.write(row_idx, 9, linha.Turno, cor_base)
-                ws_lista.write(row_idx, 10, linha.CPF_Resp, cor_base)
-                ws_lista.write(row_idx, 11, "", fmt_manual)
+            self._escrever_lista_acao(
+                ws_lista, df[cols_export],
+                fmts_status=(fmt_critico, fmt_atencao, fmt_novo),
+                fmts_familia=(fmt_familia_a, fmt_familia_b),
+                fmt_manual=fmt_manual,
+            )
 
             ws_lista.autofilter(0, 0, len(df), 10)
             
             # Ajuste de Largura das Colunas
-            colunas_para_ajustar = ['Status_Prioridade', 'Dias_Pendente', 'Marca', 'Filial', 'RA', 'Tipo_Matricula', 'Aluno', 'Série', 'Responsável', 'Turno', 'CPF_Resp']
-            for i, col_name in enumerate(colunas_para_ajustar):
-                max_len_dados = 0
-                if not df.empty and col_name in df.columns:
-                    max_len_dados = df[col_name].astype(str).map(len).max()
-                len_header = len(headers_lista[i])
-                largura_final = min(max(max_len_dados, len_header) + 2, 50)
+            for i, largura_final in enumerate(self._larguras_colunas(df[cols_export], headers_lista)):
                 ws_lista.set_column(i, i, largura_final)
 
             ws_lista.set_column(11, 11, 40) # Coluna de Ação Manual
@@ -242,17 +399,24 @@ class PendenciaReporter:
             # --- Aba 2: Resumo (Dashboard) ---
             ws_dash = wb.add_worksheet('Resumo')
             ws_dash.hide_gridlines(2)
+            dash = _EscritaPorLinha(ws_dash, memoria_constante)
 
             COL_LEFT, COL_MID = 1, 5
             ROW_TITLE, ROW_KPI, ROW_FLOW, ROW_TABLE = 1, 4, 10, 18
             
             # Cabeçalho e KPIs
-            ws_dash.merge_range(ROW_TITLE, COL_LEFT, ROW_TITLE, 8, f"Painel de Pendências - {nome_escola}", fmt_dash_title)
-            ws_dash.merge_range(ROW_TITLE+1, COL_LEFT, ROW_TITLE+1, 8, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", wb.add_format({'italic': True, 'font_color': '#595959'}))
+            dash.merge_range(ROW_TITLE, COL_LEFT, ROW_TITLE, 8, f"Painel de Pendências - {nome_escola}", fmt_dash_title)
+            dash.merge_range(ROW_TITLE+1, COL_LEFT, ROW_TITLE+1, 8, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", wb.add_format({'italic': True, 'font_color': '#595959'}))
+
+            # Em constant_memory o valor do KPI vai numa linha com a altura de três
+            # (mesclagem de uma linha só, ver _EscritaPorLinha); fora dele, mesclagem de três linhas
+            linhas_valor_kpi = 1 if memoria_constante else 3
+            if memoria_constante:
+                ws_dash.set_row(ROW_KPI+1, 45)
 
             def escrever_kpi(col, titulo, valor, formato_valor):
-                ws_dash.merge_range(ROW_KPI, col, ROW_KPI, col+1, titulo, fmt_kpi_box)
-                ws_dash.merge_range(ROW_KPI+1, col, ROW_KPI+3, col+1, valor, formato_valor)
+                dash.merge_range(ROW_KPI, col, ROW_KPI, col+1, titulo, fmt_kpi_box)
+                dash.merge_range(ROW_KPI+1, col, ROW_KPI+linhas_valor_kpi, col+1, valor, formato_valor)
 
             escrever_kpi(1, "TOTAL GERAL", total_pendencias, fmt_kpi_num)
             escrever_kpi(3, "REMATRÍCULA", kpi_remat, fmt_sub_num)
@@ -261,11 +425,11 @@ class PendenciaReporter:
             escrever_kpi(7, "RISCO >90d", qtd_zombies, style_zombie)
 
             # Tabela de Fluxo
-            ws_dash.merge_range(ROW_FLOW, COL_LEFT, ROW_FLOW, COL_LEFT+4, "Fluxo de Resolução da Semana", fmt_table_header)
+            dash.merge_range(ROW_FLOW, COL_LEFT, ROW_FLOW, COL_LEFT+4, "Fluxo de Resolução da Semana", fmt_table_header)
             headers_fluxo = ["Categoria", "Total", "Remat.", "Captação", "Status"]
             for i, h in enumerate(headers_fluxo):
                 estilo = fmt_head_remat if h == "Remat." else (fmt_head_matr if h == "Captação" else fmt_header)
-                ws_dash.write(ROW_FLOW+1, COL_LEFT+i, h, estilo)
+                dash.write(ROW_FLOW+1, COL_LEFT+i, h, estilo)
 
             fluxo_dados = [
                 ("Pendências Anterior", qtd_anterior, "-", "-", "Início", fmt_neutro),
@@ -276,37 +440,39 @@ class PendenciaReporter:
 
             for i, (cat, total, r, m, status, fmt) in enumerate(fluxo_dados):
                 row = ROW_FLOW + 2 + i
-                ws_dash.write(row, COL_LEFT, cat, fmt_familia_a)
-                ws_dash.write(row, COL_LEFT+1, total, fmt)
-                ws_dash.write(row, COL_LEFT+2, r, fmt)
-                ws_dash.write(row, COL_LEFT+3, m, fmt)
-                ws_dash.write(row, COL_LEFT+4, status, fmt_familia_a)
+                dash.write(row, COL_LEFT, cat, fmt_familia_a)
+                dash.write(row, COL_LEFT+1, total, fmt)
+                dash.write(row, COL_LEFT+2, r, fmt)
+                dash.write(row, COL_LEFT+3, m, fmt)
+                dash.write(row, COL_LEFT+4, status, fmt_familia_a)
 
             # Detalhamento por Série
-            ws_dash.merge_range(ROW_TABLE, COL_LEFT, ROW_TABLE, COL_LEFT+3, "Detalhamento por Série", fmt_table_header)
+            dash.merge_range(ROW_TABLE, COL_LEFT, ROW_TABLE, COL_LEFT+3, "Detalhamento por Série", fmt_table_header)
             headers_serie = ["Série", "Total", "Remat.", "Matr."]
             for i, h in enumerate(headers_serie):
-                ws_dash.write(ROW_TABLE+1, COL_LEFT+i, h, fmt_header)
+                dash.write(ROW_TABLE+1, COL_LEFT+i, h, fmt_header)
 
             for idx, row in resumo_serie_pivot.iterrows():
                 r = ROW_TABLE + 2 + idx
-                ws_dash.write(r, COL_LEFT, row['Série'], fmt_familia_a)
-                ws_dash.write(r, COL_LEFT+1, row['Total'], fmt_familia_a)
-                ws_dash.write(r, COL_LEFT+2, row['REMATRÍCULA'], fmt_neutro)
-                ws_dash.write(r, COL_LEFT+3, row['MATRÍCULA'], fmt_neutro)
+                dash.write(r, COL_LEFT, row['Série'], fmt_familia_a)
+                dash.write(r, COL_LEFT+1, row['Total'], fmt_familia_a)
+                dash.write(r, COL_LEFT+2, row['REMATRÍCULA'], fmt_neutro)
+                dash.write(r, COL_LEFT+3, row['MATRÍCULA'], fmt_neutro)
 
             # Tabelas Laterais (Aging e Prioridade)
-            ws_dash.merge_range(ROW_TABLE, COL_MID, ROW_TABLE, COL_MID+1, "Tempo de Espera", fmt_table_header)
+            dash.merge_range(ROW_TABLE, COL_MID, ROW_TABLE, COL_MID+1, "Tempo de Espera", fmt_table_header)
             for i, row in resumo_aging.iterrows():
-                ws_dash.write(ROW_TABLE+1+i, COL_MID, row['Faixa_Dias'], fmt_familia_a)
-                ws_dash.write(ROW_TABLE+1+i, COL_MID+1, row['Qtd'], fmt_familia_a)
+                dash.write(ROW_TABLE+1+i, COL_MID, row['Faixa_Dias'], fmt_familia_a)
+                dash.write(ROW_TABLE+1+i, COL_MID+1, row['Qtd'], fmt_familia_a)
 
             row_prio = ROW_TABLE + 1 + len(resumo_aging)
-            ws_dash.merge_range(row_prio, COL_MID, row_prio, COL_MID+1, "Prioridade", fmt_table_header)
+            dash.merge_range(row_prio, COL_MID, row_prio, COL_MID+1, "Prioridade", fmt_table_header)
             for i, row in resumo_status.iterrows():
                 bg = fmt_critico if row['Status_Prioridade'] == 'Crítico' else fmt_novo
-                ws_dash.write(row_prio+1+i, COL_MID, row['Status_Prioridade'], bg)
-                ws_dash.write(row_prio+1+i, COL_MID+1, row['Qtd'], fmt_familia_a)
+                dash.write(row_prio+1+i, COL_MID, row['Status_Prioridade'], bg)
+                dash.write(row_prio+1+i, COL_MID+1, row['Qtd'], fmt_familia_a)
+
+            dash.emitir()
 
             # Gráfico
             ROW_CHART = ROW_TABLE + len(resumo_serie_pivot) + 4
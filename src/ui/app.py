@@ -1,12 +1,19 @@
 import customtkinter as ctk
 import os
-from PIL import Image
+import importlib
 from src.ui.screens.main_menu import MainMenu
-from src.ui.screens.funil_screen import MonitoringScreen
-from src.ui.screens.pendentes_screen import PendenciasScreen
 
 
 class App(ctk.CTk):
+    # Telas construídas sob demanda (nome -> (módulo, classe)).
+    # O módulo só é importado no primeiro acesso: pandas, SQLAlchemy e as engines
+    # ficam fora da abertura do app, e nenhuma consulta roda antes de o usuário escolher o módulo.
+    TELAS = {
+        "MainMenu": ("src.ui.screens.main_menu", "MainMenu"),
+        "MonitoringScreen": ("src.ui.screens.funil_screen", "MonitoringScreen"),
+        "PendenciasScreen": ("src.ui.screens.pendentes_screen", "PendenciasScreen"),
+    }
+
     def __init__(self):
         super().__init__()
 
@@ -33,24 +40,37 @@ class App(ctk.CTk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
-        # Dicionário para armazenar as instâncias das telas
+        # Dicionário para armazenar as instâncias das telas (preenchido sob demanda)
         self.frames = {}
 
-        # Lista de classes de telas a serem instanciadas
-        for F in (MainMenu, MonitoringScreen, PendenciasScreen):
-            page_name = F.__name__
-            frame = F(parent=self.container, controller=self)
-            self.frames[page_name] = frame
+        # Inicia mostrando o Menu Principal (única tela criada na abertura)
+        self._registrar_frame("MainMenu", MainMenu)
+        self.show_frame("MainMenu")
+
+    def _registrar_frame(self, page_name, classe):
+        frame = classe(parent=self.container, controller=self)
+        self.frames[page_name] = frame
 
-            # Coloca todas as telas na mesma posição (empilhadas)
-            frame.grid(row=0, column=0, sticky="nsew")
+        # Coloca todas as telas na mesma posição (empilhadas)
+        frame.grid(row=0, column=0, sticky="nsew")
+        return frame
 
-        # Inicia mostrando o Menu Principal
-        self.show_frame("MainMenu")
+    def _obter_frame(self, page_name):
+        """Devolve a tela, importando o módulo e construindo-a no primeiro acesso."""
+        if page_name not in self.frames:
+            modulo, classe = self.TELAS[page_name]
+            self.configure(cursor="watch")
+            self.update_idletasks()
+            try:
+                classe_tela = getattr(importlib.import_module(modulo), classe)
+                self._registrar_frame(page_name, classe_tela)
+            finally:
+                self.configure(cursor="")
+        return self.frames[page_name]
 
     def show_frame(self, page_name):
         """Traz a tela solicitada para o topo da pilha visual"""
-        frame = self.frames[page_name]
+        frame = self._obter_frame(page_name)
         frame.tkraise()
 
     def go_home(self):
@@ -580,7 +580,7 @@ class MonitoringScreen(ctk.CTkFrame):
 
     def populate_filters(self):
         try:
-            brands = sorted(list(self.engine.unit_map.keys()))
+            brands = self.engine.dimensao_unidades.lista_marcas()
             unique_brands = ["Todas as Marcas"] + brands
             self.cmb_marca.configure(values=unique_brands)
             self.cmb_marca.set("Todas as Marcas")
@@ -595,10 +595,8 @@ class MonitoringScreen(ctk.CTkFrame):
             return
 
         try:
-            brand_info = self.engine.unit_map.get(choice, {})
-            units_list = brand_info.get("unidades", [])
-            unit_names = [u["nome_oficial"] for u in units_list]
-            relevant_units = ["Todas as Filiais"] + sorted(unit_names)
+            unit_names = self.engine.dimensao_unidades.unidades_da_marca(choice)
+            relevant_units = ["Todas as Filiais"] + unit_names
             self.cmb_filial.configure(values=relevant_units)
             self.cmb_filial.set("Todas as Filiais")
         except:
@@ -658,18 +656,21 @@ class MonitoringScreen(ctk.CTkFrame):
             ).pack(pady=20)
             return
 
-        filtered_df = self.df.copy()
+        # Filtros e agrupamento por código: marca e filial saem da dimensão de unidades
+        dimensao = self.engine.dimensao_unidades
+        filtered_df = self.df
         selected_brand = self.marca_var.get()
         selected_branch = self.filial_var.get()
 
         if selected_brand != "Todas as Marcas":
-            filtered_df["temp_marca"] = filtered_df["unidade"].apply(
-                self.engine.extract_marca
-            )
-            filtered_df = filtered_df[filtered_df["temp_marca"] == selected_brand]
+            filtered_df = filtered_df[
+                filtered_df["id_unidade"].isin(dimensao.ids_da_marca(selected_brand))
+            ]
 
         if selected_branch != "Todas as Filiais":
-            filtered_df = filtered_df[filtered_df["unidade"] == selected_branch]
+            filtered_df = filtered_df[
+                filtered_df["id_unidade"] == dimensao.id_de(selected_branch)
+            ]
 
         if filtered_df.empty:
             ctk.CTkLabel(
@@ -679,16 +680,12 @@ class MonitoringScreen(ctk.CTkFrame):
             ).pack(pady=20)
             return
 
-        grouped_data = {}
-        records = filtered_df.to_dict("records")
-
-        for row in records:
-            brand = self.engine.extract_marca(row["unidade"])
-            if brand == "OUTROS":
-                continue
-            if brand not in grouped_data:
-                grouped_data[brand] = []
-            grouped_data[brand].append(row)
+        marcas = dimensao.marcas(filtered_df["id_unidade"])
+        grouped_data = {
+            brand: grupo.to_dict("records")
+            for brand, grupo in filtered_df.groupby(marcas, sort=False)
+            if brand != dimensao.MARCA_PADRAO
+        }
 
         for brand in sorted(grouped_data.keys()):
             rows = grouped_data[brand]
@@ -723,7 +720,9 @@ class MonitoringScreen(ctk.CTkFrame):
             nome_arquivo = f"Relatorio_Consolidado_Geral_{timestamp}.xlsx"
             caminho = os.path.abspath(nome_arquivo)
 
-            sucesso = ReportHandler.gerar_excel_consolidado(self.df, caminho)
+            # Colunas Var%/Delta dos snapshots D-1 e D-7 e Marca pelo id da unidade (sem nova consulta)
+            df_export = self.engine.preparar_exportacao(self.df)
+            sucesso = ReportHandler.gerar_excel_consolidado(df_export, caminho)
             self.after(0, lambda: self._finalizar_exportacao(sucesso, caminho))
         except Exception as e:
             print(f"Erro exportacao: {e}")
@@ -740,9 +739,10 @@ class MonitoringScreen(ctk.CTkFrame):
 
     def export_branch(self, data):
         safe_name = str(data.get("unidade", "relatorio")).replace(" ", "_")
-        ReportHandler.gerar_excel_individual(data, f"Relatorio_{safe_name}.xlsx")
+        df_unico = self.engine.preparar_exportacao(pd.DataFrame([data]))
+        ReportHandler.gerar_excel_consolidado(df_unico, f"Relatorio_{safe_name}.xlsx")
 
     def export_brand(self, brand_name, data_list):
-        df_brand = pd.DataFrame(data_list)
+        df_brand = self.engine.preparar_exportacao(pd.DataFrame(data_list))
         safe_name = brand_name.replace(" ", "_")
         ReportHandler.gerar_excel_consolidado(df_brand, f"Consolidado_{safe_name}.xlsx")
@@ -0,0 +1,45 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def executar_em_paralelo(tarefas, max_workers=4, fallback=None):
+    """
+    Executa tarefas independentes (nome -> callable sem argumentos) num pool de threads limitado.
+
+    Cada tarefa é isolada: uma exceção é logada e o resultado daquela tarefa vira
+    `fallback()` (se informado) ou None, sem derrubar as demais.
+
+    Retorna (resultados, tempos, erros), todos dicionários indexados pelo nome da tarefa.
+    O tempo total fica próximo do max() das tarefas, e não da soma.
+    """
+    resultados, tempos, erros = {}, {}, {}
+    if not tarefas:
+        return resultados, tempos, erros
+
+    def _cronometrar(nome, func):
+        inicio = time.perf_counter()
+        try:
+            return func(), None, time.perf_counter() - inicio
+        except Exception as e:
+            return None, e, time.perf_counter() - inicio
+
+    workers = max(1, min(max_workers, len(tarefas)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extracao") as pool:
+        futuros = {pool.submit(_cronometrar, nome, func): nome for nome, func in tarefas.items()}
+
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            resultado, erro, duracao = futuro.result()
+            tempos[nome] = duracao
+
+            if erro is not None:
+                logging.error(f"Tarefa '{nome}' falhou após {duracao:.2f}s: {erro}")
+                erros[nome] = erro
+                resultado = fallback() if fallback else None
+            else:
+                logging.info(f"Tarefa '{nome}' concluída em {duracao:.2f}s.")
+
+            resultados[nome] = resultado
+
+    return resultados, tempos, erros
@@ -1,11 +1,39 @@
 import os
 import logging
+import threading
 import urllib.parse
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
 
+# SQLAlchemy, o driver e as métricas são importados só quando a engine é criada
+
 # Variável global para armazenar a instância única do pool
 _db_engine_instance = None
+# Criação sob demanda pode acontecer em paralelo (threads de extração do funil)
+_db_engine_lock = threading.Lock()
+
+# Backends suportados (variável DB_BACKEND no .env):
+#   mssql  -> SQL Server de produção (padrão)
+#   replay -> SQLite local com dados sintéticos (src/utils/replay_backend.py)
+BACKENDS_VALIDOS = {"mssql", "replay"}
+
+
+def _instrumentar(engine):
+    """
+    Liga as métricas de pool/cursor (src/utils/db_metrics.py) na engine.
+    Com DB_METRICS_DUMP no .env, grava o snapshot em JSON a cada DB_METRICS_INTERVALO segundos.
+    """
+    from src.utils.db_metrics import get_db_metrics, CAMINHO_DUMP_PADRAO, INTERVALO_DUMP_PADRAO
+
+    metricas = get_db_metrics()
+    metricas.instrumentar(engine)
+
+    dump = os.getenv("DB_METRICS_DUMP")
+    if dump:
+        caminho = CAMINHO_DUMP_PADRAO if dump.strip().lower() in ("1", "true", "sim") else dump
+        intervalo = float(os.getenv("DB_METRICS_INTERVALO", INTERVALO_DUMP_PADRAO))
+        metricas.iniciar_dump_periodico(caminho, intervalo)
+    return engine
+
 
 def get_db_engine():
     """
@@ -17,8 +45,28 @@ def get_db_engine():
     if _db_engine_instance is not None:
         return _db_engine_instance
 
+    with _db_engine_lock:
+        if _db_engine_instance is None:
+            _db_engine_instance = _criar_engine()
+    return _db_engine_instance
+
+
+def _criar_engine():
+    """Cria a engine do backend configurado (chamado uma única vez, sob o lock)."""
     load_dotenv()
 
+    backend = os.getenv("DB_BACKEND", "mssql").strip().lower()
+    if backend not in BACKENDS_VALIDOS:
+        raise ValueError(f"DB_BACKEND inválido: '{backend}'. Use um de {sorted(BACKENDS_VALIDOS)}.")
+
+    if backend == "replay":
+        from src.utils.replay_backend import criar_engine_replay, CAMINHO_PADRAO
+
+        caminho = os.getenv("REPLAY_DB_PATH", CAMINHO_PADRAO)
+        engine = _instrumentar(criar_engine_replay(caminho))
+        logging.info(f"Engine de Banco de Dados inicializada em modo replay ({caminho}).")
+        return engine
+
     server = os.getenv("SERVER")
     database = os.getenv("DATABASE")
     user = os.getenv("USER")
@@ -41,14 +89,30 @@ def get_db_engine():
     params = urllib.parse.quote_plus(conn_str)
     
     try:
-        _db_engine_instance = create_engine(
+        from sqlalchemy import create_engine
+
+        engine = create_engine(
             f"mssql+pyodbc:///?odbc_connect={params}",
             pool_pre_ping=True, # Verifica se a conexão caiu antes de usar
             pool_size=10,       # Mantém até 10 conexões abertas
             max_overflow=20     # Permite picos temporários
         )
+        _instrumentar(engine)
         logging.info("Engine de Banco de Dados inicializada (Singleton).")
-        return _db_engine_instance
+        return engine
     except Exception as e:
         logging.critical(f"Falha fatal ao criar engine de banco: {e}")
         raise
+
+
+def reset_db_engine():
+    """
+    Descarta a instância Singleton (fecha o pool).
+    Usado por benchmarks que alternam entre backends no mesmo processo.
+    """
+    global _db_engine_instance
+
+    with _db_engine_lock:
+        if _db_engine_instance is not None:
+            _db_engine_instance.dispose()
+        _db_engine_instance = None
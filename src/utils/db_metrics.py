@@ -0,0 +1,293 @@
+"""
+Instrumentação do pool de conexões e dos cursores do SQLAlchemy.
+
+Mede, por processo:
+- espera no checkout do pool (fila do QueuePool), já descontados pre-ping e conexões novas;
+- idade da conexão entregue, custo do pre-ping e da abertura de conexões novas;
+- tempo de execute por statement (eventos de cursor) e statements que falharam;
+- tempo de fetch, linhas e bytes por resultado (informado por quem monta o DataFrame).
+
+Os números ficam disponíveis em get_db_metrics().snapshot() e podem ser gravados
+periodicamente em JSON (DB_METRICS_DUMP / DB_METRICS_INTERVALO no .env).
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from src.utils.persistencia import gravar_json
+
+# Quantas amostras recentes guardar por métrica (para média/p50/p95)
+JANELA_AMOSTRAS = 5000
+CAMINHO_DUMP_PADRAO = os.path.join("historico_dados_local", "metricas_banco.json")
+INTERVALO_DUMP_PADRAO = 60
+
+METRICAS = [
+    "checkout_espera",
+    "checkout_total",
+    "idade_conexao",
+    "pre_ping",
+    "conexao_nova",
+    "execute",
+    "fetch",
+]
+
+# Variável global para armazenar a instância única das métricas
+_metrics_instance = None
+_metrics_lock = threading.Lock()
+
+
+def _resumir(amostras):
+    if not amostras:
+        return {"amostras": 0, "media_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    valores = np.array(amostras) * 1000
+    return {
+        "amostras": len(valores),
+        "media_ms": round(float(valores.mean()), 3),
+        "p50_ms": round(float(np.percentile(valores, 50)), 3),
+        "p95_ms": round(float(np.percentile(valores, 95)), 3),
+        "max_ms": round(float(valores.max()), 3),
+    }
+
+
+class MetricasBanco:
+    """Acumulador thread-safe das medições de pool e cursor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Acumuladores por thread: custo de pre-ping/conexão nova dentro do checkout
+        # corrente e execute acumulado desde o último resultado registrado
+        self._local = threading.local()
+        self._engines = []
+        self._thread_dump = None
+        self._parar_dump = threading.Event()
+        self.resetar()
+
+    def resetar(self):
+        with self._lock:
+            self._amostras = {nome: deque(maxlen=JANELA_AMOSTRAS) for nome in METRICAS}
+            self._contadores = {
+                "checkouts": 0,
+                "conexoes_novas": 0,
+                "pre_ping_falhas": 0,
+                "invalidacoes": 0,
+                "statements": 0,
+                "statements_erro": 0,
+                "resultados": 0,
+                "linhas": 0,
+                "bytes": 0,
+            }
+            self.iniciado_em = datetime.now().isoformat()
+
+    # --- Registro ---
+
+    def _registrar(self, metrica, duracao):
+        with self._lock:
+            self._amostras[metrica].append(duracao)
+
+    def _incrementar(self, contador, valor=1):
+        with self._lock:
+            self._contadores[contador] += valor
+
+    def _acumulador(self, nome):
+        return getattr(self._local, nome, 0.0)
+
+    def _somar_acumulador(self, nome, valor):
+        setattr(self._local, nome, self._acumulador(nome) + valor)
+
+    def registrar_resultado(self, duracao_total, df=None, linhas=None, bytes_=None):
+        """
+        Registra um resultado completo (ex: pd.read_sql). O fetch é estimado como o tempo total
+        menos o execute dos cursores desta thread desde o último resultado registrado
+        (inclui a montagem do DataFrame).
+        """
+        execute = self._acumulador("execute")
+        self._local.execute = 0.0
+
+        if df is not None:
+            linhas = len(df)
+            bytes_ = int(df.memory_usage(deep=True).sum())
+
+        with self._lock:
+            self._amostras["fetch"].append(max(0.0, duracao_total - execute))
+            self._contadores["resultados"] += 1
+            self._contadores["linhas"] += linhas or 0
+            self._contadores["bytes"] += bytes_ or 0
+
+    # --- Ganchos do SQLAlchemy ---
+
+    def instrumentar(self, engine):
+        """Liga os eventos de pool/cursor e os wrappers de checkout e pre-ping na engine."""
+        if getattr(engine, "_metricas_instrumentada", False):
+            return engine
+
+        # SQLAlchemy só é carregado quando há engine a instrumentar (o snapshot não depende dele)
+        from sqlalchemy import event
+
+        # Checkout completo: Engine.raw_connection -> Pool.connect (fila + pre-ping + conexão nova).
+        # Wrapper na instância da engine sobrevive ao dispose(), que recria o pool.
+        raw_connection_original = engine.raw_connection
+
+        def raw_connection_medida(*args, **kwargs):
+            self._local.pre_ping = 0.0
+            self._local.conexao_nova = 0.0
+            inicio = time.perf_counter()
+            conexao = raw_connection_original(*args, **kwargs)
+            total = time.perf_counter() - inicio
+            espera = total - self._acumulador("pre_ping") - self._acumulador("conexao_nova")
+            with self._lock:
+                self._amostras["checkout_total"].append(total)
+                self._amostras["checkout_espera"].append(max(0.0, espera))
+            return conexao
+
+        engine.raw_connection = raw_connection_medida
+
+        # Pre-ping (pool_pre_ping=True): o pool chama dialect.do_ping a cada checkout
+        do_ping_original = engine.dialect.do_ping
+
+        def do_ping_medido(dbapi_connection):
+            inicio = time.perf_counter()
+            try:
+                ok = do_ping_original(dbapi_connection)
+            except Exception:
+                ok = False
+                raise
+            finally:
+                duracao = time.perf_counter() - inicio
+                self._somar_acumulador("pre_ping", duracao)
+                self._registrar("pre_ping", duracao)
+                if not ok:
+                    self._incrementar("pre_ping_falhas")
+            return ok
+
+        engine.dialect.do_ping = do_ping_medido
+
+        @event.listens_for(engine, "do_connect")
+        def _antes_de_conectar(dialect, conn_rec, cargs, cparams):
+            self._local.inicio_conexao = time.perf_counter()
+
+        @event.listens_for(engine, "connect")
+        def _conectou(dbapi_connection, connection_record):
+            inicio = getattr(self._local, "inicio_conexao", None)
+            if inicio is not None:
+                duracao = time.perf_counter() - inicio
+                self._local.inicio_conexao = None
+                self._somar_acumulador("conexao_nova", duracao)
+                self._registrar("conexao_nova", duracao)
+            self._incrementar("conexoes_novas")
+
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            self._registrar("idade_conexao", time.time() - connection_record.starttime)
+            self._incrementar("checkouts")
+
+        @event.listens_for(engine, "invalidate")
+        def _invalidada(dbapi_connection, connection_record, exception):
+            self._incrementar("invalidacoes")
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _antes_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("_metricas_inicio", []).append(time.perf_counter())
+            if context is not None:
+                context._metricas_empilhado = True
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _depois_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._metricas_empilhado = False
+            pilha = conn.info.get("_metricas_inicio")
+            if not pilha:
+                return
+            duracao = time.perf_counter() - pilha.pop()
+            self._somar_acumulador("execute", duracao)
+            with self._lock:
+                self._amostras["execute"].append(duracao)
+                self._contadores["statements"] += 1
+
+        @event.listens_for(engine, "handle_error")
+        def _erro_execute(contexto):
+            # Statement que falhou não chega ao after_cursor_execute: descarta o início empilhado,
+            # senão ele ficaria no conn.info da conexão devolvida ao pool
+            execucao = contexto.execution_context
+            if execucao is None or not getattr(execucao, "_metricas_empilhado", False):
+                return
+            execucao._metricas_empilhado = False
+            pilha = contexto.connection.info.get("_metricas_inicio")
+            if pilha:
+                pilha.pop()
+            self._incrementar("statements_erro")
+
+        engine._metricas_instrumentada = True
+        self._engines.append(engine)
+        return engine
+
+    # --- Consulta / Exportação ---
+
+    def _status_pool(self, engine):
+        pool = engine.pool
+        status = {"classe": type(pool).__name__, "url": engine.url.render_as_string(hide_password=True)}
+        for atributo in ("size", "checkedout", "overflow", "checkedin"):
+            metodo = getattr(pool, atributo, None)
+            if callable(metodo):
+                status[atributo] = metodo()
+        return status
+
+    def snapshot(self):
+        """Dicionário com pool(s), contadores e resumo (média/p50/p95/máx em ms) de cada métrica."""
+        with self._lock:
+            amostras = {nome: list(valores) for nome, valores in self._amostras.items()}
+            contadores = dict(self._contadores)
+        return {
+            "gerado_em": datetime.now().isoformat(),
+            "desde": self.iniciado_em,
+            "pools": [self._status_pool(engine) for engine in self._engines],
+            "contadores": contadores,
+            "metricas": {nome: _resumir(valores) for nome, valores in amostras.items()},
+        }
+
+    def salvar_json(self, caminho=CAMINHO_DUMP_PADRAO):
+        gravar_json(caminho, self.snapshot())
+
+    def iniciar_dump_periodico(self, caminho=CAMINHO_DUMP_PADRAO, intervalo=INTERVALO_DUMP_PADRAO):
+        """Grava o snapshot em `caminho` a cada `intervalo` segundos (thread daemon)."""
+        if self._thread_dump and self._thread_dump.is_alive():
+            return
+
+        def _loop():
+            while not self._parar_dump.wait(intervalo):
+                try:
+                    self.salvar_json(caminho)
+                except Exception as e:
+                    logging.warning(f"Falha ao gravar métricas do banco: {e}")
+
+        self._parar_dump.clear()
+        self._thread_dump = threading.Thread(target=_loop, name="dump-metricas-banco", daemon=True)
+        self._thread_dump.start()
+        logging.info(f"Métricas do banco gravadas em {caminho} a cada {intervalo}s.")
+
+    def parar_dump_periodico(self):
+        self._parar_dump.set()
+
+    def log_resumo(self):
+        dados = self.snapshot()
+        m = dados["metricas"]
+        logging.info(
+            f"[POOL] {dados['contadores']['checkouts']} checkouts, "
+            f"espera p95 {m['checkout_espera']['p95_ms']}ms, pre-ping p95 {m['pre_ping']['p95_ms']}ms, "
+            f"execute p95 {m['execute']['p95_ms']}ms, fetch p95 {m['fetch']['p95_ms']}ms, "
+            f"{dados['contadores']['linhas']} linhas / {dados['contadores']['bytes'] / 1024 ** 2:.1f} MB"
+        )
+
+
+def get_db_metrics():
+    """Retorna a instância Singleton das métricas de banco."""
+    global _metrics_instance
+
+    with _metrics_lock:
+        if _metrics_instance is None:
+            _metrics_instance = MetricasBanco()
+        return _metrics_instance
@@ -0,0 +1,183 @@
+import os
+import json
+import logging
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+CAMINHO_NORMALIZACAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "normalization.json")
+
+
+class DimensaoUnidades:
+    """
+    Dimensão de unidades com chave inteira, montada a partir do normalization.json.
+
+    Cada unidade oficial recebe um id_unidade; nome oficial e aliases apontam para o mesmo id.
+    Tabelas de fatos carregam só o id, e marca/status/sucessora saem de lookups por código
+    (arrays indexados pelo id), sem quebrar strings linha a linha.
+    Nomes fora do cadastro ganham um id novo na primeira ocorrência; a marca vem do
+    prefixo mais longo que coincide com uma marca cadastrada (ou OUTROS).
+    """
+
+    ID_NAO_IDENTIFICADA = 0
+    NOME_NAO_IDENTIFICADA = "Leads Sem Unidade Identificada"
+    MARCA_PADRAO = "OUTROS"
+    COLUNAS = ["id_unidade", "nome_oficial", "marca", "status", "sucessora", "id_consolidado"]
+
+    def __init__(self, mapa):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._linhas = [{
+            "id_unidade": self.ID_NAO_IDENTIFICADA,
+            "nome_oficial": self.NOME_NAO_IDENTIFICADA,
+            "marca": self.MARCA_PADRAO,
+            "status": "ativo",
+            "sucessora": None,
+        }]
+        self._por_chave = {}
+
+        for marca, info in mapa.items():
+            for unidade in info.get("unidades", []):
+                id_unidade = len(self._linhas)
+                self._linhas.append({
+                    "id_unidade": id_unidade,
+                    "nome_oficial": unidade["nome_oficial"],
+                    "marca": marca,
+                    "status": unidade.get("status", "ativo"),
+                    "sucessora": unidade.get("sucessora"),
+                })
+                for nome in [unidade["nome_oficial"], *unidade.get("aliases", [])]:
+                    self._por_chave.setdefault(self.chave(nome), id_unidade)
+
+        # Marcas por tamanho decrescente: "GLOBAL TREE" casa antes de um eventual "GLOBAL"
+        self._chaves_marca = sorted(
+            ((self.chave(m), m) for m in mapa if m != self.MARCA_PADRAO), key=lambda x: -len(x[0])
+        )
+        self._atualizar_arrays()
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_NORMALIZACAO):
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except Exception as e:
+            logging.error(f"Erro ao carregar normalization.json: {e}")
+            return cls({})
+
+    @staticmethod
+    def chave(nome):
+        """Chave de busca: caixa alta, sem espaços nas pontas e sem acentos."""
+        texto = str(nome).upper().strip()
+        return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+    def _atualizar_arrays(self):
+        """Arrays indexados pelo id (lookups vetorizados) e a tabela da dimensão."""
+        tabela = pd.DataFrame(self._linhas, columns=self.COLUNAS[:-1])
+        ids_sucessora = [
+            self._por_chave.get(self.chave(s), i) if isinstance(s, str) and s else i
+            for i, s in zip(tabela["id_unidade"], tabela["sucessora"])
+        ]
+        tabela["id_consolidado"] = np.asarray(ids_sucessora, dtype=np.int32)
+        tabela["id_unidade"] = tabela["id_unidade"].astype(np.int32)
+        tabela["marca"] = tabela["marca"].astype("category")
+        tabela["status"] = tabela["status"].astype("category")
+        self._tabela = tabela
+        self._marcas = tabela["marca"].to_numpy(dtype=object)
+        self._nomes = tabela["nome_oficial"].to_numpy(dtype=object)
+
+    # --- Codificação ---
+
+    def _registrar(self, nome, chave):
+        # Prefixo em fronteira de palavra ("QI - TIJUCA" casa QI; "QUINTA" não)
+        marca = next(
+            (m for c, m in self._chaves_marca
+             if chave.startswith(c) and (len(chave) == len(c) or not chave[len(c)].isalnum())),
+            self.MARCA_PADRAO,
+        )
+        id_unidade = len(self._linhas)
+        self._linhas.append({
+            "id_unidade": id_unidade,
+            "nome_oficial": str(nome).strip(),
+            "marca": marca,
+            "status": "nao_cadastrada",
+            "sucessora": None,
+        })
+        self._por_chave[chave] = id_unidade
+        return id_unidade
+
+    def _resolver(self, nome):
+        """Id para o nome (registra nomes novos); devolve (id, registrou_novo). Chamar com o lock."""
+        # Nulos usam a chave "NAN" (o normalization.json pode cadastrá-la como alias)
+        chave = "NAN" if nome is None or pd.isna(nome) else self.chave(nome)
+        id_unidade = self._por_chave.get(chave)
+        if id_unidade is not None:
+            return id_unidade, False
+        if chave in ("", "NAN", "NONE", "NULL"):
+            return self.ID_NAO_IDENTIFICADA, False
+        return self._registrar(nome, chave), True
+
+    def id_de(self, nome):
+        """Id da unidade para um nome oficial ou alias (nomes novos são registrados)."""
+        with self._lock:
+            id_unidade, novo = self._resolver(nome)
+            if novo:
+                self._atualizar_arrays()
+            return id_unidade
+
+    def codificar(self, serie):
+        """Coluna de nomes -> array int32 de ids, resolvendo cada valor distinto uma única vez."""
+        codigos, distintos = pd.factorize(pd.Series(serie).astype(object), use_na_sentinel=True)
+        with self._lock:
+            resolvidos = [self._resolver(v) for v in distintos] + [self._resolver(None)]
+            if any(novo for _, novo in resolvidos):
+                self._atualizar_arrays()
+        ids_distintos = np.array([i for i, _ in resolvidos], dtype=np.int32)
+        return ids_distintos[codigos]  # sentinela -1 (nulo) cai no último item
+
+    # --- Lookups ---
+
+    @property
+    def tabela(self):
+        """DataFrame da dimensão: id_unidade, nome_oficial, marca, status, sucessora, id_consolidado."""
+        return self._tabela
+
+    def marcas(self, ids):
+        """Marca de cada id (array), via indexação direta."""
+        return self._marcas[np.asarray(ids, dtype=np.int64)]
+
+    def nomes(self, ids):
+        """Nome oficial de cada id (array)."""
+        return self._nomes[np.asarray(ids, dtype=np.int64)]
+
+    def marca_de(self, nome):
+        return self._marcas[self.id_de(nome)]
+
+    def lista_marcas(self):
+        """Marcas cadastradas (sem OUTROS), em ordem alfabética."""
+        return sorted(m for m in self._tabela["marca"].unique() if m != self.MARCA_PADRAO)
+
+    def ids_da_marca(self, marca):
+        return self._tabela.loc[self._tabela["marca"] == marca, "id_unidade"].to_numpy()
+
+    def unidades_da_marca(self, marca):
+        """Nomes oficiais das unidades cadastradas de uma marca, em ordem alfabética."""
+        tabela = self._tabela
+        filtro = (tabela["marca"] == marca) & (tabela["status"] != "nao_cadastrada")
+        return sorted(tabela.loc[filtro, "nome_oficial"])
+
+
+# Variável global para armazenar a instância única da dimensão
+_dimensao = None
+_dimensao_lock = threading.Lock()
+
+
+def get_dimensao_unidades():
+    """Retorna a instância única da dimensão de unidades (carregada do normalization.json)."""
+    global _dimensao
+    if _dimensao is None:
+        with _dimensao_lock:
+            if _dimensao is None:
+                _dimensao = DimensaoUnidades.carregar()
+    return _dimensao
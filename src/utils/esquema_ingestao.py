@@ -0,0 +1,182 @@
+"""
+Esquema declarativo de tipos aplicado aos DataFrames na ingestão (saída do pd.read_sql).
+
+Cada consulta declara suas colunas:
+- "categoria": textos de baixa cardinalidade (unidade, Marca, Curso...) viram category;
+  groupby/merge/filtros passam a trabalhar sobre códigos inteiros;
+- "inteiro": menor tipo inteiro que comporta os valores (int8/int16/int32...);
+- "data": datetime64 com parse explícito ISO 8601 (sem inferência de dayfirst por bloco);
+- "texto": mantém object (chaves quase únicas, como RA e nome do aluno).
+
+Colunas declaradas e ausentes no DataFrame são ignoradas.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+TIPOS_COLUNA = {"categoria", "inteiro", "data", "texto"}
+
+
+def _converter_coluna(serie, tipo):
+    if tipo == "categoria":
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            return serie
+        return serie.astype("category")
+
+    if tipo == "inteiro":
+        numeros = pd.to_numeric(serie, errors="coerce")
+        if numeros.isna().any():
+            # Com nulos, usa o inteiro anulável do pandas
+            return numeros.astype("Int32" if numeros.abs().max() <= np.iinfo("int32").max else "Int64")
+        return pd.to_numeric(numeros, downcast="integer")
+
+    if tipo == "data":
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        amostra = serie.dropna()
+        if not amostra.empty and isinstance(amostra.iloc[0], str):
+            return pd.to_datetime(serie, format="ISO8601", errors="coerce")
+        return pd.to_datetime(serie, errors="coerce")
+
+    return serie
+
+
+class EsquemaIngestao:
+    """Mapa coluna -> tipo, aplicado logo após a leitura de cada consulta/bloco."""
+
+    def __init__(self, colunas):
+        invalidos = {c: t for c, t in colunas.items() if t not in TIPOS_COLUNA}
+        if invalidos:
+            raise ValueError(f"Tipos de coluna inválidos: {invalidos}. Use um de {sorted(TIPOS_COLUNA)}.")
+        self.colunas = dict(colunas)
+
+    def aplicar(self, df):
+        """
+        Converte as colunas declaradas (em novo DataFrame) e devolve (df, relatorio),
+        onde relatorio = {"bytes_antes", "bytes_depois", "colunas": {coluna: (antes, depois)}}.
+        """
+        relatorio = {"bytes_antes": 0, "bytes_depois": 0, "colunas": {}}
+        if df is None or df.empty:
+            return df, relatorio
+
+        antes = df.memory_usage(deep=True)
+        df = df.copy(deep=False)
+        for coluna, tipo in self.colunas.items():
+            if coluna in df.columns and tipo != "texto":
+                try:
+                    df[coluna] = _converter_coluna(df[coluna], tipo)
+                except Exception as e:
+                    logging.warning(f"Esquema: coluna '{coluna}' mantida como {df[coluna].dtype} ({e}).")
+        depois = df.memory_usage(deep=True)
+
+        relatorio["bytes_antes"] = int(antes.sum())
+        relatorio["bytes_depois"] = int(depois.sum())
+        relatorio["colunas"] = {
+            c: (int(antes[c]), int(depois[c])) for c in self.colunas if c in df.columns
+        }
+        return df, relatorio
+
+
+def relatorio_memoria(relatorio):
+    """DataFrame coluna a coluna (MB antes/depois) a partir do relatório de EsquemaIngestao.aplicar."""
+    linhas = [
+        {"coluna": c, "mb_antes": antes / 1024 ** 2, "mb_depois": depois / 1024 ** 2}
+        for c, (antes, depois) in relatorio.get("colunas", {}).items()
+    ]
+    linhas.append({
+        "coluna": "TOTAL",
+        "mb_antes": relatorio.get("bytes_antes", 0) / 1024 ** 2,
+        "mb_depois": relatorio.get("bytes_depois", 0) / 1024 ** 2,
+    })
+    df = pd.DataFrame(linhas)
+    df["reducao_%"] = (1 - df["mb_depois"] / df["mb_antes"].where(df["mb_antes"] > 0)).mul(100).round(1)
+    return df.round({"mb_antes": 3, "mb_depois": 3})
+
+
+def mapear_categorias(serie, func, valor_nulo=None):
+    """
+    Aplica `func` só aos valores distintos de uma coluna (categórica ou fatorada)
+    e reconstrói a coluna categórica pelos códigos. Resultados repetidos são fundidos numa só categoria.
+    `valor_nulo` (se informado) substitui os nulos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        codigos = serie.cat.codes.to_numpy()
+    else:
+        # factorize não ordena os distintos (mais barato que astype("category"))
+        codigos, categorias = pd.factorize(serie)
+
+    return _recodificar(serie, codigos, [func(c) for c in categorias], valor_nulo)
+
+
+def _recodificar(serie, codigos, novos, valor_nulo=None):
+    """Reconstrói a coluna categórica a partir dos códigos e do novo valor de cada distinto."""
+    novos = list(novos)
+    if valor_nulo is not None:
+        codigos = np.where(codigos == -1, len(novos), codigos)
+        novos.append(valor_nulo)
+
+    remapeamento, unicos = pd.factorize(pd.Index(novos, dtype=object))
+    novos_codigos = np.where(codigos == -1, -1, remapeamento[codigos]) if len(codigos) else codigos
+    return pd.Series(
+        pd.Categorical.from_codes(novos_codigos, categories=unicos),
+        index=serie.index,
+        name=serie.name,
+    )
+
+
+def ordenar_lista_agregada(serie, separador, valor_nulo=""):
+    """
+    Limpa listas concatenadas (ex: STRING_AGG): separa pelos itens, tira espaços das pontas,
+    remove repetidos e junta de volta em ordem alfabética com `separador`.
+
+    Trabalha sobre os valores distintos: os tokens (split/explode) são fatorados e recebem a
+    posição na ordem alfabética; pares (distinto, posição) viram uma chave inteira, e um único
+    np.unique deduplica e ordena tudo. A junção é um reduceat sobre os tokens já ordenados.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        codigos = serie.cat.codes.to_numpy()
+    else:
+        codigos, categorias = pd.factorize(serie)
+    if len(categorias) == 0:
+        return _recodificar(serie, codigos, [], valor_nulo)
+
+    tokens = pd.Series(categorias, dtype=object).astype(str).str.split(separador, regex=False).explode()
+    codigos_token, distintos_token = pd.factorize(tokens.to_numpy())
+    limpos = pd.Series(distintos_token, dtype=object).str.strip().to_numpy()
+    vocabulario = np.array(sorted(set(limpos)), dtype=object)
+    posicao = pd.Index(vocabulario).get_indexer(limpos)[codigos_token]
+
+    chaves = np.unique(tokens.index.to_numpy(dtype=np.int64) * len(vocabulario) + posicao)
+    distinto, posicao = np.divmod(chaves, len(vocabulario))
+    inicios = np.flatnonzero(np.r_[True, distinto[1:] != distinto[:-1]])
+    pecas = np.array([separador + v for v in vocabulario], dtype=object)[posicao]
+    juntos = pd.Series(np.add.reduceat(pecas, inicios), dtype=object).str.slice(len(separador))
+    return _recodificar(serie, codigos, juntos.to_numpy(), valor_nulo)
+
+
+def concatenar_blocos(partes):
+    """
+    pd.concat que preserva colunas categóricas entre blocos com categorias diferentes
+    (o concat puro cairia para object). As categorias são unidas antes da concatenação.
+    """
+    partes = [p for p in partes if p is not None]
+    if not partes:
+        return pd.DataFrame()
+
+    categoricas = {
+        c for p in partes for c in p.columns if isinstance(p[c].dtype, pd.CategoricalDtype)
+    }
+    if categoricas:
+        partes = [p.copy(deep=False) for p in partes]
+        for coluna in categoricas:
+            presentes = [p for p in partes if coluna in p.columns]
+            if not all(isinstance(p[coluna].dtype, pd.CategoricalDtype) for p in presentes):
+                continue
+            unidas = pd.api.types.union_categoricals([p[coluna] for p in presentes]).categories
+            for p in presentes:
+                p[coluna] = p[coluna].cat.set_categories(unidas)
+
+    return pd.concat(partes, ignore_index=True)
@@ -0,0 +1,141 @@
+"""
+Gravação de DataFrames em segundo plano (dumps de conferência, análises brutas).
+
+Quem produz os dados só enfileira e segue: uma thread única grava os arquivos na ordem
+de chegada, aplica a retenção da pasta e registra o resultado no log. A fila é limitada;
+com ela cheia, o dump mais novo é descartado (com aviso) em vez de travar o chamador.
+"""
+import os
+import glob
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from src.utils.persistencia import PARQUET_DISPONIVEL, gravar_atomico
+
+FORMATOS = ("parquet", "csv", "xlsx")
+TAMANHO_FILA_PADRAO = 4
+MANTER_ARQUIVOS_PADRAO = 10
+
+# Variável global para armazenar a instância única do exportador
+_exportador_instance = None
+_exportador_lock = threading.Lock()
+
+
+class ExportadorAssincrono:
+    """Fila de gravação atendida por uma thread daemon (iniciada no primeiro envio)."""
+
+    def __init__(self, tamanho_fila=TAMANHO_FILA_PADRAO):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.ultimo_gravado = None
+
+    @staticmethod
+    def _extensao(formato):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato}. Use um de {list(FORMATOS)}.")
+        if formato == "parquet" and not PARQUET_DISPONIVEL:
+            return "csv.gz"
+        return formato
+
+    def enviar(self, df, pasta, prefixo, formato="parquet", manter=MANTER_ARQUIVOS_PADRAO):
+        """
+        Enfileira `df` para gravação em `pasta/<prefixo>_<timestamp>.<formato>` e retorna
+        o caminho previsto (ou None se a fila estiver cheia). Depois de gravar, só os
+        `manter` arquivos mais recentes com o mesmo prefixo ficam na pasta.
+
+        O DataFrame é enfileirado como cópia profunda: alterações feitas pelo chamador
+        depois do envio (inclusive .loc/.iloc no lugar, sem copy-on-write) não aparecem no arquivo.
+        """
+        extensao = self._extensao(formato)
+        caminho = os.path.join(pasta, f"{prefixo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extensao}")
+        tarefa = (df.copy(deep=True), caminho, prefixo, extensao, manter)
+
+        self._iniciar()
+        try:
+            self._fila.put_nowait(tarefa)
+        except queue.Full:
+            self.logger.warning(f"Fila de exportação cheia; dump {os.path.basename(caminho)} descartado.")
+            return None
+        return caminho
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até a fila esvaziar (ou `timeout` segundos). Retorna True se esvaziou."""
+        with self._fila.all_tasks_done:
+            if timeout is None:
+                while self._fila.unfinished_tasks:
+                    self._fila.all_tasks_done.wait()
+                return True
+            return self._fila.all_tasks_done.wait_for(lambda: not self._fila.unfinished_tasks, timeout)
+
+    # --- Thread de gravação ---
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="exportador-async", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            df, caminho, prefixo, extensao, manter = self._fila.get()
+            try:
+                self._gravar(df, caminho, extensao)
+                self._aplicar_retencao(os.path.dirname(caminho), prefixo, extensao, manter)
+                self.ultimo_gravado = caminho
+                self.logger.info(f"✅ Arquivo de conferência gerado: {caminho} ({len(df)} linhas)")
+            except Exception as e:
+                self.logger.error(f"Falha ao gravar {caminho}: {e}")
+            finally:
+                self._fila.task_done()
+
+    @staticmethod
+    def _gravar(df, caminho, extensao):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        # Grava num temporário e renomeia: a pasta nunca expõe um arquivo pela metade
+        # (o "~" vai no início do nome para a extensão continuar válida para o writer do Excel)
+        temporario = os.path.join(os.path.dirname(caminho), "~" + os.path.basename(caminho))
+
+        def escrever(destino):
+            if extensao == "parquet":
+                df.to_parquet(destino, index=False)
+            elif extensao == "xlsx":
+                df.to_excel(destino, index=False, engine="xlsxwriter")
+            else:
+                df.to_csv(destino, index=False, compression="gzip" if extensao.endswith(".gz") else None)
+
+        gravar_atomico(caminho, escrever, temporario)
+
+    def _aplicar_retencao(self, pasta, prefixo, extensao, manter):
+        if not manter:
+            return
+        arquivos = sorted(glob.glob(os.path.join(pasta, f"{glob.escape(prefixo)}_*.{extensao}")))
+        for antigo in arquivos[:-manter]:
+            try:
+                os.remove(antigo)
+            except OSError as e:
+                self.logger.warning(f"Não foi possível remover {antigo}: {e}")
+
+
+def _esvaziar_ao_sair():
+    # Dá aos dumps pendentes uma chance de terminar quando o programa encerra
+    if _exportador_instance is not None:
+        _exportador_instance.aguardar(timeout=30)
+
+
+atexit.register(_esvaziar_ao_sair)
+
+
+def get_exportador():
+    """Retorna a instância Singleton do exportador em segundo plano."""
+    global _exportador_instance
+
+    with _exportador_lock:
+        if _exportador_instance is None:
+            _exportador_instance = ExportadorAssincrono()
+        return _exportador_instance
@@ -0,0 +1,118 @@
+"""
+Persistência local compartilhada pelos armazenamentos em disco (cache de consultas, espelho
+do CRM, agregado diário, snapshots do funil, histórico de pendências, índice de RAs, dumps).
+
+- Escrita atômica: grava num temporário e troca com os.replace (leitores nunca veem
+  arquivo pela metade, e uma falha no meio não destrói a versão anterior).
+- DataFrames em Parquet (colunar, comprimido) com Pickle como fallback quando o pyarrow
+  não está instalado ou o DataFrame não é serializável em Parquet (object com tipos mistos).
+- Estado/índices em JSON, com leitura tolerante a arquivo ausente ou corrompido.
+"""
+import os
+import json
+import logging
+import importlib.util
+
+# Só verifica se o pyarrow está instalado; quem lê/grava Parquet (via pandas) é que o carrega
+PARQUET_DISPONIVEL = importlib.util.find_spec("pyarrow") is not None
+
+EXTENSOES_DATAFRAME = (".parquet", ".pickle")
+
+
+def gravar_atomico(caminho, escrever, temporario=None):
+    """
+    Chama `escrever(temporario)` e troca o temporário pelo `caminho` final.
+    Se a escrita falhar, o temporário é removido e a exceção propagada.
+    """
+    temporario = temporario or caminho + ".tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        remover_arquivo(temporario)
+        raise
+    return caminho
+
+
+def remover_arquivo(caminho):
+    """Remove o arquivo se existir (sem erro quando já não existe ou está em uso)."""
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+# --- DataFrames ---
+
+def gravar_dataframe(df, caminho_base, index=False, compression="snappy"):
+    """
+    Grava `df` em <caminho_base>.parquet (ou .pickle no fallback) de forma atômica e
+    devolve o caminho gravado. A versão na outra extensão, se houver, é removida para
+    que ler_dataframe(caminho_base) nunca encontre um arquivo antigo.
+    """
+    os.makedirs(os.path.dirname(caminho_base) or ".", exist_ok=True)
+    caminho = None
+    if PARQUET_DISPONIVEL:
+        try:
+            caminho = gravar_atomico(
+                caminho_base + ".parquet",
+                lambda tmp: df.to_parquet(tmp, index=index, compression=compression),
+            )
+        except Exception:
+            # Colunas object com tipos mistos não vão para Parquet
+            caminho = None
+    if caminho is None:
+        caminho = gravar_atomico(caminho_base + ".pickle", df.to_pickle)
+
+    for extensao in EXTENSOES_DATAFRAME:
+        if not caminho.endswith(extensao):
+            remover_arquivo(caminho_base + extensao)
+    return caminho
+
+
+def ler_dataframe(caminho, colunas=None):
+    """
+    Lê um DataFrame gravado por gravar_dataframe. `caminho` pode ser o arquivo (extensão
+    define o formato) ou o caminho base sem extensão. FileNotFoundError se não existir.
+    """
+    import pandas as pd
+
+    if not caminho.endswith(EXTENSOES_DATAFRAME):
+        existentes = [caminho + e for e in EXTENSOES_DATAFRAME if os.path.exists(caminho + e)]
+        if not existentes:
+            raise FileNotFoundError(caminho)
+        caminho = existentes[0]
+
+    if caminho.endswith(".parquet"):
+        return pd.read_parquet(caminho, columns=colunas)
+    df = pd.read_pickle(caminho)
+    return df[colunas] if colunas else df
+
+
+# --- JSON (estado e índices) ---
+
+def gravar_json(caminho, dados, indent=4):
+    """Grava `dados` em JSON de forma atômica."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+
+    def escrever(temporario):
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, indent=indent, ensure_ascii=False)
+
+    return gravar_atomico(caminho, escrever)
+
+
+def ler_json(caminho, padrao=None, descricao=None):
+    """
+    Conteúdo do JSON, ou `padrao` (dict vazio se omitido) quando o arquivo não existe.
+    Arquivo ilegível também devolve `padrao`, com aviso no log citando `descricao`.
+    """
+    padrao = {} if padrao is None else padrao
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return padrao
+    except Exception as e:
+        logging.warning(f"{descricao or caminho} ilegível, recomeçando: {e}")
+        return padrao
@@ -0,0 +1,197 @@
+"""
+Cache persistente de resultados de consultas.
+
+- Chave: hash do texto SQL normalizado + parâmetros + banco de origem.
+- Armazenamento: Parquet (colunar, comprimido); Pickle como fallback quando o
+  pyarrow não está instalado ou o DataFrame não é serializável em Parquet.
+- Expiração por TTL (definido por consulta) e despejo LRU ao exceder o tamanho máximo.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from src.utils.persistencia import (
+    gravar_dataframe, ler_dataframe, gravar_json, ler_json, remover_arquivo,
+)
+
+PASTA_PADRAO = os.path.join("historico_dados_local", "cache_consultas")
+TAMANHO_MAXIMO_PADRAO = 512 * 1024 ** 2  # 512 MB
+# Acessos (LRU) ficam em memória; sessões só de leitura gravam o índice no máximo uma vez neste intervalo
+INTERVALO_SALVAR_ACESSOS = 300
+
+
+# Variável global para armazenar a instância única do cache
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def _serializar_parametro(valor):
+    if isinstance(valor, (list, tuple, set)):
+        return [_serializar_parametro(v) for v in valor]
+    return str(valor)
+
+
+def gerar_chave(sql, params=None, origem=""):
+    """Chave de conteúdo: mesmo SQL (ignorando espaços) + mesmos parâmetros = mesma chave."""
+    sql_normalizado = re.sub(r"\s+", " ", str(sql)).strip()
+    params_json = json.dumps(
+        {k: _serializar_parametro(v) for k, v in (params or {}).items()}, sort_keys=True
+    )
+    conteudo = f"{origem}\n{sql_normalizado}\n{params_json}"
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """Cache em disco com índice JSON, TTL por entrada e despejo LRU por tamanho."""
+
+    ARQUIVO_INDICE = "indice.json"
+
+    def __init__(self, pasta=PASTA_PADRAO, tamanho_maximo=TAMANHO_MAXIMO_PADRAO):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        os.makedirs(self.pasta, exist_ok=True)
+        self._indice = self._carregar_indice()
+        self._indice_salvo_em = time.time()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_economizados = 0
+
+    # --- Índice ---
+
+    def _caminho_indice(self):
+        return os.path.join(self.pasta, self.ARQUIVO_INDICE)
+
+    def _carregar_indice(self):
+        indice = ler_json(self._caminho_indice(), descricao="Índice do cache de consultas")
+
+        # Descarta entradas cujo arquivo sumiu
+        return {
+            chave: meta for chave, meta in indice.items()
+            if os.path.exists(os.path.join(self.pasta, meta["arquivo"]))
+        }
+
+    def _salvar_indice(self):
+        gravar_json(self._caminho_indice(), self._indice, indent=None)
+        self._indice_salvo_em = time.time()
+
+    # --- Leitura / Escrita ---
+
+    def obter(self, chave, ttl):
+        """Devolve o DataFrame em cache (se existir e tiver menos de `ttl` segundos) ou None."""
+        with self._lock:
+            meta = self._indice.get(chave)
+            if meta is None or time.time() - meta["criado_em"] > ttl:
+                self.misses += 1
+                return None
+            meta["ultimo_acesso"] = time.time()
+
+        try:
+            df = ler_dataframe(os.path.join(self.pasta, meta["arquivo"]))
+        except Exception as e:
+            logging.warning(f"Falha ao ler cache {chave[:12]}: {e}")
+            self.invalidar(chave)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_economizados += meta.get("bytes_memoria", 0)
+            # ultimo_acesso já foi atualizado em memória; vai para o disco no próximo gravar/invalidar
+            if time.time() - self._indice_salvo_em > INTERVALO_SALVAR_ACESSOS:
+                self._salvar_indice()
+        return df
+
+    def gravar(self, chave, df, consulta=""):
+        """Persiste o resultado e aplica o limite de tamanho (LRU)."""
+        # Escrita atômica (leitores concorrentes nunca veem arquivo parcial), Parquet com fallback para pickle
+        try:
+            caminho = gravar_dataframe(df, os.path.join(self.pasta, chave), index=True, compression="zstd")
+        except Exception as e:
+            logging.warning(f"Falha ao gravar cache da consulta '{consulta}': {e}")
+            return
+        arquivo = os.path.basename(caminho)
+        formato = os.path.splitext(arquivo)[1][1:]
+
+        agora = time.time()
+        with self._lock:
+            antigo = self._indice.get(chave)
+            if antigo and antigo["arquivo"] != arquivo:
+                self._remover_arquivo(antigo["arquivo"])
+
+            self._indice[chave] = {
+                "arquivo": arquivo,
+                "formato": formato,
+                "consulta": consulta,
+                "bytes": os.path.getsize(caminho),
+                "bytes_memoria": int(df.memory_usage(deep=True).sum()),
+                "linhas": len(df),
+                "criado_em": agora,
+                "ultimo_acesso": agora,
+            }
+            self._despejar_lru()
+            self._salvar_indice()
+
+    def invalidar(self, chave=None, consulta=None):
+        """Remove uma entrada, todas as entradas de uma consulta, ou tudo (sem argumentos)."""
+        with self._lock:
+            alvos = [
+                c for c, meta in self._indice.items()
+                if (chave is None or c == chave) and (consulta is None or meta.get("consulta") == consulta)
+            ]
+            for c in alvos:
+                self._remover_arquivo(self._indice.pop(c)["arquivo"])
+            self._salvar_indice()
+        return len(alvos)
+
+    def _despejar_lru(self):
+        total = sum(meta["bytes"] for meta in self._indice.values())
+        if total <= self.tamanho_maximo:
+            return
+
+        for chave, meta in sorted(self._indice.items(), key=lambda item: item[1]["ultimo_acesso"]):
+            if total <= self.tamanho_maximo:
+                break
+            self._remover_arquivo(meta["arquivo"])
+            del self._indice[chave]
+            total -= meta["bytes"]
+            logging.info(f"Cache: entrada '{meta.get('consulta')}' despejada (LRU).")
+
+    def _remover_arquivo(self, arquivo):
+        remover_arquivo(os.path.join(self.pasta, arquivo))
+
+    # --- Métricas ---
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / consultas, 4) if consultas else 0.0,
+                "bytes_economizados": self.bytes_economizados,
+                "entradas": len(self._indice),
+                "bytes_em_disco": sum(meta["bytes"] for meta in self._indice.values()),
+            }
+
+
+def get_query_cache():
+    """
+    Retorna a instância Singleton do cache.
+    Pasta e tamanho podem ser definidos por QUERY_CACHE_DIR / QUERY_CACHE_MAX_MB no .env.
+    """
+    global _cache_instance
+
+    with _cache_lock:
+        if _cache_instance is None:
+            pasta = os.getenv("QUERY_CACHE_DIR", PASTA_PADRAO)
+            tamanho_mb = os.getenv("QUERY_CACHE_MAX_MB")
+            tamanho = int(float(tamanho_mb) * 1024 ** 2) if tamanho_mb else TAMANHO_MAXIMO_PADRAO
+            _cache_instance = QueryCache(pasta, tamanho)
+        return _cache_instance
@@ -0,0 +1,255 @@
+import time
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from src.utils.esquema_ingestao import EsquemaIngestao
+
+# Tipos aceitos na declaração dos parâmetros de uma consulta (nome do tipo SQLAlchemy).
+# Listas usam bindparam "expanding" (IN (?, ?, ...)), o texto SQL continua fixo.
+# SQLAlchemy, cache e métricas são importados só na primeira execução: registrar uma consulta
+# não deve carregá-los.
+TIPOS_PARAMETRO = {
+    "data": "DateTime",
+    "texto": "String",
+    "inteiro": "Integer",
+    "lista_texto": "String",
+    "lista_inteiro": "Integer",
+}
+
+# Quantas latências recentes guardar por consulta (para média/p95)
+JANELA_LATENCIAS = 1000
+
+
+def _converter_valor(tipo, valor):
+    """Normaliza o valor Python para o tipo declarado (evita texto SQL/plano diferente por tipo)."""
+    if tipo == "data":
+        if isinstance(valor, datetime):
+            return valor
+        if isinstance(valor, date):
+            return datetime(valor.year, valor.month, valor.day)
+        return pd.Timestamp(valor).to_pydatetime()
+    if tipo == "texto":
+        return str(valor)
+    if tipo == "inteiro":
+        return int(valor)
+    if tipo.startswith("lista_"):
+        if isinstance(valor, (str, int)):
+            valor = [valor]
+        return [_converter_valor(tipo[len("lista_"):], v) for v in valor]
+    raise ValueError(f"Tipo de parâmetro desconhecido: {tipo}")
+
+
+class ConsultaRegistrada:
+    """
+    Consulta SQL nomeada com parâmetros tipados.
+    O TextClause é montado uma única vez (no primeiro uso); os valores sempre vão como bind parameters,
+    então o texto enviado ao banco não muda entre execuções (plano reaproveitado).
+    """
+    def __init__(self, nome, sql, parametros=None, padroes=None, ttl=None, esquema=None):
+        self.nome = nome
+        self.sql = sql
+        self.parametros = parametros or {}
+        self.padroes = padroes or {}
+        # Segundos que o resultado pode ser servido do cache em disco (None = sem cache)
+        self.ttl = ttl
+        # Tipos das colunas do resultado (dict coluna -> tipo, ver src/utils/esquema_ingestao.py)
+        self.esquema = EsquemaIngestao(esquema) if isinstance(esquema, dict) else esquema
+
+        for param, tipo in self.parametros.items():
+            if tipo not in TIPOS_PARAMETRO:
+                raise ValueError(f"Consulta '{nome}': tipo '{tipo}' inválido para '{param}'.")
+
+        self._statement = None
+
+    @property
+    def statement(self):
+        """TextClause com os bind parameters tipados (montado sob demanda)."""
+        if self._statement is None:
+            import sqlalchemy
+
+            self._statement = sqlalchemy.text(self.sql).bindparams(*[
+                sqlalchemy.bindparam(
+                    param, type_=getattr(sqlalchemy, TIPOS_PARAMETRO[tipo])(), expanding=tipo.startswith("lista_")
+                )
+                for param, tipo in self.parametros.items()
+            ])
+        return self._statement
+
+    def preparar_parametros(self, params=None):
+        """Aplica os padrões, valida a presença e converte cada valor para o tipo declarado."""
+        valores = {**self.padroes, **(params or {})}
+
+        faltantes = set(self.parametros) - set(valores)
+        if faltantes:
+            raise ValueError(f"Consulta '{self.nome}': parâmetros ausentes {sorted(faltantes)}.")
+        extras = set(valores) - set(self.parametros)
+        if extras:
+            raise ValueError(f"Consulta '{self.nome}': parâmetros não declarados {sorted(extras)}.")
+
+        return {p: _converter_valor(self.parametros[p], v) for p, v in valores.items()}
+
+    def tipar(self, df):
+        """Aplica o esquema de ingestão (se houver). Devolve (df, relatorio de memória)."""
+        if self.esquema is None:
+            return df, None
+        return self.esquema.aplicar(df)
+
+
+class EstatisticasConsulta:
+    def __init__(self):
+        self.execucoes = 0
+        self.erros = 0
+        self.linhas = 0
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+        # Memória do último resultado lido do banco, antes e depois do esquema de ingestão
+        self.bytes_brutos = 0
+        self.bytes_tipados = 0
+
+    def resumo(self):
+        lat = np.array(self.latencias) * 1000 if self.latencias else np.array([0.0])
+        return {
+            "execucoes": self.execucoes,
+            "erros": self.erros,
+            "linhas": self.linhas,
+            "media_ms": round(float(lat.mean()), 2),
+            "p95_ms": round(float(np.percentile(lat, 95)), 2),
+            "mb_bruto": round(self.bytes_brutos / 1024 ** 2, 3),
+            "mb_tipado": round(self.bytes_tipados / 1024 ** 2, 3),
+        }
+
+
+class QueryRegistry:
+    """
+    Registro central das consultas das engines, com estatísticas por consulta
+    (execuções, latência média/p95 e linhas retornadas).
+    """
+    def __init__(self):
+        self._consultas = {}
+        self._estatisticas = {}
+        self._lock = threading.Lock()
+        self._grupos = set()
+        self._lock_grupos = threading.Lock()
+
+    def registrar(self, nome, sql, parametros=None, padroes=None, ttl=None, esquema=None):
+        """Registra (ou substitui) uma consulta e devolve o objeto ConsultaRegistrada."""
+        consulta = ConsultaRegistrada(nome, sql, parametros, padroes, ttl, esquema)
+        with self._lock:
+            self._consultas[nome] = consulta
+            self._estatisticas.setdefault(nome, EstatisticasConsulta())
+        return consulta
+
+    def registrar_grupo(self, grupo, registrar):
+        """
+        Chama `registrar(self)` uma única vez por `grupo`: as engines registram suas consultas
+        no primeiro uso (construtor), não no import do módulo.
+        """
+        with self._lock_grupos:
+            if grupo not in self._grupos:
+                registrar(self)
+                self._grupos.add(grupo)
+
+    def obter(self, nome):
+        try:
+            return self._consultas[nome]
+        except KeyError:
+            raise KeyError(f"Consulta '{nome}' não registrada.") from None
+
+    def executar(self, nome, conexao, params=None, ignorar_cache=False, ttl=None, **kwargs_read_sql):
+        """
+        Executa a consulta nomeada via pd.read_sql e contabiliza latência e linhas.
+        `conexao` pode ser Engine ou Connection do SQLAlchemy.
+        Consultas com TTL passam pelo cache em disco; `ignorar_cache=True` força o banco
+        (e renova a entrada do cache). `ttl` substitui o TTL da consulta nesta chamada
+        (ex: math.inf para resultados que não mudam mais). O esquema de ingestão é aplicado
+        antes de gravar no cache, então acertos do cache já voltam tipados.
+        """
+        from src.utils.query_cache import get_query_cache, gerar_chave
+        from src.utils.db_metrics import get_db_metrics
+
+        consulta = self.obter(nome)
+        valores = consulta.preparar_parametros(params)
+        ttl = consulta.ttl if ttl is None else ttl
+
+        chave = None
+        if ttl and not kwargs_read_sql:
+            cache = get_query_cache()
+            origem = conexao.engine.url.render_as_string(hide_password=True)
+            chave = gerar_chave(consulta.sql, valores, origem)
+            if not ignorar_cache:
+                df = cache.obter(chave, ttl)
+                if df is not None:
+                    logging.debug(f"[SQL] {nome}: resultado servido do cache.")
+                    return df
+
+        inicio = time.perf_counter()
+        try:
+            df = pd.read_sql(consulta.statement, conexao, params=valores, **kwargs_read_sql)
+        except Exception:
+            self.registrar_execucao(nome, time.perf_counter() - inicio, 0, erro=True)
+            raise
+
+        duracao = time.perf_counter() - inicio
+        df, relatorio = consulta.tipar(df)
+        bytes_brutos = relatorio["bytes_antes"] if relatorio else None
+        self.registrar_execucao(nome, duracao, len(df), relatorio=relatorio)
+        get_db_metrics().registrar_resultado(
+            duracao, df if bytes_brutos is None else None, linhas=len(df), bytes_=bytes_brutos
+        )
+
+        if chave:
+            cache.gravar(chave, df, consulta=nome)
+        return df
+
+    def registrar_execucao(self, nome, duracao, linhas, erro=False, relatorio=None):
+        """Contabiliza uma execução (usado também pelo modo em blocos)."""
+        with self._lock:
+            est = self._estatisticas.setdefault(nome, EstatisticasConsulta())
+            est.execucoes += 1
+            est.linhas += linhas
+            est.latencias.append(duracao)
+            if erro:
+                est.erros += 1
+            if relatorio:
+                est.bytes_brutos = relatorio["bytes_antes"]
+                est.bytes_tipados = relatorio["bytes_depois"]
+        if relatorio and relatorio["bytes_antes"]:
+            logging.debug(
+                f"[SQL] {nome}: {relatorio['bytes_antes'] / 1024 ** 2:.2f} MB -> "
+                f"{relatorio['bytes_depois'] / 1024 ** 2:.2f} MB após o esquema de ingestão."
+            )
+
+    def estatisticas(self):
+        """DataFrame com uma linha por consulta registrada."""
+        with self._lock:
+            linhas = [{"consulta": nome, **est.resumo()} for nome, est in self._estatisticas.items()]
+        return pd.DataFrame(
+            linhas,
+            columns=["consulta", "execucoes", "erros", "linhas", "media_ms", "p95_ms", "mb_bruto", "mb_tipado"],
+        )
+
+    def log_estatisticas(self):
+        for linha in self.estatisticas().to_dict("records"):
+            logging.info(
+                f"[SQL] {linha['consulta']}: {linha['execucoes']} exec, "
+                f"média {linha['media_ms']}ms, p95 {linha['p95_ms']}ms, {linha['linhas']} linhas"
+            )
+        from src.utils.query_cache import get_query_cache
+
+        cache = get_query_cache().estatisticas()
+        logging.info(
+            f"[SQL] cache: {cache['hits']} hits / {cache['misses']} misses "
+            f"(taxa {cache['taxa_acerto']:.0%}), {cache['bytes_economizados'] / 1024 ** 2:.1f} MB economizados"
+        )
+
+
+# Instância única, criada no import (engines registram suas consultas ao serem construídas)
+_registry_instance = QueryRegistry()
+
+
+def get_query_registry():
+    """Retorna a instância Singleton do registro de consultas."""
+    return _registry_instance
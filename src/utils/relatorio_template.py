@@ -0,0 +1,321 @@
+"""
+Motor único dos relatórios Excel do funil (abas Analise, Dados_Graficos e Dashboard).
+
+Um TemplateRelatorio é compilado uma vez por (configuração de negócio, aba alvo): ordem
+das colunas, propriedades dos formatos, regras de formatação condicional e layout dos
+gráficos. A classificação de cada nome de coluna (nome final, chave de ordenação e tipo)
+fica memorizada no template, então exportar dezenas de workbooks com as mesmas colunas
+só paga a escrita dos dados. Os templates são compartilhados via get_template().
+"""
+import re
+import json
+import logging
+import threading
+from datetime import datetime, date
+
+import pandas as pd
+
+COLUNAS_FIXAS = ("unidade", "Marca", "Filial")
+
+ORDEM_TAXAS = (
+    "% Lead -> Prod",
+    "% Prod -> Agend",
+    "% Agend -> Visita",
+    "% Visita -> Matrícula",
+    "% Agend vs Lead",
+    "% Conversão Final",
+    "% Visita vs Lead",
+    "% Meta Atingida",
+)
+
+ORDEM_INTEIROS = (
+    # Captação
+    "Leads",
+    "Contato Produtivo",
+    "Visita Agendada",
+    "Visita Realizada",
+    "Matrícula", "Matrículas",  # Aceita singular ou plural
+    # Renovação
+    "Elegíveis",
+    "Renovados",
+    "Tentativa Contato",
+    "Não Renovado",
+)
+
+ORDEM_GRAFICOS = ("Leads", "Contato Produtivo", "Visita Agendada", "Visita Realizada", "Matrícula")
+COLUNAS_COHORT = ("Inertes em Lead", "Aguardando Agendamento", "Aguardando Visita", "Em Negociação")
+
+_RE_RAIZ = re.compile(r' \(| Var| Delta')
+_RE_DATA = re.compile(r'(\d{2}/\d{2}(?:/\d{4})?)')
+_RE_REFERENCIA = re.compile(r'\(([^)]*)\)\s*$')
+
+# Variável global para armazenar os templates compilados
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def extrair_raiz_metrica(nome_coluna):
+    """Extrai o nome base da métrica removendo datas e sufixos de variação."""
+    return _RE_RAIZ.split(nome_coluna)[0].strip()
+
+
+def extrair_data_coluna(nome_coluna):
+    """Extrai objeto datetime de uma string de coluna (DD/MM ou DD/MM/AAAA)."""
+    m = _RE_DATA.search(nome_coluna)
+    if not m:
+        return None
+
+    data_str = m.group(1)
+    try:
+        if len(data_str) == 5:  # formato DD/MM
+            agora = datetime.now()
+            dt = datetime.strptime(data_str, "%d/%m").replace(year=agora.year)
+            # Se a data for futura (ex: Dezembro) e estamos em Janeiro, ajusta ano anterior
+            if dt > agora and dt.month > 9:
+                dt = dt.replace(year=dt.year - 1)
+            return dt
+        return datetime.strptime(data_str, "%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+class TemplateRelatorio:
+    """Layout compilado de um relatório; renderizar() só escreve os dados de cada workbook."""
+
+    ABA_ANALISE = 'Analise'
+    ABA_DADOS_GRAFICOS = 'Dados_Graficos'
+
+    # Formato de coluna (set_column) por tipo de coluna
+    FORMATO_POR_TIPO = {"var_pct": "var_pct", "var_num": "var_num", "taxa": "pct", "numero": "num", "fixa": None}
+
+    def __init__(self, business_config, aba_alvo):
+        cores = business_config.get('cores_excel', {})
+        regras = business_config.get('regras_negocio', {})
+        limite_positivo = regras.get('crescimento_minimo', 0.02)
+        limite_negativo = regras.get('queda_critica', -0.02)
+
+        nome_display = "Captação" if aba_alvo == "Captacao" else "Renovação"
+        self.titulo_dashboard = f"Painel de {nome_display}"
+
+        # Propriedades dos formatos (os objetos Format pertencem a cada workbook)
+        self.formatos = {
+            "header": {'bold': True, 'bg_color': '#203764', 'font_color': 'white',
+                       'border': 1, 'align': 'center', 'valign': 'vcenter'},
+            "num": {'num_format': '#,##0', 'border': 1, 'align': 'center'},
+            "pct": {'num_format': '0.0%', 'border': 1, 'align': 'center'},
+            "var_pct": {'num_format': '0.0%', 'border': 1, 'align': 'center', 'bold': True},
+            "var_num": {'num_format': '0.0', 'border': 1, 'align': 'center', 'bold': True},
+            # Cores (Semáforo)
+            "verde": {'bg_color': cores.get('positivo_bg', '#C6EFCE'), 'font_color': cores.get('positivo_font', '#006100')},
+            "vermelho": {'bg_color': cores.get('negativo_bg', '#FFC7CE'), 'font_color': cores.get('negativo_font', '#9C0006')},
+            "amarelo": {'bg_color': cores.get('alerta_bg', '#FFEB9C'), 'font_color': cores.get('alerta_font', '#9C5700')},
+            "titulo": {'bold': True, 'font_size': 22, 'font_color': '#203764', 'font_name': 'Segoe UI'},
+        }
+
+        # Regras de formatação condicional por tipo de coluna ('format' = nome do formato acima)
+        self.regras_condicionais = {
+            "var_pct": [
+                {'type': 'cell', 'criteria': '>', 'value': limite_positivo, 'format': "verde"},
+                {'type': 'cell', 'criteria': '<', 'value': limite_negativo, 'format': "vermelho"},
+                {'type': 'cell', 'criteria': 'between', 'minimum': limite_negativo, 'maximum': limite_positivo, 'format': "amarelo"},
+            ],
+            "var_num": [
+                {'type': 'cell', 'criteria': '>', 'value': 0, 'format': "verde"},
+                {'type': 'cell', 'criteria': '<', 'value': 0, 'format': "vermelho"},
+            ],
+            "taxa": [
+                {'type': 'data_bar', 'bar_color': '#B1D6BC', 'bar_solid': True,
+                 'min_type': 'num', 'min_value': 0, 'max_type': 'num', 'max_value': 1},
+            ],
+        }
+
+        self._classificacao = {}
+        self._dia_classificacao = None
+        self._lock = threading.Lock()
+
+    # --- Classificação das colunas (memorizada) ---
+
+    def classificar(self, coluna):
+        """(nome final, chave de ordenação, tipo) de uma coluna do DataFrame analítico."""
+        with self._lock:
+            # Datas DD/MM dependem do ano corrente: a memória vale só para o dia em que foi preenchida
+            if self._dia_classificacao != date.today():
+                self._classificacao.clear()
+                self._dia_classificacao = date.today()
+            resultado = self._classificacao.get(coluna)
+            if resultado is None:
+                resultado = self._classificacao[coluna] = self._classificar(coluna)
+            return resultado
+
+    @staticmethod
+    def _nome_final(coluna):
+        # Renomeia colunas de Variações Delta, preservando a referência "(D-1 dd/mm)" dos snapshots do funil
+        if "Delta" not in coluna:
+            return coluna
+        raiz = extrair_raiz_metrica(coluna)
+        ref = _RE_REFERENCIA.search(coluna)
+        return f"{raiz} Delta ({ref.group(1)})" if ref else f"{raiz} Delta"
+
+    def _classificar(self, coluna):
+        nome = self._nome_final(coluna)
+        if "Var%" in nome:
+            tipo = "var_pct"
+        elif "Delta" in nome:
+            tipo = "var_num"
+        elif "%" in nome or "Taxa" in nome:
+            tipo = "taxa"
+        elif nome not in COLUNAS_FIXAS:
+            tipo = "numero"
+        else:
+            tipo = "fixa"
+        return nome, self._chave_ordenacao(nome), tipo
+
+    @staticmethod
+    def _chave_ordenacao(nome_coluna):
+        # Prioridade 1: Colunas Fixas
+        if nome_coluna in COLUNAS_FIXAS:
+            return (-1, COLUNAS_FIXAS.index(nome_coluna), datetime.min, 0)
+
+        raiz = extrair_raiz_metrica(nome_coluna)
+        eh_variacao = 1 if ("Var" in nome_coluna or "Delta" in nome_coluna) else 0
+        data = datetime.max if eh_variacao else (extrair_data_coluna(nome_coluna) or datetime.max)
+
+        # Prioridade 2: Taxas
+        for i, taxa in enumerate(ORDEM_TAXAS):
+            if raiz.startswith(taxa) or taxa in raiz:
+                return (0, i, data, eh_variacao)
+
+        # Prioridade 3: Inteiros (Leads, Matriculas, etc)
+        for i, inteiro in enumerate(ORDEM_INTEIROS):
+            if raiz == inteiro:
+                return (1, i, data, eh_variacao)
+
+        # Resto
+        return (2, 999, data, eh_variacao)
+
+    # --- Renderização ---
+
+    def renderizar(self, df_analitico, df_dashboard, output_path):
+        """Gera o workbook em output_path. Retorna True/False (erros são logados)."""
+        try:
+            # 1. Nomes finais e ordem das colunas (classificação memorizada)
+            classes = [self.classificar(c) for c in df_analitico.columns]
+            ordem = sorted(range(len(classes)), key=lambda i: classes[i][1])
+            df_analitico = df_analitico.iloc[:, ordem].set_axis([classes[i][0] for i in ordem], axis=1)
+            tipos = [classes[i][2] for i in ordem]
+            # Dados_Graficos usa os mesmos nomes finais (Delta padronizado) da aba Analise
+            df_dashboard = df_dashboard.set_axis([self.classificar(c)[0] for c in df_dashboard.columns], axis=1)
+
+            writer = pd.ExcelWriter(output_path, engine='xlsxwriter')
+            wb = writer.book
+            fmts = {nome: wb.add_format(props) for nome, props in self.formatos.items()}
+            regras = {
+                tipo: [{**regra, 'format': fmts[regra['format']]} if 'format' in regra else regra for regra in lista]
+                for tipo, lista in self.regras_condicionais.items()
+            }
+
+            # 2. Escrita no Excel
+            df_analitico.to_excel(writer, sheet_name=self.ABA_ANALISE, index=False)
+            ws = writer.sheets[self.ABA_ANALISE]
+            ws.set_row(0, 30)
+            last_row = len(df_analitico) + 1  # +1 por causa do header
+
+            # 3. Formatação de colunas
+            for idx, (col, tipo) in enumerate(zip(df_analitico.columns, tipos)):
+                ws.write(0, idx, col, fmts["header"])
+                formato = self.FORMATO_POR_TIPO[tipo]
+                ws.set_column(idx, idx, max(len(str(col)) + 2, 15), fmts[formato] if formato else None)
+                for regra in regras.get(tipo, ()):
+                    ws.conditional_format(1, idx, last_row, idx, regra)
+
+            ws.freeze_panes(1, 1)
+
+            # Gera Dashboard (Aba Gráfica)
+            self._criar_dashboard(writer, wb, df_dashboard, fmts)
+
+            writer.close()
+            return True
+
+        except Exception as e:
+            logging.error(f"Erro ao gerar relatório Excel: {e}", exc_info=True)
+            return False
+
+    def _criar_dashboard(self, writer, wb, df_marcas, fmts):
+        """Aba de dashboard visual com Funil e Cohort."""
+        nome_aba_dados = self.ABA_DADOS_GRAFICOS
+        cols_limpas = [c for c in df_marcas.columns if "Unnamed" not in c and c != "unidade"]
+
+        if "unidade" in df_marcas.columns:
+            cols_limpas.insert(0, "unidade")
+
+        df_clean = df_marcas[cols_limpas]
+        if "unidade" in df_clean.columns:
+            df_clean = df_clean.rename(columns={"unidade": "Marca"})
+
+        df_clean.to_excel(writer, sheet_name=nome_aba_dados, index=False)
+
+        ws_dash = wb.add_worksheet('Dashboard')
+        ws_dash.hide_gridlines(2)
+        ws_dash.write('B2', self.titulo_dashboard, fmts["titulo"])
+
+        num_marcas = len(df_clean)
+        if num_marcas == 0:
+            return
+
+        # Configurações de layout
+        start_row = 4
+        chart_width = 600
+        chart_height = 300
+
+        # 1. Gráficos de barra (funil acumulado)
+        for idx, kpi in enumerate(ORDEM_GRAFICOS):
+            if kpi not in df_clean.columns:
+                continue
+
+            chart = wb.add_chart({'type': 'bar'})
+            col_idx = df_clean.columns.get_loc(kpi)
+
+            chart.add_series({
+                'name': kpi,
+                'categories': [nome_aba_dados, 1, 0, num_marcas, 0],
+                'values': [nome_aba_dados, 1, col_idx, num_marcas, col_idx],
+                'fill': {'color': '#203764'},
+                'data_labels': {'value': True, 'num_format': '#,##0', 'font': {'bold': True}}
+            })
+            chart.set_title({'name': f"Total Acumulado: {kpi}"})
+            chart.set_size({'width': chart_width, 'height': chart_height})
+            chart.set_legend({'none': True})
+
+            ws_dash.insert_chart(f'B{start_row + (idx * 16)}', chart)
+
+        # 2. Gráfico de cohort (estoque atual): onde as pessoas estão paradas no total geral (primeira linha)
+        present_cohort = [c for c in COLUNAS_COHORT if c in df_clean.columns]
+
+        if present_cohort:
+            chart_pie = wb.add_chart({'type': 'pie'})
+            primeira = df_clean.columns.get_loc(present_cohort[0])
+            ultima = df_clean.columns.get_loc(present_cohort[-1])
+
+            for _ in present_cohort:
+                chart_pie.add_series({
+                    'name': 'Distribuição de Leads Parados',
+                    'categories': [nome_aba_dados, 0, primeira, 0, ultima],
+                    'values':     [nome_aba_dados, 1, primeira, 1, ultima],
+                    'data_labels': {'percentage': True, 'category': True, 'position': 'outside_end', 'font': {'size': 10}},
+                })
+
+            chart_pie.set_title({'name': 'Análise de Cohort (Onde o processo está parado)'})
+            chart_pie.set_size({'width': 500, 'height': 450})
+
+            # Insere o gráfico de pizza à direita dos de barra
+            ws_dash.insert_chart('L4', chart_pie)
+
+
+def get_template(business_config, aba_alvo):
+    """Template compilado para (configuração, aba), compartilhado entre todos os relatórios."""
+    chave = (json.dumps(business_config, sort_keys=True, default=str), aba_alvo)
+    with _templates_lock:
+        template = _templates.get(chave)
+        if template is None:
+            template = _templates[chave] = TemplateRelatorio(business_config, aba_alvo)
+        return template
@@ -0,0 +1,300 @@
+"""
+Backend de replay offline (SQLite) com as mesmas tabelas do SQL Server.
+Permite rodar e cronometrar FunnelEngine/PendenciaEngine fora da rede do escritório.
+
+Uso:
+    python -m src.utils.replay_backend --leads 1000000 --matriculas 200000
+    DB_BACKEND=replay python main.py
+"""
+import os
+import re
+import json
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+
+CAMINHO_PADRAO = os.path.join("historico_dados_local", "replay.sqlite")
+NORMALIZATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "normalization.json")
+
+DDL_TABELAS = [
+    """
+    CREATE TABLE IF NOT EXISTS Tabela_Leads_Raiz_v2 (
+        hs_object_id INTEGER PRIMARY KEY,
+        unidade VARCHAR,
+        hs_pipeline_stage VARCHAR,
+        hs_createdate DATETIME,
+        hs_lastmodifieddate DATETIME
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Z_PAINELMATRICULA (
+        CODCOLIGADA INTEGER,
+        CODFILIAL INTEGER,
+        FILIAL VARCHAR,
+        NOMEGRUPO VARCHAR,
+        CODPERLET VARCHAR,
+        RA VARCHAR,
+        ALUNO VARCHAR,
+        CURSO VARCHAR,
+        SERIE VARCHAR,
+        GRADE VARCHAR,
+        TURNO VARCHAR,
+        STATUS VARCHAR,
+        [DATA CADASTRO] DATETIME
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Tabela_Matrizcurricular (
+        CODCOLIGADA INTEGER,
+        CODFILIAL INTEGER,
+        GRADE VARCHAR,
+        [Matricula Validade] VARCHAR
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS IX_Leads_CreateDate ON Tabela_Leads_Raiz_v2 (hs_createdate)",
+    "CREATE INDEX IF NOT EXISTS IX_Leads_LastModified ON Tabela_Leads_Raiz_v2 (hs_lastmodifieddate)",
+    "CREATE INDEX IF NOT EXISTS IX_Painel_Perlet ON Z_PAINELMATRICULA (CODPERLET, STATUS)",
+    "CREATE INDEX IF NOT EXISTS IX_Matriz_Chave ON Tabela_Matrizcurricular (CODCOLIGADA, CODFILIAL, GRADE)",
+]
+
+# Códigos do pipeline (espelham config.json) e a distribuição típica entre eles
+ESTAGIOS_CRM = {
+    "1018380105": 0.38,  # LEADS
+    "1018380106": 0.22,  # LEADS_CONTATADOS
+    "1022335280": 0.12,  # AGENDAMENTO_REALIZADO
+    "1018314554": 0.08,  # VISITA_REALIZADA
+    "1111696774": 0.06,  # MATRICULADO_TOTAL
+    "1018314555": 0.12,  # DECLINADO
+    "999999999": 0.02,   # Estágio fora do mapa (descartado pelas regras)
+}
+
+STATUS_ERP = {"Matriculado": 0.55, "Pré-Matriculado": 0.10, "Pendente": 0.25, "Cancelado": 0.10}
+CURSOS = ["EDUCAÇÃO INFANTIL", "ENSINO FUNDAMENTAL I", "ENSINO FUNDAMENTAL II", "ENSINO MÉDIO"]
+SERIES = ["INFANTIL", "PRÉ-ESCOLA", "1º ANO", "2º ANO", "3º ANO", "4º ANO", "5º ANO",
+          "6º ANO", "7º ANO", "8º ANO", "9º ANO", "1ª SÉRIE", "2ª SÉRIE", "3ª SÉRIE"]
+TURNOS = ["MANHÃ", "TARDE", "INTEGRAL"]
+NOMES = ["ANA", "BRUNO", "CARLA", "DIEGO", "EDUARDA", "FELIPE", "GABRIELA", "HUGO",
+         "ISABELA", "JOÃO", "LARISSA", "MATEUS", "NATÁLIA", "OTÁVIO", "PEDRO", "RAFAELA"]
+SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "COSTA",
+              "RODRIGUES", "ALMEIDA", "NASCIMENTO", "CARVALHO", "ARAÚJO"]
+
+
+# --- Compatibilidade T-SQL ---
+
+def _datediff(unidade, inicio, fim):
+    """Equivalente ao DATEDIFF do SQL Server para 'day'."""
+    if inicio is None or fim is None:
+        return None
+    dt_ini = pd.Timestamp(inicio).normalize()
+    dt_fim = pd.Timestamp(fim).normalize()
+    if str(unidade).lower() != "day":
+        raise ValueError(f"DATEDIFF({unidade}) não suportado no replay.")
+    return int((dt_fim - dt_ini).days)
+
+
+class _StringAgg:
+    """Agregação STRING_AGG (ausente no SQLite < 3.44)."""
+    def __init__(self):
+        self.itens = []
+        self.sep = ","
+
+    def step(self, valor, sep):
+        if valor is not None:
+            self.itens.append(str(valor))
+        self.sep = sep
+
+    def finalize(self):
+        return self.sep.join(self.itens) if self.itens else None
+
+
+# Posições de ano/mês/dia no texto ISO 'AAAA-MM-DD HH:MM:SS' gravado pelo SQLite
+_FATIAS_DATA = {"year": slice(0, 4), "month": slice(5, 7), "day": slice(8, 10)}
+
+
+def _parte_data(parte):
+    fatia = _FATIAS_DATA[parte]
+
+    def _extrair(valor):
+        if valor is None:
+            return None
+        return int(str(valor)[fatia])
+    return _extrair
+
+
+def _datefromparts(ano, mes, dia):
+    if None in (ano, mes, dia):
+        return None
+    return f"{int(ano):04d}-{int(mes):02d}-{int(dia):02d}"
+
+
+def _registrar_funcoes_tsql(dbapi_conn, connection_record):
+    dbapi_conn.create_function("GETDATE", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    dbapi_conn.create_function("DATEDIFF", 3, _datediff)
+    dbapi_conn.create_function("YEAR", 1, _parte_data("year"))
+    dbapi_conn.create_function("MONTH", 1, _parte_data("month"))
+    dbapi_conn.create_function("DAY", 1, _parte_data("day"))
+    dbapi_conn.create_function("DATEFROMPARTS", 3, _datefromparts)
+    dbapi_conn.create_aggregate("STRING_AGG", 2, _StringAgg)
+
+
+_RE_DATEDIFF = re.compile(r"DATEDIFF\(\s*(day|month|year)\s*,", re.IGNORECASE)
+_RE_TOP = re.compile(r"SELECT\s+TOP\s+(\d+)\s", re.IGNORECASE)
+
+
+def _traduzir_tsql(conn, cursor, statement, parameters, context, executemany):
+    """Reescreve as poucas construções T-SQL usadas pelas engines para SQLite."""
+    statement = _RE_DATEDIFF.sub(lambda m: f"DATEDIFF('{m.group(1).lower()}',", statement)
+    m = _RE_TOP.search(statement)
+    if m:
+        statement = _RE_TOP.sub("SELECT ", statement, count=1).rstrip().rstrip(";")
+        statement += f" LIMIT {m.group(1)}"
+    return statement, parameters
+
+
+def criar_engine_replay(caminho=CAMINHO_PADRAO):
+    """Cria a engine SQLite do replay, com o schema e as funções T-SQL registradas."""
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+
+    engine = create_engine(
+        f"sqlite:///{caminho}",
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", _registrar_funcoes_tsql)
+    event.listen(engine, "before_cursor_execute", _traduzir_tsql, retval=True)
+
+    with engine.begin() as conn:
+        for ddl in DDL_TABELAS:
+            conn.execute(text(ddl))
+    return engine
+
+
+# --- Gerador de dados sintéticos ---
+
+def _carregar_unidades():
+    """Lista (marca, nome_oficial, aliases) a partir do normalization.json."""
+    try:
+        with open(NORMALIZATION_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        logging.error(f"Erro ao carregar normalization.json: {e}")
+        data = {}
+
+    unidades = []
+    for marca, info in data.items():
+        if marca == "OUTROS":
+            continue
+        for u in info.get("unidades", []):
+            unidades.append((marca, u["nome_oficial"], u.get("aliases", []) or [u["nome_oficial"]]))
+    return unidades or [("MARCA", "MARCA - UNIDADE", ["MARCA - UNIDADE"])]
+
+
+def _datas_aleatorias(rng, n, inicio, fim):
+    segundos = int((fim - inicio).total_seconds())
+    offsets = rng.integers(0, max(segundos, 1), size=n)
+    return pd.Timestamp(inicio) + pd.to_timedelta(offsets, unit="s")
+
+
+def gerar_leads(rng, n, unidades, data_inicio):
+    """Gera n linhas de Tabela_Leads_Raiz_v2 com aliases 'sujos' de unidade."""
+    aliases = [a for _, _, lista in unidades for a in lista]
+    pool = np.array(aliases + [a.lower() for a in aliases[:10]] + ["", "nan"], dtype=object)
+
+    criacao = _datas_aleatorias(rng, n, pd.Timestamp(data_inicio), pd.Timestamp.now())
+    atraso = pd.to_timedelta(rng.integers(0, 60 * 86400, size=n), unit="s")
+    modificacao = np.minimum(criacao + atraso, pd.Timestamp.now())
+
+    return pd.DataFrame({
+        "hs_object_id": np.arange(1, n + 1, dtype=np.int64),
+        "unidade": rng.choice(pool, size=n),
+        "hs_pipeline_stage": rng.choice(list(ESTAGIOS_CRM), size=n, p=list(ESTAGIOS_CRM.values())),
+        "hs_createdate": criacao.strftime("%Y-%m-%d %H:%M:%S"),
+        "hs_lastmodifieddate": pd.DatetimeIndex(modificacao).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def gerar_painel(rng, n, unidades, periodos=("2025", "2026")):
+    """Gera n linhas de Z_PAINELMATRICULA e a Tabela_Matrizcurricular correspondente."""
+    n_unid = len(unidades)
+    idx_unid = rng.integers(0, n_unid, size=n)
+    codcoligada = (idx_unid % 5) + 1
+    codfilial = idx_unid + 1
+
+    # Alunos com mais de uma linha (várias grades/turnos) para exercitar o STRING_AGG
+    n_alunos = max(n // 2, 1)
+    ra_num = rng.integers(0, n_alunos, size=n)
+    nomes = (
+        rng.choice(NOMES, size=n_alunos).astype(object) + " "
+        + rng.choice(SOBRENOMES, size=n_alunos).astype(object)
+    )
+    nomes[rng.random(n_alunos) < 0.002] = "ALUNO TESTE"
+
+    serie_idx = rng.integers(0, len(SERIES), size=n)
+    curso_idx = np.select([serie_idx < 2, serie_idx < 7, serie_idx < 11], [0, 1, 2], default=3)
+    grade = np.char.add("G", (serie_idx * 10 + rng.integers(0, 3, size=n)).astype(str))
+
+    painel = pd.DataFrame({
+        "CODCOLIGADA": codcoligada,
+        "CODFILIAL": codfilial,
+        "FILIAL": [unidades[i][1] for i in idx_unid],
+        "NOMEGRUPO": [unidades[i][0] for i in idx_unid],
+        "CODPERLET": rng.choice(list(periodos), size=n),
+        "RA": (ra_num + 2_000_000).astype(str),
+        "ALUNO": nomes[ra_num],
+        "CURSO": np.array(CURSOS, dtype=object)[curso_idx],
+        "SERIE": np.array(SERIES, dtype=object)[serie_idx],
+        "GRADE": grade,
+        "TURNO": rng.choice(TURNOS, size=n),
+        "STATUS": rng.choice(list(STATUS_ERP), size=n, p=list(STATUS_ERP.values())),
+        "DATA CADASTRO": _datas_aleatorias(
+            rng, n, pd.Timestamp.now() - timedelta(days=240), pd.Timestamp.now()
+        ).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+    matriz = painel[["CODCOLIGADA", "CODFILIAL", "GRADE"]].drop_duplicates().reset_index(drop=True)
+    matriz["Matricula Validade"] = np.where(rng.random(len(matriz)) < 0.9, "S", "N")
+    return painel, matriz
+
+
+def gerar_dados_sinteticos(engine, n_leads=100_000, n_matriculas=50_000, seed=42,
+                           data_inicio="2025-06-01", chunksize=50_000):
+    """
+    Popula (substituindo) as tabelas do replay com volumes sintéticos.
+    Determinístico para o mesmo seed.
+    """
+    rng = np.random.default_rng(seed)
+    unidades = _carregar_unidades()
+
+    with engine.begin() as conn:
+        for tabela in ("Tabela_Leads_Raiz_v2", "Z_PAINELMATRICULA", "Tabela_Matrizcurricular"):
+            conn.execute(text(f"DELETE FROM {tabela}"))
+
+    df_leads = gerar_leads(rng, n_leads, unidades, data_inicio)
+    df_leads.to_sql("Tabela_Leads_Raiz_v2", engine, if_exists="append", index=False, chunksize=chunksize)
+    logging.info(f"Replay: {len(df_leads)} leads gerados.")
+
+    df_painel, df_matriz = gerar_painel(rng, n_matriculas, unidades)
+    df_painel.to_sql("Z_PAINELMATRICULA", engine, if_exists="append", index=False, chunksize=chunksize)
+    df_matriz.to_sql("Tabela_Matrizcurricular", engine, if_exists="append", index=False, chunksize=chunksize)
+    logging.info(f"Replay: {len(df_painel)} linhas de painel e {len(df_matriz)} grades gerados.")
+
+    return {"leads": len(df_leads), "painel": len(df_painel), "matriz": len(df_matriz)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Gera a base SQLite de replay.")
+    parser.add_argument("--caminho", default=os.getenv("REPLAY_DB_PATH", CAMINHO_PADRAO))
+    parser.add_argument("--leads", type=int, default=100_000)
+    parser.add_argument("--matriculas", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine_replay = criar_engine_replay(args.caminho)
+    totais = gerar_dados_sinteticos(engine_replay, args.leads, args.matriculas, args.seed)
+    print(f"Base de replay criada em {args.caminho}: {totais}")
@@ -0,0 +1,111 @@
+"""
+Fixtures compartilhadas: backend de replay (SQLite) com uma base sintética pequena e
+geradores de DataFrames no formato entregue pelas engines.
+
+    python -m pytest -q
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+LEADS_REPLAY = 4_000
+MATRICULAS_REPLAY = 12_000
+
+
+@pytest.fixture(scope="session")
+def replay(tmp_path_factory):
+    """
+    Engine do db_manager apontada para uma base de replay nova (uma por sessão de testes).
+    O cache de consultas também fica numa pasta temporária.
+    """
+    from src.utils.replay_backend import criar_engine_replay, gerar_dados_sinteticos
+    from src.utils.db_manager import reset_db_engine, get_db_engine
+
+    pasta = tmp_path_factory.mktemp("replay")
+    caminho = str(pasta / "replay.sqlite")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DB_BACKEND", "replay")
+        mp.setenv("REPLAY_DB_PATH", caminho)
+        mp.setenv("QUERY_CACHE_DIR", str(pasta / "cache_consultas"))
+        mp.setattr("src.utils.query_cache._cache_instance", None)
+
+        engine = criar_engine_replay(caminho)
+        gerar_dados_sinteticos(engine, LEADS_REPLAY, MATRICULAS_REPLAY, seed=42)
+        engine.dispose()
+
+        reset_db_engine()
+        yield get_db_engine()
+        reset_db_engine()
+
+
+@pytest.fixture
+def alterar_leads(replay):
+    """Move uma fração dos leads para outro estágio, atualizando hs_lastmodifieddate (como o CRM)."""
+    def alterar(fracao, seed):
+        with replay.begin() as conn:
+            ids = [r[0] for r in conn.execute(text("SELECT hs_object_id FROM Tabela_Leads_Raiz_v2"))]
+            escolhidos = np.random.default_rng(seed).choice(ids, size=max(1, int(len(ids) * fracao)), replace=False)
+            agora = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+            conn.execute(
+                text(
+                    "UPDATE Tabela_Leads_Raiz_v2 SET hs_pipeline_stage = '1018314554', "
+                    "hs_lastmodifieddate = :agora WHERE hs_object_id = :id"
+                ),
+                [{"agora": agora, "id": int(i)} for i in escolhidos],
+            )
+        return len(escolhidos)
+
+    return alterar
+
+
+@pytest.fixture(scope="session")
+def mapa_unidades():
+    """Conteúdo do normalization.json."""
+    from src.utils.replay_backend import NORMALIZATION_PATH
+
+    with open(NORMALIZATION_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def unidades_crm(mapa_unidades):
+    """Nomes de unidade como chegam do CRM: variações de caixa, espaços, desconhecidos e nulos."""
+    base = []
+    for info in mapa_unidades.values():
+        for unidade in info.get("unidades", []):
+            base.extend([unidade["nome_oficial"], *unidade.get("aliases", [])])
+    variacoes = set(base)
+    for nome in base:
+        variacoes.update({nome.lower(), f" {nome} ", nome.title()})
+    variacoes.update({"", "UNIDADE NOVA SEM CADASTRO", "Não Informado"})
+
+    rng = np.random.default_rng(42)
+    n = 20_000
+    serie = pd.Series(np.array(sorted(variacoes), dtype=object)[rng.integers(0, len(variacoes), n)], dtype=object)
+    serie.iloc[rng.integers(0, n, n // 200)] = None
+    return serie
+
+
+@pytest.fixture(scope="session")
+def gerar_pendencias():
+    """Gerador de linhas no formato do df_escola entregue ao PendenciaReporter."""
+    def gerar(n, marca, seed):
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            "Status_Prioridade": rng.choice(["Crítico", "Atenção", "Novo"], n),
+            "Dias_Pendente": rng.integers(0, 200, n),
+            "Marca": marca,
+            "Filial": rng.choice(["TIJUCA", "BOTAFOGO", "RECREIO", "MEIER"], n),
+            "RA": (rng.choice(n * 3, n, replace=False) + 2_000_000).astype(str),
+            "Tipo_Matricula": rng.choice(["REMATRÍCULA", "MATRÍCULA"], n),
+            "Aluno": [f"ALUNO {i}" for i in rng.integers(0, n * 3, n)],
+            "Série": rng.choice(["1º ANO", "5º ANO", "9º ANO", "3ª SÉRIE"], n),
+            "Responsável": [f"RESPONSÁVEL {i}" for i in rng.integers(0, n * 2, n)],
+            "Turno": rng.choice(["MANHÃ", "TARDE", "INTEGRAL"], n),
+            "CPF_Resp": [f"{i:011d}" for i in rng.integers(0, 10 ** 11, n)],
+        })
+
+    return gerar
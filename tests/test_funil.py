@@ -0,0 +1,158 @@
+"""Paridade dos caminhos otimizados do funil de captação com o banco e com as versões anteriores."""
+import unicodedata
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from src.engines.funil.captacao.engine import FunnelEngine
+from src.engines.funil.captacao.espelho_crm import EspelhoCRM
+from src.engines.funil.captacao.agregado_diario import AgregadoDiarioCRM
+from src.engines.funil.captacao.regras import FunnelBusinessRules
+
+ESTAGIOS = {
+    "LEADS": "1018380105",
+    "LEADS_CONTATADOS": "1018380106",
+    "AGENDAMENTO_REALIZADO": "1022335280",
+    "VISITA_REALIZADA": "1018314554",
+    "MATRICULADO_TOTAL": "1111696774",
+    "DECLINADO": "1018314555",
+}
+
+
+@pytest.fixture
+def engine(replay, tmp_path):
+    """FunnelEngine sobre o replay, com espelho e agregado diário em pastas temporárias."""
+    engine = FunnelEngine()
+    engine._espelho_crm = EspelhoCRM(pasta=str(tmp_path / "espelho"))
+    engine._agregado_diario = AgregadoDiarioCRM(engine.espelho_crm, pasta=str(tmp_path / "agregado"))
+    return engine
+
+
+def _ordenar(df, chaves):
+    return df.astype(str).sort_values(chaves).reset_index(drop=True)
+
+
+def test_espelho_crm_bate_com_agregado_do_banco(engine, replay, alterar_leads):
+    engine._get_crm_data_espelho(forcar_completo=True)
+    alterar_leads(0.02, seed=7)
+    with replay.connect() as conn:
+        assert engine.espelho_crm.sincronizar(conn, engine.data_inicio) > 0
+
+    chaves = ["unidade", "hs_pipeline_stage"]
+    espelho = engine.espelho_crm.agregar()[chaves + ["Leads"]]
+    banco = engine._get_crm_data(agregado=True, ignorar_cache=True)[chaves + ["Leads"]]
+    pd.testing.assert_frame_equal(_ordenar(espelho, chaves), _ordenar(banco, chaves))
+
+
+def test_tendencia_semanal_bate_com_banco(engine, alterar_leads):
+    engine.sincronizar_agregado_diario(forcar_completo=True)
+    alterar_leads(0.02, seed=11)
+    assert engine.sincronizar_agregado_diario() > 0
+
+    chaves = ["periodo", "unidade"]
+    local = engine.get_tendencia("semana", sincronizar=False)[chaves + ["Leads"]]
+    banco = engine._get_crm_data(agregado=True, bucket="semana", ignorar_cache=True)
+    banco["unidade"] = banco["unidade"].astype(str).str.strip().str.upper()
+    banco = banco.groupby(chaves, as_index=False)["Leads"].sum()
+    pd.testing.assert_frame_equal(_ordenar(local, chaves), _ordenar(banco, chaves))
+
+
+def test_matriculas_por_periodo_bate_com_banco(engine, replay, monkeypatch):
+    with replay.connect() as conn:
+        periodos = sorted(str(p) for p in conn.execute(text("SELECT DISTINCT CODPERLET FROM Z_PAINELMATRICULA")).scalars())
+        banco = pd.read_sql(text(
+            "SELECT T1.FILIAL AS unidade, T1.CODPERLET AS periodo_letivo, COUNT(DISTINCT T1.RA) AS Matricula "
+            "FROM Z_PAINELMATRICULA T1 INNER JOIN Tabela_Matrizcurricular T2 "
+            "ON T1.GRADE = T2.GRADE AND T1.CODCOLIGADA = T2.CODCOLIGADA AND T1.CODFILIAL = T2.CODFILIAL "
+            "WHERE T1.STATUS IN ('Matriculado', 'Pré-Matriculado') AND T2.[Matricula Validade] = 'S' "
+            "GROUP BY T1.FILIAL, T1.CODPERLET"
+        ), conn)
+    engine.periodo_ativo = periodos[-1]
+
+    # Primeira execução popula o cache dos encerrados; com TTL zero só o ativo volta ao banco
+    engine.get_matriculas_por_periodo(periodos, ignorar_cache=True)
+    monkeypatch.setattr(engine.queries.obter("funil.erp_matriculas"), "ttl", 0)
+    local = engine.get_matriculas_por_periodo(periodos)
+
+    chaves = ["unidade", "periodo_letivo"]
+    pd.testing.assert_frame_equal(_ordenar(local, chaves), _ordenar(banco, chaves))
+
+    comparativo = engine.comparar_matriculas(periodos)
+    assert [f"Matricula ({p})" for p in periodos] == list(comparativo.columns[1:1 + len(periodos)])
+
+
+def _transformar_por_linha(regras, df):
+    """Versão anterior de transformar_dados_crm: colunas auxiliares por linha, dois groupbys e merge."""
+    df = df.copy()
+    df["unidade"] = regras.normalizar_unidades(df["unidade"])
+    estagios = df["hs_pipeline_stage"].astype(str)
+    df["status_atual"] = estagios.map({v: k for k, v in regras.config.items()}).fillna("OUTROS")
+    cohort = df.groupby(["unidade", "status_atual"], observed=True).size().unstack(fill_value=0)
+    cohort = cohort.rename(columns=regras.COHORT_COLS_MAP)
+    df["rank"] = estagios.map(regras._pesos_estagio()).fillna(0)
+    df["Leads"] = 1
+    for coluna, nivel in regras.NIVEIS_ACUMULADOS.items():
+        if nivel:
+            df[coluna] = (df["rank"] >= nivel).astype(int)
+    acumulado = df.groupby("unidade", observed=True)[list(regras.NIVEIS_ACUMULADOS)].sum().reset_index()
+    return pd.merge(acumulado, cohort, on="unidade", how="left").fillna(0)
+
+
+def test_kernel_do_funil_bate_com_caminho_por_linha(unidades_crm, mapa_unidades):
+    codigos = [*ESTAGIOS.values(), "999999999"]
+    df = pd.DataFrame({
+        "unidade": unidades_crm,
+        "hs_pipeline_stage": [codigos[i % len(codigos)] for i in range(len(unidades_crm))],
+        "Leads": 1,
+    }).astype({"unidade": "category", "hs_pipeline_stage": "category"})
+    regras = FunnelBusinessRules(ESTAGIOS, mapa_unidades)
+
+    ordenar = lambda d: d.astype({"unidade": str}).sort_values("unidade").reset_index(drop=True)[sorted(d.columns)]
+    pd.testing.assert_frame_equal(
+        ordenar(_transformar_por_linha(regras, df)), ordenar(regras.transformar_dados_crm(df)), check_dtype=False
+    )
+
+
+def test_normalizar_unidades_bate_com_apply(unidades_crm, mapa_unidades):
+    class RegrasOriginais(FunnelBusinessRules):
+        """Remoção de acentos refeita a cada linha (sem tabela memoizada)."""
+        def remove_accents(self, text):
+            if not isinstance(text, str): return text
+            return ''.join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+    esperado = unidades_crm.apply(RegrasOriginais({}, mapa_unidades).normaliza_nome_marca)
+    obtido = FunnelBusinessRules({}, mapa_unidades).normalizar_unidades(unidades_crm)
+    assert esperado.astype(str).equals(obtido.astype(str))
+
+
+def test_template_compilado_gera_as_mesmas_abas(tmp_path):
+    from src.utils.relatorio_template import TemplateRelatorio, get_template
+
+    df = pd.DataFrame({
+        "unidade": [f"UNIDADE {i:02d}" for i in range(12)],
+        "Leads": range(100, 112),
+        "Matrícula": range(12),
+        "% Conversão Final": [i / 100 for i in range(12)],
+        "Leads Var% (D-1 17/10)": [0.05 - i / 100 for i in range(12)],
+        "Leads Delta (D-1 17/10)": range(-6, 6),
+        "Inertes em Lead": range(12),
+    })
+    config = {"regras_negocio": {"crescimento_minimo": 0.02, "queda_critica": -0.02}}
+    caminhos = [str(tmp_path / "por_relatorio.xlsx"), str(tmp_path / "compilado.xlsx")]
+    assert TemplateRelatorio(config, "Captacao").renderizar(df, df, caminhos[0])
+    assert get_template(config, "Captacao").renderizar(df, df, caminhos[1])
+
+    a, b = (pd.read_excel(c, sheet_name=None) for c in caminhos)
+    assert a.keys() == b.keys()
+    for aba in a:
+        pd.testing.assert_frame_equal(a[aba], b[aba])
+
+
+def test_snapshot_nao_e_gravado_com_fonte_em_falha(engine, monkeypatch):
+    gravados = []
+    monkeypatch.setattr(engine, "_gravar_snapshot", gravados.append)
+    monkeypatch.setattr(engine, "_get_erp_data", lambda ignorar_cache=False: pd.DataFrame())
+
+    assert not engine.generate_full_report().empty
+    assert gravados == []
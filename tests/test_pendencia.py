@@ -0,0 +1,243 @@
+"""Paridade dos caminhos otimizados das pendências (modos servidor x local, histórico, RAs e relatório)."""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.engines.pendencia.engine import PendenciaEngine
+from src.engines.pendencia.exclusoes import RegrasExclusao
+from src.engines.pendencia.historico import HistoricoPendencias
+from src.engines.pendencia.indice_ra import IndiceRA
+from src.engines.pendencia.report import PendenciaReporter
+
+
+def _pendentes(engine):
+    df = engine._pos_processar(engine._consultar_pendentes())
+    return df.astype(str).sort_values(PendenciaEngine.CHAVES_PENDENTE).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("regra_nova", [False, True], ids=["regras do JSON", "regra nova"])
+def test_modo_local_bate_com_modo_servidor(replay, regra_nova):
+    servidor = PendenciaEngine(modo="servidor")
+    local = PendenciaEngine(modo="local")
+    if regra_nova:
+        originais = servidor.exclusoes
+        nova = RegrasExclusao(
+            originais.aluno_contem + ["SILVA"],
+            [{"grupo": g, "filial": fs} for g, fs in originais.grupo_filial] + [{"grupo": "MATRIZ", "filial": ["BANGU"]}],
+        )
+        servidor.recarregar_exclusoes(nova)
+        local.recarregar_exclusoes(nova)
+        assert servidor.consulta_pendentes != "pendencia.pendentes"
+
+    a, b = _pendentes(servidor), _pendentes(local)
+    assert len(a) > 0
+    assert list(a.columns) == list(b.columns)
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_trocar_exclusoes_nao_afeta_outras_engines(replay):
+    alterada = PendenciaEngine(modo="servidor")
+    padrao = PendenciaEngine(modo="servidor")
+    alterada.recarregar_exclusoes(RegrasExclusao(["SILVA"]))
+
+    assert padrao.consulta_pendentes == "pendencia.pendentes"
+    assert "SILVA" not in padrao.queries.obter(padrao.consulta_pendentes).sql
+    assert "SILVA" in alterada.queries.obter(alterada.consulta_pendentes).sql
+
+
+def test_mascara_ignora_caixa_e_acentos_como_o_banco():
+    regras = RegrasExclusao(["teste", "João"], [{"grupo": "QI", "filial": ["BOTAFOGO", "Méier"]}])
+    df = pd.DataFrame({
+        "Aluno": ["TÉSTE X", "joao", "MARIA", None, "ANA", "BIA"],
+        "NOMEGRUPO": ["A", "A", "A", "A", "qí", "QI"],
+        "FILIAL": ["X", "X", "X", "X", "MEIER", "CENTRO"],
+    })
+    assert regras.mascara(df).tolist() == [False, False, True, False, False, True]
+
+
+def test_historico_tem_os_mesmos_ras_das_planilhas_legadas(tmp_path, gerar_pendencias):
+    historico = HistoricoPendencias(str(tmp_path / "novo"))
+    inicio = datetime(2026, 1, 1, 8, 0, 0)
+    for m, marca in enumerate(["MARCA_0", "MARCA_1"]):
+        pasta = tmp_path / "legado" / marca
+        pasta.mkdir(parents=True)
+        for e in range(3):
+            df = gerar_pendencias(300, marca, seed=m * 100 + e)
+            momento = inicio + timedelta(days=e)
+            df.to_excel(pasta / f"DB_Pend_{marca}_{momento:%Y%m%d_%H%M%S}.xlsx", index=False)
+            historico.gravar(marca, df, momento)
+
+        # Planilha legada mais recente = última execução
+        legado = pd.read_excel(pasta / f"DB_Pend_{marca}_{momento:%Y%m%d_%H%M%S}.xlsx")
+        base = historico.carregar(marca, "ultimo", colunas=["RA"], momento_base=momento + timedelta(hours=1))
+        assert set(legado["RA"].astype(str).str.strip()) == set(base["RA"])
+
+
+def test_retencao_do_historico(tmp_path, gerar_pendencias):
+    historico = HistoricoPendencias(str(tmp_path))
+    df = gerar_pendencias(50, "RETENCAO", seed=1)
+    inicio = datetime(2026, 1, 1, 8, 0, 0)
+    for dia in range(30):
+        for hora in range(4):
+            historico.gravar("RETENCAO", df, inicio + timedelta(days=dia, hours=hora))
+
+    momentos = historico.momentos("RETENCAO")
+    assert len(momentos) < 120
+    limite = max(momentos) - timedelta(days=HistoricoPendencias.DIAS_INTRADIARIOS)
+    antigos = [m for m in momentos if m < limite]
+    assert len({m.date() for m in antigos}) == len(antigos)
+
+
+def test_indice_ra_bate_com_sets():
+    rng = np.random.default_rng(7)
+    gerar = lambda n: pd.Series((rng.choice(20_000, size=n, replace=False) + 2_000_000).astype(str), dtype=object)
+    matriculados, atual, anterior = gerar(10_000), pd.DataFrame({"RA": gerar(4_000)}), pd.DataFrame({"RA": gerar(4_000)})
+    indice = IndiceRA.de_valores(matriculados)
+
+    assert np.array_equal(atual["RA"].isin(set(matriculados)).to_numpy(), indice.contem(atual["RA"]))
+
+    antigos, atuais = set(anterior["RA"]), set(atual["RA"])
+    resolvidos = antigos - atuais
+    ras_antigos, ras_atuais = IndiceRA.de_valores(anterior["RA"]), IndiceRA.de_valores(atual["RA"])
+    assert len(ras_atuais.diferenca(ras_antigos)) == len(atuais - antigos)
+    assert len(ras_antigos.diferenca(ras_atuais).intersecao(indice)) == len(resolvidos & set(matriculados))
+
+
+def test_pos_processamento_por_colunas_bate_com_apply():
+    from src.engines.pendencia.regras import ProcessadorRegras
+    from src.utils.esquema_ingestao import ordenar_lista_agregada
+
+    rng = np.random.default_rng(42)
+    n = 5_000
+    marcas = np.array(["QI", "GLOBAL TREE", "APOGEU", "AO CUBO"], dtype=object)[rng.integers(0, 4, n)]
+    bairros = np.array(["TIJUCA", "BOTAFOGO", "MEIER", "CENTRO"], dtype=object)[rng.integers(0, 4, n)]
+    separador = np.array([" - ", " | ", " "], dtype=object)[rng.integers(0, 3, n)]
+    listas = lambda itens, sep: [sep.join(rng.choice(itens, rng.integers(1, 4))) for _ in range(n)]
+    df = pd.DataFrame({
+        "Marca": marcas,
+        "Filial": np.where(rng.random(n) < 0.8, marcas + separador + bairros, "COLEGIO " + bairros),
+        "Turno": listas(["MANHÃ", "TARDE", "INTEGRAL"], ", "),
+        "GRADE": listas([f"G{i}" for i in range(50)], " | "),
+        "Dias_Pendente": rng.integers(0, 200, n).astype("int32"),
+    })
+    df.loc[rng.random(n) < 0.01, ["Turno", "GRADE"]] = None
+
+    def limpar_lista(texto, separador):
+        if pd.isna(texto):
+            return ""
+        return separador.join(sorted({x.strip() for x in str(texto).split(separador)}))
+
+    def limpar_filial(row):
+        if row["Filial"].startswith(row["Marca"]):
+            return row["Filial"][len(row["Marca"]):].strip(" -|")
+        return row["Filial"]
+
+    sla = np.digitize(df["Dias_Pendente"].to_numpy(), PendenciaEngine.LIMITES_SLA)
+    assert [PendenciaEngine.CATEGORIAS_SLA[i] for i in sla] == [
+        "Crítico" if d > 90 else "Novo" if d < 7 else "Atenção" for d in df["Dias_Pendente"]
+    ]
+    assert ordenar_lista_agregada(df["Turno"], ",", valor_nulo="").astype(str).equals(
+        df["Turno"].apply(limpar_lista, args=(",",)).astype(str))
+    assert ordenar_lista_agregada(df["GRADE"], "|", valor_nulo="").astype(str).equals(
+        df["GRADE"].apply(limpar_lista, args=("|",)).astype(str))
+    assert ProcessadorRegras.limpar_nome_filial(df).astype(str).equals(df.apply(limpar_filial, axis=1).astype(str))
+
+
+def _abas(pasta):
+    abas = {}
+    for arquivo in sorted(f for f in os.listdir(pasta) if f.endswith(".xlsx")):
+        for aba in ("Lista de Ação", "Resumo"):
+            df = pd.read_excel(os.path.join(pasta, arquivo), sheet_name=aba, header=None)
+            # Linha "Gerado em" traz o horário da geração
+            abas[arquivo, aba] = df.drop(index=2, errors="ignore") if aba == "Resumo" else df
+    return abas
+
+
+def test_relatorio_em_processos_bate_com_sequencial(tmp_path, gerar_pendencias, monkeypatch):
+    marcas = [f"MARCA {i}" for i in range(3)]
+    df = pd.concat([gerar_pendencias(400, m, seed=i) for i, m in enumerate(marcas)], ignore_index=True)
+
+    pasta_seq = str(tmp_path / "sequencial")
+    tempos_seq = PendenciaReporter({}, pasta_seq).gerar_por_marca(df, pasta_seq, business_obj=None)
+
+    # Força o pool mesmo numa máquina de um núcleo e com poucas linhas
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(PendenciaReporter, "LINHAS_MINIMAS_PROCESSOS", 0)
+    chamadas = []
+    original = PendenciaReporter._renderizar_em_processos
+    monkeypatch.setattr(PendenciaReporter, "_renderizar_em_processos",
+                        lambda self, *args: chamadas.append(args) or original(self, *args))
+    pasta_par = str(tmp_path / "processos")
+    tempos_par = PendenciaReporter({}, pasta_par).gerar_por_marca(df, pasta_par, business_obj=None, max_processos=2)
+
+    assert len(chamadas) == 1
+    assert set(tempos_seq) == set(tempos_par) == set(marcas)
+    a, b = _abas(pasta_seq), _abas(pasta_par)
+    assert a.keys() == b.keys()
+    for chave in a:
+        pd.testing.assert_frame_equal(a[chave], b[chave])
+
+
+def test_pool_de_processos_e_opcional(tmp_path, gerar_pendencias, monkeypatch):
+    df = pd.concat([gerar_pendencias(100, f"MARCA {i}", seed=i) for i in range(2)], ignore_index=True)
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(PendenciaReporter, "_renderizar_em_processos", lambda *a: pytest.fail("pool usado"))
+
+    pasta = str(tmp_path)
+    reporter = PendenciaReporter({}, pasta)
+    assert len(reporter.gerar_por_marca(df, pasta, business_obj=None)) == 2
+    # Pedido explícito, mas abaixo do limite de linhas
+    assert len(reporter.gerar_por_marca(df, pasta, business_obj=None, max_processos=4)) == 2
+
+
+@pytest.mark.parametrize("memoria_constante", [False, True], ids=["normal", "constant_memory"])
+def test_lista_de_acao_em_bloco_bate_com_celula_a_celula(tmp_path, gerar_pendencias, memoria_constante):
+    import xlsxwriter
+    from openpyxl import load_workbook
+
+    colunas = ['Status_Prioridade', 'Dias_Pendente', 'Marca', 'Filial', 'RA', 'Tipo_Matricula',
+               'Aluno', 'Série', 'Responsável', 'Turno', 'CPF_Resp']
+    headers = ['Status', 'Dias Pendentes', 'Marca', 'Filial', 'RA', 'Tipo Matricula', 'Nome do Aluno',
+               'Série', 'Responsável', 'Turno', 'CPF Responsável']
+    df = gerar_pendencias(600, "MARCA", seed=7)
+    # Responsáveis com mais de um filho em sequência, como na lista ordenada do relatório
+    df["CPF_Resp"] = df["CPF_Resp"].iloc[(pd.RangeIndex(len(df)) // 2) * 2].to_numpy()
+    df = df[colunas]
+
+    def escrever(caminho, em_bloco):
+        wb = xlsxwriter.Workbook(caminho, {'constant_memory': em_bloco and memoria_constante})
+        f = {nome: wb.add_format(props) for nome, props in {
+            "critico": {'bg_color': '#FFC7CE', 'border': 1}, "atencao": {'bg_color': '#FFEB9C', 'border': 1},
+            "novo": {'bg_color': '#C6EFCE', 'border': 1}, "familia_a": {'bg_color': '#FFFFFF', 'border': 1},
+            "familia_b": {'bg_color': '#F2F2F2', 'border': 1}, "manual": {'bg_color': '#FFFFE0', 'border': 1},
+        }.items()}
+        ws = wb.add_worksheet('Lista de Ação')
+        ws.write_row(0, 0, headers)
+        if em_bloco:
+            PendenciaReporter._escrever_lista_acao(
+                ws, df, fmts_status=(f["critico"], f["atencao"], f["novo"]),
+                fmts_familia=(f["familia_a"], f["familia_b"]), fmt_manual=f["manual"],
+            )
+        else:
+            cpf_ant, cor = None, f["familia_a"]
+            for i, linha in enumerate(df.itertuples(index=False), start=1):
+                if linha.CPF_Resp != cpf_ant:
+                    cor = f["familia_b"] if cor == f["familia_a"] else f["familia_a"]
+                    cpf_ant = linha.CPF_Resp
+                status = {"Crítico": f["critico"], "Atenção": f["atencao"]}.get(linha.Status_Prioridade, f["novo"])
+                ws.write(i, 0, linha.Status_Prioridade, status)
+                for col, valor in enumerate(linha[1:], start=1):
+                    ws.write(i, col, valor, cor)
+                ws.write(i, 11, "", f["manual"])
+        wb.close()
+
+        planilha = load_workbook(caminho, read_only=True)['Lista de Ação']
+        return [tuple((c.value, c.fill.fgColor.rgb if c.fill is not None else None) for c in linha)
+                for linha in planilha.iter_rows()]
+
+    assert escrever(str(tmp_path / "em_bloco.xlsx"), True) == escrever(str(tmp_path / "celula.xlsx"), False)
+    larguras = PendenciaReporter._larguras_colunas(df, headers)
+    assert larguras == [min(max(df[c].astype(str).map(len).max(), len(h)) + 2, 50) for c, h in zip(colunas, headers)]